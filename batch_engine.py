@@ -0,0 +1,330 @@
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from hand_counts import COLOURS, COPIES_PER_TYPE, NUMBER_COUNT, TYPE_COUNT
+from rules_engine import INITIAL_HAND_SIZE, MAX_DRAW_COUNT, MAX_HAND_SIZE
+
+'''
+Lock-step simulation of many games of the cheap strategies with NumPy.
+
+N games with the same seating are advanced one turn at a time together. Hands are an (N, players, 40)
+array of card-type counts and decks an (N, 40) array, so a draw or a take is one vectorised random choice
+over the count rows: drawing from a shuffled deck is the same as drawing a uniformly random remaining
+card. Groups are found with batched masks of runs (consecutive numbers in one colour) and sets (one
+number in several colours).
+
+Only the DEFENSIVE (random) and AGGRESSIVE (rule-based) strategies are vectorised, with the same decisions
+as RandomStrategyPlayer and RulebasedStrategyPlayer without the exact endgame solver. Discards take the
+best of three greedy orders (largest group, sets first, runs first), which discards as many cards as
+find_best_discard_count for most but not all hands; use game_engine for exact games.
+
+Actions are encoded as integers: PASS, DRAW_1 to DRAW_3 (the number of cards), and TAKE + j for taking
+from the j-th other player, in seat order.
+'''
+
+VECTOR_STRATEGIES = ('DEFENSIVE', 'AGGRESSIVE')
+
+PASS = 0
+TAKE = MAX_DRAW_COUNT + 1
+NO_ACTION, AFTER_DRAW_ACTION, AFTER_TAKE_ACTION = 0, 1, 2
+
+COLOUR_COUNT = len(COLOURS)
+NUMBER_INDEX = np.arange(NUMBER_COUNT)
+COLOUR_ROWS = np.arange(COLOUR_COUNT)
+
+
+class BatchResult(NamedTuple):
+    winners: np.ndarray         #Seat of the winner of each game, -1 if stopped after max_turns
+    lengths: np.ndarray         #Completed turns of each game
+
+
+def sample_types(counts: np.ndarray, rows: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """One card type drawn uniformly from the cards counted in each of the given rows of counts"""
+    selected = counts[rows]
+    picks = np.floor(rng.random(len(rows)) * selected.sum(axis=1, dtype=np.int16))
+    return (selected.cumsum(axis=1, dtype=np.int16) > picks[:, None]).argmax(axis=1)
+
+
+def colour_counts(present: np.ndarray) -> np.ndarray:
+    """For (M, colours, numbers) presence masks, the number of colours present of each number"""
+    counts = present[:, 0].view(np.int8).copy()
+    for colour in range(1, COLOUR_COUNT):
+        counts += present[:, colour].view(np.int8)
+    return counts
+
+
+def run_lengths_ending(present: np.ndarray) -> np.ndarray:
+    """For (M, colours, numbers) presence masks, the length of the run ending at each card"""
+    ending = np.zeros(present.shape, dtype=np.int8)
+    ending[..., 0] = present[..., 0]
+    for n in range(1, NUMBER_COUNT):
+        ending[..., n] = (ending[..., n - 1] + 1) * present[..., n]
+    return ending
+
+
+def run_lengths_starting(present: np.ndarray) -> np.ndarray:
+    starting = np.zeros(present.shape, dtype=np.int8)
+    starting[..., -1] = present[..., -1]
+    for n in reversed(range(NUMBER_COUNT - 1)):
+        starting[..., n] = (starting[..., n + 1] + 1) * present[..., n]
+    return starting
+
+
+def group_kinds(hands: np.ndarray):
+    """For (M, 40) hands, whether each hand holds a valid run and whether it holds a valid set"""
+    present = (hands > 0).reshape(-1, COLOUR_COUNT, NUMBER_COUNT)
+    runs = present[..., :-2] & present[..., 1:-1] & present[..., 2:]
+    return runs.any(axis=(1, 2)), (colour_counts(present) >= 3).any(axis=1)
+
+
+def group_forming_types(hands: np.ndarray) -> np.ndarray:
+    """For (M, 40) hands without valid groups, which card types not in the hand would form a valid group"""
+    present = (hands > 0).reshape(-1, COLOUR_COUNT, NUMBER_COUNT)
+    left = np.zeros(present.shape, dtype=np.int8)
+    right = np.zeros(present.shape, dtype=np.int8)
+    left[..., 1:] = run_lengths_ending(present)[..., :-1]
+    right[..., :-1] = run_lengths_starting(present)[..., 1:]
+    colours = colour_counts(present)[:, None, :] + 1
+    forming = (left + 1 + right >= 3) | (colours >= 3)
+    return (forming & ~present).reshape(-1, TYPE_COUNT)
+
+
+DISCARD_ORDERS = ('largest', 'sets', 'runs')
+
+
+def greedy_discard(hands: np.ndarray, order: str) -> np.ndarray:
+    """
+    Hands (M, 40) after discarding valid groups one at a time until none is left, choosing the largest
+    group ('largest'), or the largest set before any run ('sets'), or the longest run before any set ('runs')
+    """
+    hands = hands.copy()
+    rows = np.arange(len(hands))
+    while len(rows):
+        hand = hands[rows]
+        present = (hand > 0).reshape(-1, COLOUR_COUNT, NUMBER_COUNT)
+        index = np.arange(len(rows))
+
+        ending = run_lengths_ending(present).reshape(-1, TYPE_COUNT)
+        run_end = ending.argmax(axis=1)
+        run_length = ending[index, run_end]
+        colours = colour_counts(present)
+        set_number = colours.argmax(axis=1)
+        set_size = colours[index, set_number]
+
+        grouped = (run_length >= 3) | (set_size >= 3)
+        hand, present, rows = hand[grouped], present[grouped], rows[grouped]
+        run_end, run_length = run_end[grouped], run_length[grouped]
+        set_number, set_size = set_number[grouped], set_size[grouped]
+
+        if order == 'largest':
+            use_run = (run_length >= 3) & (run_length >= set_size)
+        elif order == 'sets':
+            use_run = (run_length >= 3) & (set_size < 3)
+        else:
+            use_run = run_length >= 3
+        end_number = (run_end % NUMBER_COUNT)[:, None, None]
+        run_mask = ((COLOUR_ROWS[None, :, None] == (run_end // NUMBER_COUNT)[:, None, None])
+                    & (NUMBER_INDEX <= end_number) & (NUMBER_INDEX > end_number - run_length[:, None, None]))
+        set_mask = present & (NUMBER_INDEX == set_number[:, None, None])
+        hands[rows] = hand - np.where(use_run[:, None, None], run_mask, set_mask).reshape(-1, TYPE_COUNT)
+    return hands
+
+
+def discard_groups(hands: np.ndarray, decks: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Discard valid groups from hands (N, 40) in the given rows back into the decks.
+    Returns: the rows that discarded at least one group
+    """
+    has_run, has_set = group_kinds(hands[rows])
+    rows = rows[has_run | has_set]
+    mixed = (has_run & has_set)[has_run | has_set]
+    before = hands[rows]
+
+    #Discarding runs never forms sets and vice versa, so the greedy orders only differ for hands with both
+    after = greedy_discard(before, 'largest')
+    if mixed.any():
+        plans = np.stack([after[mixed]] + [greedy_discard(before[mixed], order) for order in DISCARD_ORDERS[1:]])
+        best = plans.sum(axis=2, dtype=np.int16).argmin(axis=0)
+        after[mixed] = plans[best, np.arange(len(best))]
+
+    hands[rows] = after
+    decks[rows] += before - after
+    return rows
+
+
+def random_choices(available: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Index of a uniformly random available column in each row of a boolean matrix"""
+    return np.where(available, rng.random(available.shape), -1.0).argmax(axis=1)
+
+
+def draw_limit_mask(hand_sizes: np.ndarray) -> np.ndarray:
+    """Draw counts 1 to 3 offered by the strategies: a draw may not take the hand above the maximum size"""
+    return hand_sizes[:, None] + np.arange(1, MAX_DRAW_COUNT + 1) <= MAX_HAND_SIZE
+
+
+def defensive_actions(hands: np.ndarray, current: int, others: List[int], previous: np.ndarray,
+                      rng: np.random.Generator) -> np.ndarray:
+    """Actions of RandomStrategyPlayer: a uniform choice among its offered actions"""
+    hand_sizes = hands[:, current].sum(axis=1, dtype=np.int16)
+    can_take = hands[:, others].sum(axis=2, dtype=np.int16) > 2
+    offer_draws = (previous != AFTER_DRAW_ACTION)[:, None] & draw_limit_mask(hand_sizes)
+    offer_takes = (previous != AFTER_TAKE_ACTION)[:, None] & can_take
+    available = np.concatenate([np.ones((len(hands), 1), dtype=bool), offer_draws, offer_takes], axis=1)
+    actions = random_choices(available, rng)
+    return np.where(hand_sizes > MAX_HAND_SIZE - 1, PASS, actions)
+
+
+def aggressive_draws(hand_sizes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """RulebasedStrategyPlayer's draw counts; a draw of 0 cards is played as a pass"""
+    return np.select([hand_sizes < 8, hand_sizes < 16, hand_sizes < 20],
+                     [MAX_DRAW_COUNT, rng.integers(1, MAX_DRAW_COUNT + 1, len(hand_sizes)), rng.integers(0, 2, len(hand_sizes))],
+                     PASS)
+
+
+def aggressive_takes(hands: np.ndarray, current: int, others: List[int], rng: np.random.Generator) -> np.ndarray:
+    """RulebasedStrategyPlayer's take decisions: TAKE + j, or -1 for no take"""
+    hand_sizes = hands[:, current].sum(axis=1, dtype=np.int16)
+    other_sizes = hands[:, others].sum(axis=2, dtype=np.int16)
+    forming = group_forming_types(hands[:, current])
+    worthy = ((hands[:, others] > 0) & forming[:, None, :]).any(axis=2) & (other_sizes > 2)
+
+    takes = np.full(len(hands), -1)
+    if len(others) == 1:
+        return np.where(worthy[:, 0] & (other_sizes[:, 0] > hand_sizes), TAKE, takes)
+
+    single = worthy.sum(axis=1) == 1
+    target = worthy[:, 1].astype(int)
+    target_sizes = other_sizes[np.arange(len(hands)), target]
+    takes = np.where(single & (target_sizes > hand_sizes), TAKE + target, takes)
+
+    both = worthy.all(axis=1)
+    size_a, size_b = other_sizes[:, 0], other_sizes[:, 1]
+    takes = np.where(both & (size_a > size_b) & (size_a > hand_sizes), TAKE, takes)
+    takes = np.where(both & (size_a < size_b) & (size_b > hand_sizes), TAKE + 1, takes)
+    tie_target = TAKE + (rng.random(len(hands)) < 0.5)
+    return np.where(both & (size_a == size_b) & (size_b > hand_sizes), tie_target, takes)
+
+
+def aggressive_actions(hands: np.ndarray, current: int, others: List[int], previous: np.ndarray,
+                       rng: np.random.Generator) -> np.ndarray:
+    """Actions of RulebasedStrategyPlayer: take a card that forms a group from a larger hand, otherwise draw"""
+    hand_sizes = hands[:, current].sum(axis=1, dtype=np.int16)
+    takes = aggressive_takes(hands, current, others, rng)
+    draws = aggressive_draws(hand_sizes, rng)
+    actions = np.where(previous == NO_ACTION, np.where(takes >= 0, takes, draws),
+                       np.where(previous == AFTER_DRAW_ACTION, np.maximum(takes, PASS), draws))
+    return np.where((previous != NO_ACTION) & (hand_sizes > MAX_HAND_SIZE - 1), PASS, actions)
+
+
+STRATEGY_ACTIONS = {'DEFENSIVE': defensive_actions, 'AGGRESSIVE': aggressive_actions}
+
+
+def deal(games: int, player_count: int, rng: np.random.Generator):
+    cards = np.repeat(np.arange(TYPE_COUNT), COPIES_PER_TYPE)
+    shuffled = rng.permuted(np.broadcast_to(cards, (games, len(cards))), axis=1)
+    hands = np.zeros((games, player_count, TYPE_COUNT), dtype=np.int8)
+    for seat in range(player_count):
+        dealt = shuffled[:, seat * INITIAL_HAND_SIZE:(seat + 1) * INITIAL_HAND_SIZE]
+        hands[:, seat] = (dealt[:, :, None] == np.arange(TYPE_COUNT)).sum(axis=1)
+    decks = (COPIES_PER_TYPE - hands.sum(axis=1)).astype(np.int8)
+    return hands, decks
+
+
+class LockstepGames:
+    """N games with the same seating, advanced one turn at a time"""
+    def __init__(self, strategies: List[str], games: int, rng: Optional[np.random.Generator] = None):
+        unknown = set(strategies) - set(VECTOR_STRATEGIES)
+        if unknown:
+            raise ValueError(f"No vectorised version of {', '.join(sorted(unknown))}; available: {', '.join(VECTOR_STRATEGIES)}")
+        self.strategies = strategies
+        self.rng = rng or np.random.default_rng()
+        self.hands, self.decks = deal(games, len(strategies), self.rng)
+        self.winners = np.full(games, -1)
+        self.lengths = np.zeros(games, dtype=np.int64)
+        self.turn = 0
+
+
+    def declare_winners(self, rows: np.ndarray, seats):
+        self.winners[rows] = seats
+        self.lengths[rows] = self.turn
+
+
+    def apply(self, actions: np.ndarray, rows: np.ndarray, current: int, others: List[int]) -> np.ndarray:
+        """Play the actions of the current seat in the given rows; returns the rows where the game goes on"""
+        hands = self.hands[:, current]
+        for draw_index in range(MAX_DRAW_COUNT):
+            drawing = rows[(actions > draw_index) & (actions < TAKE)]
+            types = sample_types(self.decks, drawing, self.rng)
+            self.decks[drawing, types] -= 1
+            hands[drawing, types] += 1
+
+        is_take = actions >= TAKE
+        taking = rows[is_take]
+        targets = np.array(others)[actions[is_take] - TAKE]
+        types = sample_types(self.hands[taking, targets], np.arange(len(taking)), self.rng)
+        self.hands[taking, targets, types] -= 1
+        hands[taking, types] += 1
+
+        emptied = self.hands[taking, targets].sum(axis=1, dtype=np.int16) == 0
+        self.declare_winners(taking[emptied], targets[emptied])
+        rows = rows[self.winners[rows] < 0]
+
+        discarded = discard_groups(hands, self.decks, rows)
+        self.declare_winners(discarded[hands[discarded].sum(axis=1, dtype=np.int16) == 0], current)
+        return rows[self.winners[rows] < 0]
+
+
+    def legal(self, actions: np.ndarray, rows: np.ndarray, current: int, others: List[int], previous: np.ndarray) -> np.ndarray:
+        """The actions of the given rows with those that break the rules replaced by a pass"""
+        hand_sizes = self.hands[rows, current].sum(axis=1, dtype=np.int16)
+        is_draw = (actions > PASS) & (actions < TAKE)
+        draw_legal = ((previous != AFTER_DRAW_ACTION) & (hand_sizes + actions <= MAX_HAND_SIZE)
+                      & (self.decks[rows].sum(axis=1, dtype=np.int16) >= actions))
+        targets = np.array(others)[np.clip(actions - TAKE, 0, len(others) - 1)]
+        take_legal = ((previous != AFTER_TAKE_ACTION) & (hand_sizes < MAX_HAND_SIZE)
+                      & (self.hands[rows, targets].sum(axis=1, dtype=np.int16) > 0))
+        legal = np.where(is_draw, draw_legal, np.where(actions >= TAKE, take_legal, True))
+        return np.where(legal, actions, PASS)
+
+
+    def play_turn(self):
+        current = self.turn % len(self.strategies)
+        others = [seat for seat in range(len(self.strategies)) if seat != current]
+        choose = STRATEGY_ACTIONS[self.strategies[current]]
+        hands = self.hands[:, current]
+
+        rows = np.flatnonzero(self.winners < 0)
+        discarded = discard_groups(hands, self.decks, rows)
+        self.declare_winners(discarded[hands[discarded].sum(axis=1, dtype=np.int16) == 0], current)
+        rows = rows[self.winners[rows] < 0]
+        rows = rows[hands[rows].sum(axis=1, dtype=np.int16) < MAX_HAND_SIZE]      #Players with a full hand pass
+
+        previous = np.full(len(rows), NO_ACTION)
+        for _ in range(2):
+            actions = self.legal(choose(self.hands[rows], current, others, previous, self.rng), rows, current, others, previous)
+            playing = actions != PASS
+            rows, actions = rows[playing], actions[playing]
+            ongoing = np.isin(rows, self.apply(actions, rows, current, others), assume_unique=True)
+            rows, actions = rows[ongoing], actions[ongoing]
+            previous = np.where(actions >= TAKE, AFTER_TAKE_ACTION, AFTER_DRAW_ACTION)
+
+        self.turn += 1
+
+
+    def run(self, max_turns: int) -> BatchResult:
+        while self.turn < max_turns and (self.winners < 0).any():
+            self.play_turn()
+        unfinished = self.winners < 0
+        self.lengths[unfinished] = self.turn
+        return BatchResult(self.winners, self.lengths)
+
+
+def simulate(strategies: List[str], games: int, max_turns: int = 300, seed: Optional[int] = None,
+             batch_size: int = 20000) -> BatchResult:
+    """Play games between the given seats in lock-step batches; returns the winner and length of each game"""
+    rng = np.random.default_rng(seed)
+    results = [LockstepGames(strategies, min(batch_size, games - start), rng).run(max_turns)
+               for start in range(0, games, batch_size)]
+    return BatchResult(np.concatenate([result.winners for result in results]),
+                       np.concatenate([result.lengths for result in results]))
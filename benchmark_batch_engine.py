@@ -0,0 +1,53 @@
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from batch_engine import discard_groups, simulate
+from benchmark_game_engine import create_players
+from game_engine import play_game
+from hand_counts import COPIES_PER_TYPE, TYPE_COUNT, max_discard
+
+
+def discard_agreement(hands: int = 5000, seed: int = 0) -> float:
+    """Share of random hands of 3 to 20 cards where the vectorised discard removes as many cards as the exact one"""
+    rng = np.random.default_rng(seed)
+    cards = np.repeat(np.arange(TYPE_COUNT), COPIES_PER_TYPE)
+    counts = np.stack([np.bincount(rng.choice(cards, rng.integers(3, 21), replace=False), minlength=TYPE_COUNT)
+                       for _ in range(hands)]).astype(np.int8)
+    before = counts.copy()
+    discard_groups(counts, (COPIES_PER_TYPE - counts).astype(np.int8), np.arange(hands))
+    exact = np.array([max_discard(tuple(int(count) for count in hand)) for hand in before])
+    return float(np.mean(before.sum(axis=1) - counts.sum(axis=1) == exact))
+
+
+def compare_with_game_engine(strategies: List[str], games: int, max_turns: int, seed: int = 0):
+    """Finished-game share and average length of the lock-step and the exact engine on the same matchup"""
+    result = simulate(strategies, games * 20, max_turns, seed)
+    rng = random.Random(seed)
+    states = [play_game(create_players(strategies), rng.getrandbits(32), max_turns) for _ in range(games)]
+    print(f"  lock-step: {np.mean(result.winners >= 0):.2%} finished, {result.lengths.mean():.1f} turns per game")
+    print(f"  exact:     {np.mean([state.winner is not None for state in states]):.2%} finished, "
+          f"{np.mean([state.turn_count for state in states]):.1f} turns per game")
+
+
+def run_benchmark(games: int = 100000, max_turns: int = 300, seed: int = 0):
+    print(f"Vectorised discards agree with the exact discard on {discard_agreement():.1%} of random hands\n")
+
+    for strategies in (['DEFENSIVE', 'DEFENSIVE'], ['AGGRESSIVE', 'DEFENSIVE'], ['AGGRESSIVE', 'AGGRESSIVE', 'DEFENSIVE']):
+        start_time = time.perf_counter()
+        result = simulate(strategies, games, max_turns, seed)
+        elapsed = time.perf_counter() - start_time
+        wins = np.bincount(result.winners + 1, minlength=len(strategies) + 1) / games
+        print(f"{' vs '.join(strategies)}: {games} games in {elapsed:.1f}s ({60 * games / elapsed:.0f} games/min, "
+              f"{result.lengths.sum() / elapsed:.0f} turns/s, {result.lengths.mean():.1f} turns per game)")
+        print("  wins by seat: " + ", ".join(f"{seat + 1}: {share:.2%}" for seat, share in enumerate(wins[1:]))
+              + f", unfinished: {wins[0]:.2%}")
+
+    print("\nAgainst the exact engine (DEFENSIVE vs DEFENSIVE):")
+    compare_with_game_engine(['DEFENSIVE', 'DEFENSIVE'], games=200, max_turns=max_turns, seed=seed)
+
+
+if __name__ == "__main__":
+    run_benchmark()
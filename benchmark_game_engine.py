@@ -0,0 +1,42 @@
+import json
+import random
+import time
+from typing import Dict, List
+
+import computer_player
+from game_engine import play_game
+
+
+def create_players(strategies: List[str]) -> List[computer_player.ComputerPlayer]:
+    with open("config.json") as config_file:
+        strategy_class_dict = json.load(config_file)["strategy_class_dict"]
+    return [getattr(computer_player, strategy_class_dict[strategy])(f"{strategy} {index + 1}")
+            for index, strategy in enumerate(strategies)]
+
+
+def run_benchmark(strategies: List[str], games: int = 200, max_turns: int = 300, seed: int = 0) -> Dict[str, float]:
+    """Play headless games between computer players and report the game rate and results"""
+    rng = random.Random(seed)
+    wins = {}
+    turns = 0
+
+    start_time = time.perf_counter()
+    for _ in range(games):
+        players = create_players(strategies)
+        state = play_game(players, rng.getrandbits(32), max_turns)
+        winner = state.winner.name if state.winner else 'unfinished'
+        wins[winner] = wins.get(winner, 0) + 1
+        turns += state.turn_count
+    elapsed = time.perf_counter() - start_time
+
+    print(f"{' vs '.join(strategies)}: {games} games in {elapsed:.2f}s "
+          f"({games / elapsed:.1f} games/s, {turns / elapsed:.0f} turns/s, {turns / games:.1f} turns per game)")
+    for name, count in sorted(wins.items()):
+        print(f"  {name:15s} {count / games:.1%}")
+    return {'games_per_second': games / elapsed, 'turns_per_second': turns / elapsed}
+
+
+if __name__ == "__main__":
+    run_benchmark(['DEFENSIVE', 'DEFENSIVE'])
+    run_benchmark(['AGGRESSIVE', 'DEFENSIVE'])
+    run_benchmark(['AGGRESSIVE', 'AGGRESSIVE', 'DEFENSIVE'], games=100)
@@ -0,0 +1,121 @@
+import copy
+import random
+import time
+from typing import Callable, Dict, List
+
+import game_engine
+import packed_state
+import rules_engine
+from benchmark_game_engine import create_players
+from hand_counts import counts_from_cards
+
+
+def sample_states(count: int, seed: int = 0) -> List[game_engine.GameState]:
+    """Start-of-turn states of DEFENSIVE games after 0 to 40 turns"""
+    rng = random.Random(seed)
+    states = []
+    while len(states) < count:
+        state = game_engine.GameState.new_game(create_players(['DEFENSIVE'] * rng.choice((2, 3))), rng.getrandbits(32))
+        for _ in range(rng.randrange(40)):
+            game_engine.play_turn(state)
+            if state.winner is not None:
+                break
+        if state.winner is None:
+            states.append(state)
+    return states
+
+
+def to_counts_state(state: game_engine.GameState) -> rules_engine.CountsState:
+    return rules_engine.CountsState(tuple(counts_from_cards(player.cards) for player in state.players), state.current_index)
+
+
+def branch_game_state(state: game_engine.GameState, rng: random.Random) -> int:
+    """Copy the players, their hands and the deck for every legal action, as an object-based search would"""
+    actions = game_engine.legal_actions(state)
+    for action in actions:
+        players = [copy.copy(player) for player in state.players]
+        for player in players:
+            player.cards = player.cards.copy()
+        child = game_engine.GameState(players, state.deck.copy(), rng, state.current_index, state.has_drawn, state.has_taken)
+        target = action[2]
+        game_engine.apply_action(child, (action[0], action[1], players[state.players.index(target)] if target else None))
+    return len(actions)
+
+
+def branch_counts_state(state: rules_engine.CountsState, rng: random.Random) -> int:
+    actions = rules_engine.legal_actions(state)
+    for action in actions:
+        rules_engine.apply_action(state, action, rules_engine.sample_outcome(state, action, rng))
+    return len(actions)
+
+
+def branch_packed_state(state: packed_state.PackedState, rng: random.Random) -> int:
+    actions = packed_state.legal_actions(state)
+    for action in actions:
+        packed_state.apply_action(state, action, packed_state.sample_outcome(state, action, rng))
+    return len(actions)
+
+
+def rollout_counts_state(state: rules_engine.CountsState, rng: random.Random, depth: int = 20) -> int:
+    for step in range(depth):
+        if rules_engine.winner(state) is not None:
+            return step
+        action = rng.choice(rules_engine.legal_actions(state))
+        state = rules_engine.apply_action(state, action, rules_engine.sample_outcome(state, action, rng))
+    return depth
+
+
+def rollout_packed_state(state: packed_state.PackedState, rng: random.Random, depth: int = 20) -> int:
+    """Random playout drawing from the lazily shuffled deck order"""
+    for step in range(depth):
+        if packed_state.winner(state) is not None:
+            return step
+        action = rng.choice(packed_state.legal_actions(state))
+        if action[0] == 'draw':
+            state, gained = packed_state.draw_cards(state, action[1], rng)
+        else:
+            gained = packed_state.sample_outcome(state, action, rng)
+        state = packed_state.apply_action(state, action, gained)
+    return depth
+
+
+def throughput(function: Callable, states: List, repeats: int, seed: int) -> float:
+    """Branches or steps per second of function over all states, after one untimed pass to fill the discard caches"""
+    rng = random.Random(seed)
+    for state in states:
+        function(state, rng)
+    operations = 0
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for state in states:
+            operations += function(state, rng)
+    return operations / (time.perf_counter() - start_time)
+
+
+def run_benchmark(states: int = 300, repeats: int = 20, seed: int = 0) -> Dict[str, float]:
+    game_states = sample_states(states, seed)
+    counts_states = [to_counts_state(state) for state in game_states]
+    packed_states = [packed_state.from_counts_state(state) for state in counts_states]
+
+    results = {
+        'GameState copies': throughput(branch_game_state, game_states, repeats, seed),
+        'CountsState': throughput(branch_counts_state, counts_states, repeats, seed),
+        'PackedState': throughput(branch_packed_state, packed_states, repeats, seed),
+    }
+    print(f"Branch and apply every legal action of {states} states:")
+    for name, rate in results.items():
+        print(f"  {name:17s} {rate:10.0f} branches/s ({rate / results['GameState copies']:.1f}x)")
+
+    rollouts = {
+        'CountsState': throughput(rollout_counts_state, counts_states, repeats, seed),
+        'PackedState': throughput(rollout_packed_state, packed_states, repeats, seed),
+    }
+    print("Random rollouts of up to 20 actions:")
+    for name, rate in rollouts.items():
+        print(f"  {name:17s} {rate:10.0f} actions/s")
+    results.update({f"{name} rollouts": rate for name, rate in rollouts.items()})
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
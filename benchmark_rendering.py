@@ -0,0 +1,59 @@
+import argparse
+import os
+import time
+from typing import Dict
+
+from dirty_rects import RENDER_MODES
+
+
+def hover_sweep(game, frame: int):
+    """Scripted input: the pointer moves to the next card of the human hand every 10 frames"""
+    human = game.players[0]
+    if frame % 10 == 0 and human.cards:
+        game.card_hover(human.cards[(frame // 10) % len(human.cards)].rect.center)
+
+
+def measure(game, mode: str, frames: int) -> Dict[str, float]:
+    game.canvas.mode = mode
+    game.canvas.invalidate()
+    game.canvas.repainted_area = 0
+    start_time, start_cpu = time.perf_counter(), time.process_time()
+    for frame in range(frames):
+        hover_sweep(game, frame)
+        game.draw_game_frame()
+    elapsed, cpu = time.perf_counter() - start_time, time.process_time() - start_cpu
+    return {
+        'fps': frames / elapsed,
+        'cpu_ms': cpu * 1000 / frames,
+        'repainted': game.canvas.repainted_area / (frames * game.width * game.height),
+    }
+
+
+def run_benchmark(frames: int = 600) -> Dict[str, Dict[str, float]]:
+    """Frame rate and CPU time per frame of the game screen, repainted whole and repainting the dirty regions"""
+    from game import Game
+
+    game = Game()
+    game.start_game([game.create_computer_player('AGGRESSIVE', "Bowser"),
+                     game.create_computer_player('DEFENSIVE', "Princess Peach")])
+    game.timeline.finish()                      #Skip the deal animation
+    measure(game, RENDER_MODES[0], 200)         #Let the dealt cards settle
+
+    results = {mode: measure(game, mode, frames) for mode in RENDER_MODES}
+    print(f"Game screen, 3 players, {frames} frames with the pointer sweeping over the human hand "
+          f"({game.width}x{game.height}, no frame cap):")
+    for mode, result in results.items():
+        print(f"  {mode:6s} {result['fps']:8.0f} fps  {result['cpu_ms']:6.2f} ms CPU per frame  "
+              f"{result['repainted']:6.1%} of the screen repainted")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full-repaint and dirty-rect rendering of the game screen")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--headless', action='store_true', help="render without a window or sound")
+    args = parser.parse_args()
+    if args.headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    run_benchmark(args.frames)
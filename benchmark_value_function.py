@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from train_value_function import Decision, self_play_decisions
+from turn_planner import TurnPlanner
+from value_function import ACTION_KINDS, ValueFunction, action_kind, load_value_function
+
+
+def approximation_errors(model: ValueFunction, decisions: List[Decision]) -> Dict[str, List[float]]:
+    """Absolute errors of the predicted expectations, per action kind"""
+    errors = {kind: [] for kind in ACTION_KINDS}
+    for hand, deck, values in decisions:
+        predictions = model.predict_actions(hand, deck, [(action, target) for action, target, _ in values])
+        for (action, _, exact), predicted in zip(values, predictions):
+            errors[ACTION_KINDS[action_kind(action)]].append(abs(predicted - exact))
+    return errors
+
+
+def decision_agreement(model: ValueFunction, decisions: List[Decision]) -> float:
+    """Share of decisions where the predicted best action (or pass) is the exact best action"""
+    agreed = 0
+    for hand, deck, values in decisions:
+        predictions = model.predict_actions(hand, deck, [(action, target) for action, target, _ in values])
+        exact_best = max(range(len(values)), key=lambda index: values[index][2])
+        predicted_best = max(range(len(values)), key=lambda index: predictions[index])
+        exact_choice = exact_best if values[exact_best][2] >= 0 else None
+        predicted_choice = predicted_best if predictions[predicted_best] >= 0 else None
+        agreed += exact_choice == predicted_choice
+    return agreed / len(decisions)
+
+
+def decisions_per_second(decisions: List[Decision], model: ValueFunction, seed: int = 0) -> Dict[str, float]:
+    planner = TurnPlanner(rng=random.Random(seed))
+    start_time = time.perf_counter()
+    for hand, deck, values in decisions:
+        planner.clear_caches()
+        for action, target, _ in values:
+            if target is None:
+                planner.draw_value(hand, deck, action[1])
+            else:
+                planner.take_value(hand, target)
+    exact_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for hand, deck, values in decisions:
+        model.predict_actions(hand, deck, [(action, target) for action, target, _ in values])
+    model_time = time.perf_counter() - start_time
+
+    return {'exact': len(decisions) / exact_time, 'value function': len(decisions) / model_time}
+
+
+def run_benchmark(games: int = 20, seed: int = 12345):
+    model = load_value_function()
+    if model is None:
+        print("No trained weights found, run train_value_function.py first")
+        return
+
+    #Held-out positions: a different seed from the training default
+    decisions = list(self_play_decisions(games, max_turns=60, explore=0.2, rng=random.Random(seed)))
+    print(f"Positions: {len(decisions)} decisions from {games} self-play games")
+
+    print("\nAbsolute error of the predicted expectation:")
+    for kind, kind_errors in approximation_errors(model, decisions).items():
+        if kind_errors:
+            print(f"  {kind:7s} mean {statistics.mean(kind_errors):.4f}  "
+                  f"rmse {np.sqrt(np.mean(np.square(kind_errors))):.4f}  max {max(kind_errors):.4f}  "
+                  f"({len(kind_errors)} actions)")
+
+    print(f"\nSame decision as the exact engine: {decision_agreement(model, decisions):.1%}")
+
+    print("\nDecisions per second:")
+    for name, rate in decisions_per_second(decisions, model, seed).items():
+        print(f"  {name:15s} {rate:10.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,16 +1,10 @@
 import pygame
-from typing import Tuple
+from typing import Optional, Tuple
+from card_textures import HOVER, INVALID, NORMAL, SELECTED, TextureCache
 
 class Card:
-    back_image = None    # Class variable shared by all instances
+    textures = TextureCache()    # Face and back textures shared by all instances, decoded when first displayed
     
-    @classmethod
-    def initialize_back_image(cls, card_width: int, card_height: int):
-        """Initialize card back image"""
-        if cls.back_image is None:
-            cls.back_image = pygame.image.load('cards/card_back.png')
-            cls.back_image = pygame.transform.scale(cls.back_image, (card_width, card_height))
-
     def __init__(self, color: str, number: int, 
                  card_width: int = 60, card_height: int = 100,
                  position: Tuple[int, int] = (0, 0)):
@@ -20,17 +14,12 @@ class Card:
         self.card_width = card_width
         self.card_height = card_height
         
-        #Initialize card front image
-        self.image = pygame.image.load(f'cards/{color}_{number}.png')
-        self.image = pygame.transform.scale(self.image, (card_width, card_height))
-        self.original_image = self.image.copy()
-        
-        #Initialize card back image
-        Card.initialize_back_image(card_width, card_height)
+        self._image: Optional[pygame.Surface] = None     #Drawn texture, the face until update()
+        self._drawn_state: Optional[str] = None          #State and side of the drawn texture
+        self._drawn_face_down = False
         
         # Create rectangle for collision detection and positioning
-        self.rect = self.image.get_rect()
-        self.rect.topleft = position
+        self.rect = pygame.Rect(position, (card_width, card_height))
         
         # States
         self.selected = False
@@ -46,25 +35,44 @@ class Card:
 
     def __str__(self):
         return f"{self.color} {self.number}"
+
+    @property
+    def original_image(self) -> pygame.Surface:
+        return Card.textures.get(self.color, self.number, self.card_width, self.card_height)
+
+    @property
+    def back_image(self) -> pygame.Surface:
+        return Card.textures.back(self.card_width, self.card_height)
+
+    @property
+    def image(self) -> pygame.Surface:
+        return self._image if self._image is not None else self.original_image
+
+    @image.setter
+    def image(self, image: Optional[pygame.Surface]):
+        self._image = image
+        
+    def state(self) -> str:
+        if self.selected:
+            return INVALID if self.invalid else SELECTED
+        return HOVER if self.hover else NORMAL
         
     def update(self):
         if self.current_x != self.target_x:    #Card animation if not at target position
             dx = (self.target_x - self.current_x) / self.animation_speed
             self.current_x += dx
+            if abs(self.target_x - self.current_x) < 0.5:     #Settle instead of approaching the target forever
+                self.current_x = self.target_x
             self.rect.x = int(self.current_x)
         
-        if self.face_down:       #Display card front or back
-            self.image = Card.back_image.copy()
-        else:
-            self.image = self.original_image.copy()
-            
-        if self.selected:        #Visual effects based on current state
-            if self.invalid:  
-                pygame.draw.rect(self.image, (255, 0, 0), (0, 0, self.card_width, self.card_height), 3)
-            else:  
-                pygame.draw.rect(self.image, (0, 255, 0), (0, 0, self.card_width, self.card_height), 3)
-        elif self.hover:  
-            pygame.draw.rect(self.image, (255, 255, 0), (0, 0, self.card_width, self.card_height), 2)
+        state = self.state()
+        if self.face_down != self._drawn_face_down or state != self._drawn_state:    #Only swap textures on changes
+            self._drawn_face_down = self.face_down
+            self._drawn_state = state
+            if self.face_down:       #Display card front or back, with the border of the state
+                self.image = Card.textures.back(self.card_width, self.card_height, state)
+            else:
+                self.image = Card.textures.get(self.color, self.number, self.card_width, self.card_height, state)
             
     
     def set_position(self, x: int, y: int, animate: bool = False):
@@ -84,4 +92,5 @@ class Card:
         self.selected = False
         self.hover = False
         self.invalid = False
-        self.image = self.original_image.copy()
+        self.image = None
+        self._drawn_state = None
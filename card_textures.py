@@ -0,0 +1,86 @@
+import os
+from typing import Dict, Tuple
+
+import pygame
+
+'''
+Card face and card back textures shared by all Card objects.
+
+Every Card used to decode its own PNG and scale it when it was created, so building a deck decoded 80 files
+and each card held its own copy of the same pixels. TextureCache decodes each image once, the first time a
+card with that face is displayed, and keeps one scaled texture per (colour, number, width, height) for all
+cards with that face and size. A card shown at a new size is scaled again from the decoded image, without
+reading the file. The borders of the hover, selected and invalid states are drawn once per face and size
+too, into textures of their own, so a card changing state only swaps references to shared textures, which
+must never be drawn on.
+'''
+
+BACK = 'back'           #Colour of the card back texture, whose number is 0
+
+NORMAL = 'normal'
+HOVER = 'hover'
+SELECTED = 'selected'
+INVALID = 'invalid'     #Selected into a group that is not valid
+BORDERS = {HOVER: ((255, 255, 0), 2), SELECTED: ((0, 255, 0), 3), INVALID: ((255, 0, 0), 3)}     #Colour and width
+
+TextureKey = Tuple[str, int, int, int, str]
+
+
+class TextureCache:
+    def __init__(self, directory: str = 'cards'):
+        self.directory = directory
+        self._sources: Dict[Tuple[str, int], pygame.Surface] = {}        #Decoded images at their file size
+        self._textures: Dict[TextureKey, pygame.Surface] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+    def path(self, colour: str, number: int) -> str:
+        if colour == BACK:
+            return os.path.join(self.directory, 'card_back.png')
+        return os.path.join(self.directory, f'{colour}_{number}.png')
+
+
+    def source(self, colour: str, number: int) -> pygame.Surface:
+        key = (colour, number)
+        if key not in self._sources:
+            image = pygame.image.load(self.path(colour, number))
+            if pygame.display.get_surface() is not None:       #Blitting is faster in the display's pixel format
+                image = image.convert_alpha()
+            self._sources[key] = image
+        return self._sources[key]
+
+
+    def get(self, colour: str, number: int, width: int, height: int, state: str = NORMAL) -> pygame.Surface:
+        """Texture of a face (or of the back if colour is BACK) at a size, with the border of state"""
+        key = (colour, number, width, height, state)
+        texture = self._textures.get(key)
+        if texture is None:
+            self.misses += 1
+            if state == NORMAL:
+                texture = pygame.transform.scale(self.source(colour, number), (width, height))
+            else:
+                texture = self.get(colour, number, width, height).copy()
+                border_colour, border_width = BORDERS[state]
+                pygame.draw.rect(texture, border_colour, (0, 0, width, height), border_width)
+            self._textures[key] = texture
+        else:
+            self.hits += 1
+        return texture
+
+
+    def back(self, width: int, height: int, state: str = NORMAL) -> pygame.Surface:
+        return self.get(BACK, 0, width, height, state)
+
+
+    def memory_bytes(self) -> int:
+        """Pixel memory held by the decoded images and the scaled textures"""
+        return sum(surface.get_pitch() * surface.get_height()
+                   for surface in (*self._sources.values(), *self._textures.values()))
+
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0
+        return (f"{len(self._sources)} images decoded, {len(self._textures)} textures, "
+                f"{self.hits} hits / {lookups} lookups ({hit_rate:.1%}), {self.memory_bytes() / 1024:.0f} KiB held")
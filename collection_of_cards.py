@@ -154,6 +154,54 @@ class CollectionOfCards:
         return sorted(largest_valid_group_cards, key = lambda card: (card.number, card.color))
     
 
+    def largest_group_sizes_with(self, candidates: List[Card]) -> List[int]:
+        """
+        Returns: for each candidate card, the size of the largest valid group (0 if none) once that card alone is added
+        to the collection, i.e. len(largest_valid_group()) of the extended collection.
+        Run boundaries per colour and colour counts per number are built once, so each candidate is answered in constant time.
+        """
+        numbers_by_colour: Dict[str, Set[int]] = defaultdict(set)
+        colours_by_number: Dict[int, Set[str]] = defaultdict(set)
+        for card in self.collection:
+            numbers_by_colour[card.color].add(card.number)
+            colours_by_number[card.number].add(card.color)
+
+        largest_length = 0
+        run_ending_at: Dict[str, Dict[int, int]] = {}      #Length of the run of consecutive numbers ending at each number
+        run_starting_at: Dict[str, Dict[int, int]] = {}    #Length of the run of consecutive numbers starting at each number
+        for colour, numbers in numbers_by_colour.items():
+            sorted_numbers = sorted(numbers)
+            ending, starting = {}, {}
+            for number in sorted_numbers:
+                ending[number] = ending.get(number - 1, 0) + 1
+            for number in reversed(sorted_numbers):
+                starting[number] = starting.get(number + 1, 0) + 1
+            run_ending_at[colour], run_starting_at[colour] = ending, starting
+
+            longest_run = max(ending.values())
+            if longest_run >= 3:
+                largest_length = max(largest_length, longest_run)
+
+        for colours_set in colours_by_number.values():
+            if len(colours_set) >= 3:
+                largest_length = max(largest_length, len(colours_set))
+
+        sizes = []
+        for card in candidates:
+            colour, number = card.color, card.number
+            size = largest_length
+            if number not in numbers_by_colour.get(colour, ()):       #A duplicate card changes no run and no colour count
+                run_length = run_ending_at.get(colour, {}).get(number - 1, 0) + 1 + run_starting_at.get(colour, {}).get(number + 1, 0)
+                if run_length >= 3:
+                    size = max(size, run_length)
+                colours_length = len(colours_by_number.get(number, ())) + 1
+                if colours_length >= 3:
+                    size = max(size, colours_length)
+            sizes.append(size)
+
+        return sizes
+
+
     def all_valid_groups(self) -> List[List[Card]]:
         valid_groups: List[List[Tuple[str, int]]] = []
         valid_groups_cards: List[List[Card]] = []
@@ -1,15 +1,82 @@
 from player import Player
 import random
-from typing import Tuple, Optional, Dict, List
+from typing import Callable, Tuple, Optional, Dict, List
 from collection_of_cards import CollectionOfCards
+from turn_planner import TurnPlanner
+from hand_counts import counts_from_cards, discard_best_groups, add_types, Counts, FULL_DECK
+from rules_engine import CountsState, TURN_START, AFTER_DRAW, AFTER_TAKE, INITIAL_HAND_SIZE
+from mcts import MonteCarloTreeSearch
+from expectimax import ExpectimaxSearch
+from endgame import EndgameSolver
+from opening_table import load_opening_table, OpeningEntry
+from value_function import load_value_function
 import math
 from itertools import combinations
 from concurrent.futures import ThreadPoolExecutor
 
+OPENING_DECK_SLACK = 4      #Cards the deck may have lost since the deal for the opening table to still apply
+
 class ComputerPlayer(Player):
     def __init__(self, name: str):
         super().__init__(name, is_human=False)
         self.MAX_HAND_SIZE = 20
+        self.rng = random.Random()
+        self.endgame_solver = EndgameSolver(self.MAX_HAND_SIZE)
+        self.opening_table = load_opening_table()
+
+
+    def set_rng(self, rng: random.Random):
+        """Use a random stream of its own for all random choices, so the player's decisions can be reproduced"""
+        self.rng = rng
+        for component in (getattr(self, 'turn_planner', None), getattr(self, 'search', None)):
+            if component is not None:
+                component.rng = rng
+
+
+    def counts_state(self, game_state: Dict, phase: int) -> Tuple[CountsState, List[Player]]:
+        """Returns: (CountsState of the game with the current player at index 0, players in the order of the state)"""
+        players = [game_state['current_player']] + list(game_state['other_players'])
+        state = CountsState(tuple(counts_from_cards(player.cards) for player in players), 0, phase)
+        return state, players
+
+
+    def opening_applies(self, game_state: Dict) -> bool:
+        """
+        Whether the opening table has been built and the game is still early.
+        Table values assume a full deck, which is only close to the real deck while the deck is about as large as after the deal.
+        """
+        if self.opening_table is None:
+            return False
+        dealt_deck_size = sum(FULL_DECK) - INITIAL_HAND_SIZE * (len(game_state['other_players']) + 1)
+        return len(game_state['deck_cards']) >= dealt_deck_size - OPENING_DECK_SLACK
+
+
+    def opening_entry(self, game_state: Dict) -> Optional[Tuple[Counts, OpeningEntry]]:
+        """Returns: (hand counts after discarding, opening table entry) when the table applies and holds the hand, None otherwise"""
+        if not self.opening_applies(game_state):
+            return None
+        hand, _ = discard_best_groups(counts_from_cards(game_state['current_player'].cards))
+        entry = self.opening_table.lookup(hand)
+        if entry is None:
+            return None
+        return hand, entry
+
+
+    def endgame_action(self, game_state: Dict, phase: int) -> Optional[Tuple[str, Optional[int], Optional[Player]]]:
+        """
+        Action of the exact endgame solver, or None when the position is not an endgame, is too large to
+        solve or the hand cannot realistically be emptied within the solver's horizon.
+        """
+        state, players = self.counts_state(game_state, phase)
+        if not self.endgame_solver.in_endgame(state):
+            return None
+        solved = self.endgame_solver.solve(state)
+        if solved is None:
+            return None
+        action_type, draw_count, target = solved[0]
+        if action_type == 'take':
+            return ('take', None, players[target])
+        return (action_type, draw_count, None)
 
 
 class RandomStrategyPlayer(ComputerPlayer):
@@ -40,7 +107,7 @@ class RandomStrategyPlayer(ComputerPlayer):
             if len(player.cards) <= 2:
                 choices.remove(('take', None, player))
 
-        return random.choice(choices)
+        return self.rng.choice(choices)
     
 
     def choose_second_action(self, game_state: Dict, first_action: str) -> Tuple[str, Optional[int], Optional[Player]]:
@@ -66,7 +133,7 @@ class RandomStrategyPlayer(ComputerPlayer):
             elif len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 3:
                 choices.remove(('draw', 3, None))
         
-        return random.choice(choices)
+        return self.rng.choice(choices)
         
         
     def get_strategy_name(self) -> str:
@@ -78,6 +145,7 @@ class ExpectationValueStrategyPlayer(ComputerPlayer):
     def __init__(self, name: str):
         super().__init__(name)
         self.continuous_pass_count = 0
+        self.turn_planner = TurnPlanner(self.MAX_HAND_SIZE)
 
     
     def choose_first_action(self, game_state: Dict) -> Tuple[str, Optional[int], Optional[Player]]:
@@ -89,14 +157,12 @@ class ExpectationValueStrategyPlayer(ComputerPlayer):
         """
         if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
             return ('pass', None, None)
-        
-        expectations = self.calculate_expectation(game_state)
 
-        if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 2:
-            expectations.pop(('draw', 2, None))
-            expectations.pop(('draw', 3, None))
-        elif len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 3:
-            expectations.pop(('draw', 3, None))
+        endgame_action = self.endgame_action(game_state, TURN_START)
+        if endgame_action is not None:
+            return endgame_action
+
+        expectations = self.first_action_expectations(game_state)
 
         best_action = max(expectations, key=lambda x: expectations[x])
         action_type = best_action[0]
@@ -106,65 +172,70 @@ class ExpectationValueStrategyPlayer(ComputerPlayer):
         else:
             self.continuous_pass_count = 0
 
-        if self.continuous_pass_count > 2:
+        if self.continuous_pass_count > 2 and len(expectations) > 1:
             expectations.pop(('pass', None, None))
             best_action = max(expectations, key=lambda x: expectations[x])
-            action_type = best_action[0]
             self.continuous_pass_count = 0
-        
-        while action_type == 'take':
-            target_player = best_action[2] 
-            if len(target_player.cards) <= 2:
-                expectations.pop(('take', None, target_player))
-                best_action = max(expectations, key=lambda x: expectations[x])
-                action_type = best_action[0]
-            else:
-                return action_type, None, target_player
 
-        if action_type == 'draw':
-            draw_count = best_action[1]
-            return action_type, draw_count, None
-        
-        if action_type == 'pass':
-            return action_type, None, None
+        return best_action
         
         
     def choose_second_action(self, game_state: Dict, first_action: str) -> Tuple[str, Optional[int], Optional[Player]]:
         if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
             return ('pass', None, None)
-        
-        expectations = self.calculate_expectation(game_state)
 
-        if first_action == 'draw':
-            expectations = {k: v for k, v in expectations.items() if k[0] != 'draw'}
-        elif first_action == 'take':
-            expectations = {k: v for k, v in expectations.items() if k[0] != 'take'}
+        endgame_action = self.endgame_action(game_state, AFTER_DRAW if first_action == 'draw' else AFTER_TAKE)
+        if endgame_action is not None:
+            return endgame_action
+
+        expectations = self.second_action_expectations(game_state, first_action)
 
-            if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 2:
-                expectations.pop(('draw', 2, None))
-                expectations.pop(('draw', 3, None))
-            elif len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 3:
-                expectations.pop(('draw', 3, None))
-        
         best_action = max(expectations, key=lambda x: expectations[x])
-        action_type = best_action[0]
+        return best_action
+
+
+    def first_action_expectations(self, game_state: Dict) -> Dict[Tuple[str, Optional[int], Optional[Player]], float]:
+        #Plan the whole turn, so that each first action is valued together with the best second action after it.
+        #Early in the game, draws are valued from the opening table instead of enumerating the deck
+        _, plan_values = self.turn_planner.plan(game_state, self.opening_draw_values(game_state))
+        return self.turn_planner.first_action_values(plan_values)
+
+
+    def second_action_expectations(self, game_state: Dict, first_action: str) -> Dict[Tuple[str, Optional[int], Optional[Player]], float]:
+        #Values of the second actions were already computed while planning the turn, if the first action ended in an expected outcome
+        return self.turn_planner.second_action_values(game_state, first_action)
+
+
+    def single_actions(self, game_state: Dict, hand: Counts, first_action: Optional[str] = None) -> List[Tuple[Tuple[str, Optional[int], Optional[Player]], Optional[Counts]]]:
+        """
+        Returns: allowed draw and take actions with the target's hand counts for takes (None for draws)
+        first_action: None at the start of the turn, otherwise the first action already played, whose kind is excluded
+        """
+        hand_size, deck_size = sum(hand), len(game_state['deck_cards'])
+        actions = []
+        if first_action != 'draw':
+            for draw_count in range(1, 4):
+                if self.turn_planner.can_draw(hand_size, deck_size, draw_count):
+                    actions.append((('draw', draw_count, None), None))
+        if first_action != 'take':
+            for player in game_state['other_players']:
+                target = counts_from_cards(player.cards)
+                if self.turn_planner.can_take(hand_size, sum(target)):
+                    actions.append((('take', None, player), target))
+        return actions
+
+
+    def opening_draw_values(self, game_state: Dict) -> Optional[Callable[[Counts, int], Optional[float]]]:
+        """Draw expectations of the hands in the opening table, for the turn planner, or None when the table does not apply"""
+        if not self.opening_applies(game_state):
+            return None
+
+        def draw_value(hand: Counts, draw_count: int) -> Optional[float]:
+            entry = self.opening_table.lookup(hand)
+            return None if entry is None else entry.draw_expectations[draw_count - 1]
+        return draw_value
 
-        while action_type == 'take':
-            target_player = best_action[2] 
-            if len(target_player.cards) <= 2:
-                expectations.pop(('take', None, target_player))
-                best_action = max(expectations, key=lambda x: expectations[x])
-                action_type = best_action[0]
-            else:
-                return action_type, None, target_player
 
-        if action_type == 'draw':
-            draw_count = best_action[1]
-            return action_type, draw_count, None
-        
-        if action_type == 'pass':
-            return action_type, None, None
-        
     def calculate_draw_expectation(self, draw_count: int, game_state: Dict) -> Tuple[Tuple, float]:
         collection = CollectionOfCards(game_state['current_player'].cards.copy())
         draw_expected_value = 0
@@ -184,7 +255,7 @@ class ExpectationValueStrategyPlayer(ComputerPlayer):
             sample_list = []
             if combination_count > 2000:
                 parameter = combination_count // 1000
-                sample_list = random.sample(list(combinations(game_state['deck_cards'], draw_count)), combination_count // parameter)    
+                sample_list = self.rng.sample(list(combinations(game_state['deck_cards'], draw_count)), combination_count // parameter)    
                 for combination in sample_list:
                     for card in combination:
                         collection.collection.append(card)
@@ -250,6 +321,45 @@ class ExpectationValueStrategyPlayer(ComputerPlayer):
         return "X-DEFENSIVE"
     
 
+class FastExpectationStrategyPlayer(ExpectationValueStrategyPlayer):
+    """
+    X-DEFENSIVE with the expectations predicted by the learned value function (value_function.py) instead of
+    enumerating the deck. Falls back to the exact calculations when no trained weights are available.
+    """
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.value_function = load_value_function()
+
+
+    def first_action_expectations(self, game_state: Dict) -> Dict[Tuple[str, Optional[int], Optional[Player]], float]:
+        if self.value_function is None:
+            return super().first_action_expectations(game_state)
+        return self.predicted_expectations(game_state)
+
+
+    def second_action_expectations(self, game_state: Dict, first_action: str) -> Dict[Tuple[str, Optional[int], Optional[Player]], float]:
+        if self.value_function is None:
+            return super().second_action_expectations(game_state, first_action)
+        return self.predicted_expectations(game_state, first_action)
+
+
+    def predicted_expectations(self, game_state: Dict, first_action: Optional[str] = None) -> Dict[Tuple[str, Optional[int], Optional[Player]], float]:
+        hand, discarded = discard_best_groups(counts_from_cards(game_state['current_player'].cards))
+        deck = add_types(counts_from_cards(game_state['deck_cards']), discarded)
+        actions = self.single_actions(game_state, hand, first_action)
+
+        expectations = {('pass', None, None): 0}
+        if actions:
+            predictions = self.value_function.predict_actions(hand, deck, actions)
+            for (action, _), prediction in zip(actions, predictions):
+                expectations[action] = prediction
+        return expectations
+
+
+    def get_strategy_name(self) -> str:
+        return "FAST-X"
+
+
 class ProbabilityStrategyPlayer(ComputerPlayer):
     """Computer player that calculates probabilities of getting valid groups before choosing actions"""
     def choose_first_action(self, game_state: Dict) -> Tuple[str, Optional[int], Optional[Player]]:
@@ -261,7 +371,11 @@ class ProbabilityStrategyPlayer(ComputerPlayer):
         """
         if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
             return ('pass', None, None)
-        
+
+        endgame_action = self.endgame_action(game_state, TURN_START)
+        if endgame_action is not None:
+            return endgame_action
+
         probabilities = self.calculate_probability(game_state)
 
         if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 2:
@@ -293,7 +407,11 @@ class ProbabilityStrategyPlayer(ComputerPlayer):
     def choose_second_action(self, game_state: Dict, first_action: str) -> Tuple[str, Optional[int], Optional[Player]]:
         if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
             return ('pass', None, None)
-        
+
+        endgame_action = self.endgame_action(game_state, AFTER_DRAW if first_action == 'draw' else AFTER_TAKE)
+        if endgame_action is not None:
+            return endgame_action
+
         probabilities = self.calculate_probability(game_state)
 
         if first_action == 'draw':
@@ -333,8 +451,14 @@ class ProbabilityStrategyPlayer(ComputerPlayer):
     def calculate_probability(self, game_state: Dict) -> Dict[Tuple[str, Optional[int], Optional[Player]], float]:
         collection = CollectionOfCards(game_state['current_player'].cards.copy())
         probabilities = {}
+        opening = self.opening_entry(game_state)
         
         for draw_count in range(1, 4):
+            if opening is not None:
+                #Early in the game the draw probabilities are read from the opening table
+                probabilities[('draw', draw_count, None)] = opening[1].draw_probabilities[draw_count - 1]
+                continue
+
             valid_count = 0
             if draw_count == 1:
                 for card in game_state['deck_cards']:
@@ -377,30 +501,25 @@ class RulebasedStrategyPlayer(ComputerPlayer):
     """Computer player that chooses actions based on rules"""
 
     def choose_first_action(self, game_state: Dict) -> Tuple[str, Optional[Player]]:
+        endgame_action = self.endgame_action(game_state, TURN_START)
+        if endgame_action is not None:
+            return endgame_action
+
         # Check if it is worthy to take cards from other players, if so, take, if not, draw.
         # When opponents' hands are more than yours, and
         # opponents have one or more particular cards which could make larger valid group in you hands.
         my_hand = CollectionOfCards(game_state['current_player'].cards)
         hand_count = len(my_hand.collection)
-        my_largest_group = my_hand.largest_valid_group()
+        my_largest_size = len(my_hand.largest_valid_group())
         worthy_target = []
 
         for player in game_state['other_players']:
             # player_count = len(player.hand)
             if len(player.cards) <= 2:
                 continue
-            player_hand = CollectionOfCards(player.cards)
-            worthy_or_not = False
-            for card in player_hand.collection:
-                my_hand.collection.append(card)
-                new_largest_group = my_hand.largest_valid_group()
-                if my_largest_group != None and new_largest_group != None:
-                    if len(new_largest_group) > len(my_largest_group):
-                        worthy_or_not = True
-                elif my_largest_group == None and new_largest_group != None:
-                    worthy_or_not = True
-                my_hand.collection.pop()
-            if worthy_or_not == True:
+            # Worthy if any of the player's cards would make my largest valid group larger
+            new_largest_sizes = my_hand.largest_group_sizes_with(player.cards)
+            if any(size > my_largest_size for size in new_largest_sizes):
                 worthy_target.append(player)
 
         if worthy_target != []:
@@ -417,7 +536,7 @@ class RulebasedStrategyPlayer(ComputerPlayer):
                     target_player = player_b
 
                 if player_a_count == player_b_count and player_b_count > hand_count:
-                    target_player = random.choice(worthy_target)
+                    target_player = self.rng.choice(worthy_target)
 
                 if target_player is not None:
                     return ('take', None, target_player )
@@ -430,9 +549,9 @@ class RulebasedStrategyPlayer(ComputerPlayer):
         if hand_count < 8:
             return ('draw', 3, None)
         elif hand_count < 16:
-            return ('draw', random.randint(1, 3), None)
+            return ('draw', self.rng.randint(1, 3), None)
         elif hand_count < 20:
-            return ('draw', random.randint(0, 1), None)
+            return ('draw', self.rng.randint(0, 1), None)
         else:
             return ('pass', None, None)
 
@@ -441,9 +560,13 @@ class RulebasedStrategyPlayer(ComputerPlayer):
         if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
             return ('pass', None, None)
 
+        endgame_action = self.endgame_action(game_state, AFTER_DRAW if first_action == 'draw' else AFTER_TAKE)
+        if endgame_action is not None:
+            return endgame_action
+
         my_hand = CollectionOfCards(game_state['current_player'].cards)
         hand_count = len(my_hand.collection)
-        my_largest_group = my_hand.largest_valid_group()
+        my_largest_size = len(my_hand.largest_valid_group())
 
         if first_action == 'draw':
             worthy_target = []
@@ -451,18 +574,9 @@ class RulebasedStrategyPlayer(ComputerPlayer):
                 # player_count = len(player.hand)
                 if len(player.cards) <= 2:
                     continue
-                player_hand = CollectionOfCards(player.cards)
-                worthy_or_not = False
-                for card in player_hand.collection:
-                    my_hand.collection.append(card)
-                    new_largest_group = my_hand.largest_valid_group()
-                    if my_largest_group != None and new_largest_group != None:
-                        if len(new_largest_group) > len(my_largest_group):
-                            worthy_or_not = True
-                    elif my_largest_group == None and new_largest_group != None:
-                        worthy_or_not = True
-                    my_hand.collection.pop()
-                if worthy_or_not == True:
+                # Worthy if any of the player's cards would make my largest valid group larger
+                new_largest_sizes = my_hand.largest_group_sizes_with(player.cards)
+                if any(size > my_largest_size for size in new_largest_sizes):
                     worthy_target.append(player)
 
             if worthy_target != []:
@@ -479,7 +593,7 @@ class RulebasedStrategyPlayer(ComputerPlayer):
                         target_player = player_b
 
                     if player_a_count == player_b_count and player_b_count > hand_count:
-                        target_player = random.choice(worthy_target)
+                        target_player = self.rng.choice(worthy_target)
 
                     if target_player is not None:
                         return ('take', None, target_player)
@@ -495,11 +609,66 @@ class RulebasedStrategyPlayer(ComputerPlayer):
             if hand_count < 8:
                 return ('draw', 3, None)
             elif hand_count < 16:
-                return ('draw', random.randint(1, 3), None)
+                return ('draw', self.rng.randint(1, 3), None)
             elif hand_count < 20:
-                return ('draw', random.randint(0, 1), None)
+                return ('draw', self.rng.randint(0, 1), None)
             else:
                 return ('pass', None, None)
 
     def get_strategy_name(self) -> str:
         return "AGGRESSIVE"
+
+
+class SearchStrategyPlayer(ComputerPlayer):
+    """Base class of the computer players that search a headless copy of the game; subclasses set self.search"""
+    def choose_first_action(self, game_state: Dict) -> Tuple[str, Optional[int], Optional[Player]]:
+        """
+        Returns: (action_type, draw_count, target_player)
+        action_type: 'draw', 'take', or 'pass'
+        draw_count: number of cards to draw if action is 'draw', None otherwise
+        target_player: Player object if action is 'take', None otherwise
+        """
+        if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
+            return ('pass', None, None)
+        return self.search_action(game_state, TURN_START)
+
+
+    def choose_second_action(self, game_state: Dict, first_action: str) -> Tuple[str, Optional[int], Optional[Player]]:
+        if len(game_state['current_player'].cards) > self.MAX_HAND_SIZE - 1:
+            return ('pass', None, None)
+        return self.search_action(game_state, AFTER_DRAW if first_action == 'draw' else AFTER_TAKE)
+
+
+    def search_action(self, game_state: Dict, phase: int) -> Tuple[str, Optional[int], Optional[Player]]:
+        """Convert the game into a CountsState with the current player at index 0, search it, and convert the chosen action back"""
+        endgame_action = self.endgame_action(game_state, phase)
+        if endgame_action is not None:
+            return endgame_action
+
+        state, players = self.counts_state(game_state, phase)
+        action_type, draw_count, target = self.search.best_action(state)
+        if action_type == 'take':
+            return ('take', None, players[target])
+        return (action_type, draw_count, None)
+
+
+class MCTSStrategyPlayer(SearchStrategyPlayer):
+    """Computer player that runs Monte Carlo Tree Search on a headless copy of the game"""
+    def __init__(self, name: str, iterations: int = 3000, time_limit: float = 2.0):
+        super().__init__(name)
+        self.search = MonteCarloTreeSearch(iterations=iterations, time_limit=time_limit, max_hand_size=self.MAX_HAND_SIZE)
+
+
+    def get_strategy_name(self) -> str:
+        return "MCTS"
+
+
+class ExpectimaxStrategyPlayer(SearchStrategyPlayer):
+    """Computer player that looks several turns ahead with depth-limited expectimax on a headless copy of the game"""
+    def __init__(self, name: str, time_limit: float = 2.0, max_depth: int = 6):
+        super().__init__(name)
+        self.search = ExpectimaxSearch(time_limit=time_limit, max_depth=max_depth, max_hand_size=self.MAX_HAND_SIZE)
+
+
+    def get_strategy_name(self) -> str:
+        return "EXPECTIMAX"
@@ -0,0 +1,83 @@
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Set, Tuple
+
+'''
+Background decisions of the computer players.
+
+The GUI used to call choose_first_action and choose_second_action on the thread that handles events and
+draws, so a slow strategy (X-DEFENSIVE, X-AGGRESSIVE on a large deck) froze the window for seconds.
+DecisionWorker runs each call on a daemon thread and returns a Future that the game polls once per frame,
+drawing a thinking indicator meanwhile.
+
+The strategies run in the GUI process because they are Player objects holding their random stream, pass
+counters and search caches between turns, and Cards cannot be pickled; threads can share them. The call
+gets a snapshot instead of the live game: copies of the deck and of the other players with copies of their
+hands, so the game can change (a restart deals new hands from the same deck) while it runs. Only the
+deciding player itself is shared, since the decision advances its random stream.
+
+A thread cannot be stopped: cancel() cancels the calls that have not started, and a running call finishes
+in the background with nobody polling its result.
+'''
+
+
+def decision_snapshot(game_state: Dict, decider) -> Tuple[Dict, Dict[int, object]]:
+    """
+    A copy of a game_state dictionary for a decision of decider, where the other players are copies with
+    copies of their hands and the deck is a copy, and the live players by the ids of their copies.
+    """
+    snapshot = dict(game_state)
+    originals = {}
+
+    def player_copy(player):
+        if player is decider:
+            return player
+        clone = copy.copy(player)
+        clone.cards = list(player.cards)
+        originals[id(clone)] = player
+        return clone
+
+    snapshot['current_player'] = player_copy(game_state['current_player'])
+    snapshot['other_players'] = [player_copy(player) for player in game_state['other_players']]
+    snapshot['deck_cards'] = list(game_state['deck_cards'])
+    return snapshot, originals
+
+
+def real_action(action, originals: Dict[int, object]):
+    """An action chosen on a snapshot, naming the live player instead of its copy"""
+    action_type, draw_count, target = action
+    return action_type, draw_count, originals.get(id(target), target)
+
+
+class DecisionWorker:
+    def __init__(self):
+        self._futures: Set[Future] = set()
+
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Run function(*args) on a background thread"""
+        future: Future = Future()
+        self._futures.add(future)
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = function(*args)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+            finally:
+                self._futures.discard(future)
+
+        threading.Thread(target=run, name="decision", daemon=True).start()
+        return future
+
+
+    def cancel(self):
+        """Cancel every call that has not finished; the results of running calls are dropped"""
+        for future in list(self._futures):
+            future.cancel()
+        self._futures.clear()
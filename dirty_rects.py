@@ -0,0 +1,171 @@
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import pygame
+
+'''
+Dirty-rectangle rendering of the game screen.
+
+The game screen used to be repainted and flipped whole on every frame, although most frames change nothing
+or only a few cards. DirtyRectScreen records the drawing calls of a frame (blits, fills and rectangles)
+instead of drawing them and compares them with the calls of the previous frame. Only the regions where a
+call was added, removed or moved are repainted, by replaying every call that overlaps them clipped to the
+region, and only those regions are sent to the display with pygame.display.update.
+
+Blits are compared by the surface drawn and its position, so an unchanged scene must be drawn with the same
+surface objects on every frame (cached card textures and text) and those surfaces must never be drawn on.
+Calls also carry the layer they were drawn in (see begin_layer), so a surface moving from the scene to the
+animation sprites drawn over it is repainted even where it stays in place.
+Outside begin_frame and end_frame, and in full mode, calls draw directly on the screen, as the popups do;
+whoever draws directly must invalidate() the screen so the next frame is repainted whole.
+'''
+
+FULL = 'full'
+DIRTY = 'dirty'
+RENDER_MODES = (FULL, DIRTY)
+
+FULL_REPAINT_SHARE = 0.5        #Repaint the whole screen at once when the changed regions cover more of it
+
+BLIT = 0
+FILL = 1
+RECT = 2
+
+DrawCall = Tuple[int, object, Tuple[int, int, int, int], object, int]     #Kind, surface or colour, bounds, area or width, layer
+
+
+class DirtyRectScreen:
+    def __init__(self, surface: pygame.Surface, mode: str = DIRTY):
+        self.surface = surface
+        self.mode = mode
+        self.recording = False
+        self.layer = 0
+        self._calls: List[DrawCall] = []
+        self._previous: Optional[List[DrawCall]] = None      #Calls shown on the screen, None if unknown
+
+        self.frames = 0
+        self.repainted_area = 0                             #Pixels sent to the display over all frames
+
+
+    def set_surface(self, surface: pygame.Surface):
+        """Draw on a new display surface, after the window was resized"""
+        self.surface = surface
+        self.invalidate()
+
+
+    def invalidate(self):
+        """The screen was drawn on directly: repaint the whole next frame"""
+        self._previous = None
+
+
+    def begin_frame(self):
+        self.recording = self.mode == DIRTY
+        self.layer = 0
+        self._calls = []
+
+
+    def begin_layer(self):
+        """The following calls are drawn over the earlier ones"""
+        self.layer += 1
+
+
+    def blit(self, source: pygame.Surface, dest, area=None) -> pygame.Rect:
+        if not self.recording:
+            return self.surface.blit(source, dest, area)
+        width, height = (area[2], area[3]) if area else source.get_size()
+        bounds = (int(dest[0]), int(dest[1]), width, height)
+        self._calls.append((BLIT, source, bounds, tuple(area) if area else None, self.layer))
+        return pygame.Rect(bounds)
+
+
+    def blits(self, blit_sequence: List[Tuple[pygame.Surface, object]]):
+        """Surface.blits of (source, dest) pairs, without returning their rectangles"""
+        if not self.recording:
+            self.surface.blits(blit_sequence, doreturn=False)
+            return
+        for source, dest in blit_sequence:
+            width, height = source.get_size()
+            self._calls.append((BLIT, source, (int(dest[0]), int(dest[1]), width, height), None, self.layer))
+
+
+    def fill(self, colour, rect=None) -> pygame.Rect:
+        if not self.recording:
+            return self.surface.fill(colour, rect)
+        bounds = tuple(pygame.Rect(rect)) if rect else tuple(self.surface.get_rect())
+        self._calls.append((FILL, tuple(colour), bounds, None, self.layer))
+        return pygame.Rect(bounds)
+
+
+    def draw_rect(self, colour, rect, width: int = 0) -> pygame.Rect:
+        """pygame.draw.rect on the screen"""
+        if not self.recording:
+            return pygame.draw.rect(self.surface, colour, rect, width)
+        bounds = tuple(pygame.Rect(rect))
+        self._calls.append((RECT, tuple(colour), bounds, width, self.layer))
+        return pygame.Rect(bounds)
+
+
+    def draw(self, call: DrawCall):
+        kind, source, bounds, extra, _ = call
+        if kind == BLIT:
+            self.surface.blit(source, bounds[:2], extra)
+        elif kind == FILL:
+            self.surface.fill(source, bounds)
+        else:
+            pygame.draw.rect(self.surface, source, bounds, extra)
+
+
+    def changed_regions(self) -> List[pygame.Rect]:
+        """Regions of the screen where the recorded calls differ from the previous frame's"""
+        screen_rect = self.surface.get_rect()
+        if self._previous is None:
+            return [screen_rect]
+        if self._calls == self._previous:
+            return []
+
+        previous, current = Counter(self._previous), Counter(self._calls)
+        changed = list((previous - current).elements()) + list((current - previous).elements())
+        if not changed:                                     #Only the drawing order changed
+            return [screen_rect]
+        regions = merge_rects([pygame.Rect(bounds).clip(screen_rect) for _, _, bounds, _, _ in changed])
+        if sum(rect.width * rect.height for rect in regions) > FULL_REPAINT_SHARE * screen_rect.width * screen_rect.height:
+            return [screen_rect]
+        return regions
+
+
+    def end_frame(self) -> List[pygame.Rect]:
+        """Present the frame; returns the regions sent to the display"""
+        self.frames += 1
+        if not self.recording:
+            pygame.display.flip()
+            self.repainted_area += self.surface.get_width() * self.surface.get_height()
+            return [self.surface.get_rect()]
+        self.recording = False
+
+        regions = self.changed_regions()
+        for region in regions:
+            self.surface.set_clip(region)
+            for call in self._calls:
+                if region.colliderect(call[2]):
+                    self.draw(call)
+        self.surface.set_clip(None)
+        self._previous = self._calls
+
+        if regions:
+            pygame.display.update(regions)
+            self.repainted_area += sum(region.width * region.height for region in regions)
+        return regions
+
+
+def merge_rects(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    """Union the overlapping rectangles, dropping empty ones"""
+    merged: List[pygame.Rect] = []
+    for rect in rects:
+        if not rect.width or not rect.height:
+            continue
+        rect = rect.copy()
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -0,0 +1,229 @@
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Optional, Tuple
+
+from hand_counts import NUMBER_COUNT, TYPE_COUNT, Counts, add_types, forms_group_with, max_discard, remove_types
+from rules_engine import (AFTER_DRAW, AFTER_TAKE, MAX_HAND_SIZE, PASS_ACTION, TURN_START, Action, CountsState, action_outcomes,
+                          apply_action, canonical_key, deck_counts, legal_actions, take_allowed, winner)
+
+EXACT_OUTCOMES = float('inf')   #Sampling threshold that makes action_outcomes enumerate every draw
+MAX_GAIN_PER_TURN = 4           #Draw 3 and take 1
+ENDGAME_HAND_SIZE = 3           #Hands this small are endgames whatever the deck
+ENDGAME_DECK_SIZE = 15          #Decks this small make an endgame of any hand that can still be completed
+
+
+def distinct_draw_count(deck: Counts, draw_count: int) -> int:
+    """Number of distinct multisets of card types that can be drawn from deck"""
+    coefficients = [1] + [0] * draw_count
+    for count in deck:
+        if not count:
+            continue
+        updated = [0] * (draw_count + 1)
+        for size, ways in enumerate(coefficients):
+            if ways:
+                for extra in range(min(count, draw_count - size) + 1):
+                    updated[size + extra] += ways
+        coefficients = updated
+    return coefficients[draw_count]
+
+
+def isolated_count(counts: Counts) -> int:
+    """
+    Number of cards held with no other held card that could share a group of 3 with them
+    (same colour within 2 numbers, or same number). A group holding one of them has at least 2 extra
+    cards and at most 2 of them (a run of up to 5 numbers with both ends held), so completing the hand
+    needs at least this many extra cards.
+    """
+    held = [t for t in range(TYPE_COUNT) if counts[t]]
+    isolated = 0
+    for t in held:
+        for u in held:
+            if u != t and (u % NUMBER_COUNT == t % NUMBER_COUNT
+                           or (u // NUMBER_COUNT == t // NUMBER_COUNT and abs(u - t) <= 2)):
+                break
+        else:
+            isolated += counts[t]       #Copies of one type never share a group, so each needs its own
+    return isolated
+
+
+@lru_cache(maxsize=1 << 18)
+def can_complete(counts: Counts, budget: int) -> bool:
+    """
+    Whether at most budget extra cards make the whole hand discardable as disjoint valid groups.
+    Which cards are left in the deck is ignored, so a False means the player cannot empty its hand
+    before gaining more than budget cards.
+    """
+    if not any(counts):
+        return True
+    if isolated_count(counts) > budget:
+        return False
+
+    t = 0
+    while not counts[t]:
+        t += 1
+    colour_start = t - t % NUMBER_COUNT
+    number = t % NUMBER_COUNT
+
+    #Runs containing t; runs longer than 5 split into shorter runs, so they are never needed
+    for start in range(max(colour_start, t - 4), t + 1):
+        for end in range(max(t, start + 2), min(start + 4, colour_start + NUMBER_COUNT - 1) + 1):
+            held = [u for u in range(start, end + 1) if counts[u]]
+            missing = end - start + 1 - len(held)
+            if missing <= budget and can_complete(remove_types(counts, held), budget - missing):
+                return True
+
+    #Sets of t's number; t is the smallest type held, so t's colour is the first one present
+    other_colours = [u for u in range(number, TYPE_COUNT, NUMBER_COUNT) if u != t]
+    for size in (2, 3):
+        for others in combinations(other_colours, size):
+            held = [t] + [u for u in others if counts[u]]
+            missing = size + 1 - len(held)
+            if missing <= budget and can_complete(remove_types(counts, held), budget - missing):
+                return True
+
+    return False
+
+
+class EndgameSolver:
+    """
+    Exact solver for the end of a game, when hands are small enough to search every outcome.
+
+    The current player's problem is solved as a finite-horizon decision process: it maximises the
+    probability of emptying its hand within the next `turns` of its own turns, with every draw and
+    take outcome enumerated exactly. The opponents' hands are held as they are between its turns (they
+    still lose the cards it takes), so the result is the optimum against opponents that do not interfere.
+    Positions that cannot be completed (can_complete) with the cards still gainable within the horizon
+    are worth 0 without being searched. Values are memoised per canonical state and kept between decisions,
+    so once a position has been solved the following decisions of the same endgame are table lookups.
+    """
+    def __init__(self, max_hand_size: int = MAX_HAND_SIZE, max_turns: int = 2, state_limit: int = 50000,
+                 min_win_probability: float = 0.25, max_entries: int = 1 << 20):
+        self.MAX_HAND_SIZE = max_hand_size
+        self.max_turns = max_turns
+        self.state_limit = state_limit
+        self.min_win_probability = min_win_probability
+        self.max_entries = max_entries
+        self._memo: Dict[tuple, Tuple[float, Action]] = {}
+
+
+    def in_endgame(self, state: CountsState) -> bool:
+        """
+        Whether solving state is worth it, checked without searching: the current player's hand or the deck
+        is small, the hand can still be completed within the horizon, and the horizon is at least one turn
+        """
+        hand = state.hands[state.current]
+        if sum(hand) > ENDGAME_HAND_SIZE and sum(deck_counts(state)) > ENDGAME_DECK_SIZE:
+            return False
+        if not can_complete(hand, self._gain_left(state.phase, self.max_turns)):
+            return False
+        return self.horizon(state) > 0
+
+
+    def estimate_states(self, state: CountsState) -> int:
+        """Rough number of positions in one turn of the current player: actions times their distinct outcomes"""
+        deck = deck_counts(state)
+        draws = sum(distinct_draw_count(deck, draw_count) for draw_count in range(1, 4))
+        hand_size = sum(state.hands[state.current])
+        takes = sum(sum(1 for count in hand if count) for index, hand in enumerate(state.hands)
+                    if index != state.current and take_allowed(hand_size, sum(hand), self.MAX_HAND_SIZE))
+        return 1 + draws * (1 + takes) + takes * (1 + draws)
+
+
+    def horizon(self, state: CountsState) -> int:
+        """Number of turns that can be solved within state_limit, 0 if not even one turn"""
+        per_turn = self.estimate_states(state)
+        turns, states = 0, 1
+        while turns < self.max_turns and states * per_turn <= self.state_limit:
+            states *= per_turn
+            turns += 1
+        return turns
+
+
+    def solve(self, state: CountsState) -> Optional[Tuple[Action, float]]:
+        """
+        Returns: (best action, probability of emptying the hand within the horizon), or None when the
+        state is too large to solve or the probability is below min_win_probability, in which case
+        the player's own strategy should decide.
+        """
+        if winner(state) is not None:
+            return None
+        turns = self.horizon(state)
+        if turns == 0:
+            return None
+
+        if len(self._memo) > self.max_entries:
+            self._memo.clear()
+        value, action = self._best(state, turns)
+        if value < self.min_win_probability or value <= 0:
+            return None
+        return action, value
+
+
+    def _best(self, state: CountsState, turns: int) -> Tuple[float, Action]:
+        if not can_complete(state.hands[state.current], self._gain_left(state.phase, turns)):
+            return 0.0, PASS_ACTION
+
+        key = (canonical_key(state), turns)
+        if key in self._memo:
+            return self._memo[key]
+
+        best_value, best_action = 0.0, PASS_ACTION
+        for action in legal_actions(state, self.MAX_HAND_SIZE):
+            if action == PASS_ACTION:
+                value = self._next_turn(apply_action(state, action), state.current, turns)
+            else:
+                value = self._action_value(state, action, turns)
+            if value > best_value:
+                best_value, best_action = value, action
+                if best_value >= 1.0:
+                    break
+
+        self._memo[key] = (best_value, best_action)
+        return best_value, best_action
+
+
+    def _action_value(self, state: CountsState, action: Action, turns: int) -> float:
+        outcomes = action_outcomes(state, action, sampling_threshold=EXACT_OUTCOMES)
+        hand = state.hands[state.current]
+
+        if turns == 1 and state.phase != TURN_START:
+            #Last action of the horizon: only outcomes that empty the hand count
+            return sum(probability for gained, probability in outcomes if self._empties(hand, gained))
+
+        if state.phase == TURN_START:
+            gain_left = self._gain_left(AFTER_DRAW if action[0] == 'draw' else AFTER_TAKE, turns)
+        else:
+            gain_left = self._gain_left(TURN_START, turns - 1)
+
+        value = 0.0
+        for gained, probability in outcomes:
+            if not can_complete(add_types(hand, gained), gain_left):
+                continue
+            next_state = apply_action(state, action, gained)
+            if next_state.current == state.current and winner(next_state) is None:
+                value += probability * self._best(next_state, turns)[0]
+            else:
+                value += probability * self._next_turn(next_state, state.current, turns)
+        return value
+
+
+    def _next_turn(self, state: CountsState, player: int, turns: int) -> float:
+        """Value once player's turn has ended: the opponents' hands stay as they are until its next turn"""
+        won = winner(state)
+        if won is not None:
+            return 1.0 if won == player else 0.0
+        if turns == 1:
+            return 0.0
+        return self._best(CountsState(state.hands, player, TURN_START), turns - 1)[0]
+
+
+    def _gain_left(self, phase: int, turns: int) -> int:
+        """Most cards the player can still gain within the horizon"""
+        if phase == TURN_START:
+            return MAX_GAIN_PER_TURN * turns
+        return (1 if phase == AFTER_DRAW else 3) + MAX_GAIN_PER_TURN * (turns - 1)
+
+
+    def _empties(self, hand: Counts, gained: Tuple[int, ...]) -> bool:
+        new_hand = add_types(hand, gained)
+        return forms_group_with(new_hand, gained) and max_discard(new_hand) == sum(new_hand)
@@ -0,0 +1,192 @@
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from rules_engine import (MAX_HAND_SIZE, PASS_ACTION, Action, CountsState, action_outcomes, apply_action,
+                          canonical_key, legal_actions, winner)
+
+#Transposition table flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class _Timeout(Exception):
+    pass
+
+
+class ExpectimaxSearch:
+    """
+    Depth-limited expectimax over CountsState with iterative deepening under a time budget.
+    Depth is counted in decisions: a turn takes up to two of them (first and second action), so a
+    depth of 6 covers about three turns including the opponents' replies.
+
+    Values are the searching player's chance of winning, in [0, 1]: 1 for a win, 0 for a loss, and
+    for unfinished positions the share of the win in inverse proportion to the hand sizes. The searching
+    player maximises it and opponents are assumed to minimise it, so decision nodes use alpha-beta and
+    chance nodes (draws and takes) use Star1 pruning, which cuts a chance node as soon as the bounds of
+    its unexplored outcomes can no longer bring it inside the window.
+    Exact chance-node values are memoised per canonical state, so they are reused across transpositions
+    and across iterations of the deepening.
+    """
+    LOWEST_VALUE = 0.0
+    HIGHEST_VALUE = 1.0
+
+    def __init__(self, time_limit: float = 2.0, max_depth: int = 6, chance_samples: int = 8,
+                 max_hand_size: int = MAX_HAND_SIZE, rng: Optional[random.Random] = None):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.chance_samples = chance_samples
+        self.MAX_HAND_SIZE = max_hand_size
+        self.rng = rng or random.Random()
+
+        self.root_player = 0
+        self.deadline = 0.0
+        self.completed_depth = 0
+        self.node_count = 0
+
+        self._table: Dict[tuple, Tuple[float, int, Optional[Action], int]] = {}
+        self._chance_values: Dict[tuple, float] = {}
+        self._outcomes_cache: Dict[tuple, List[Tuple[Tuple[int, ...], float]]] = {}
+
+
+    def best_action(self, state: CountsState) -> Action:
+        """Deepen one decision at a time until max_depth or the time limit, and return the best action of the deepest completed search"""
+        actions = legal_actions(state, self.MAX_HAND_SIZE)
+        if len(actions) == 1:
+            return actions[0]
+
+        self.root_player = state.current
+        self.deadline = time.perf_counter() + self.time_limit
+        self.completed_depth = 0
+        self.node_count = 0
+        self._table.clear()
+        self._chance_values.clear()
+        self._outcomes_cache.clear()
+
+        best_action = actions[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                _, action = self._search(state, depth, self.LOWEST_VALUE, self.HIGHEST_VALUE)
+            except _Timeout:
+                break
+            best_action = action
+            self.completed_depth = depth
+
+        return best_action
+
+
+    def _search(self, state: CountsState, depth: int, alpha: float, beta: float) -> Tuple[float, Optional[Action]]:
+        self.node_count += 1
+        if self.node_count & 255 == 0 and time.perf_counter() > self.deadline:
+            raise _Timeout()
+
+        won = winner(state)
+        if won is not None:
+            return (self.HIGHEST_VALUE if won == self.root_player else self.LOWEST_VALUE), None
+        if depth == 0:
+            return self._evaluate(state), None
+
+        #One entry per state: its best action orders the moves at any depth, its value only bounds a search of the same depth
+        key = canonical_key(state)
+        entry = self._table.get(key)
+        previous_best = None
+        if entry is not None:
+            value, flag, previous_best, entry_depth = entry
+            if entry_depth == depth:
+                if flag == EXACT:
+                    return value, previous_best
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, previous_best
+
+        actions = legal_actions(state, self.MAX_HAND_SIZE)
+        if previous_best in actions:              #Try the best action of the previous iteration first
+            actions.remove(previous_best)
+            actions.insert(0, previous_best)
+
+        maximising = state.current == self.root_player
+        original_alpha, original_beta = alpha, beta
+        best_value = self.LOWEST_VALUE - 1 if maximising else self.HIGHEST_VALUE + 1
+        best_action = actions[0]
+
+        for action in actions:
+            value = self._chance_value(state, action, depth, alpha, beta)
+            if maximising:
+                if value > best_value:
+                    best_value, best_action = value, action
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_action = value, action
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_value >= original_beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._table[key] = (best_value, flag, best_action, depth)
+        return best_value, best_action
+
+
+    def _chance_value(self, state: CountsState, action: Action, depth: int, alpha: float, beta: float) -> float:
+        """Expected value of an action over its outcomes, with Star1 cut-offs"""
+        if action == PASS_ACTION:
+            return self._search(apply_action(state, action), depth - 1, alpha, beta)[0]
+
+        key = (canonical_key(state), action, depth)
+        if key in self._chance_values:
+            return self._chance_values[key]
+
+        total = 0.0
+        remaining = 1.0
+        for gained, probability in self._outcomes(state, action):
+            remaining -= probability
+            #Window for this outcome, outside of which the whole chance node is cut off
+            child_alpha = (alpha - total - remaining * self.HIGHEST_VALUE) / probability
+            child_beta = (beta - total - remaining * self.LOWEST_VALUE) / probability
+            value, _ = self._search(apply_action(state, action, gained), depth - 1,
+                                    max(self.LOWEST_VALUE, child_alpha), min(self.HIGHEST_VALUE, child_beta))
+            total += probability * value
+
+            if total + remaining * self.HIGHEST_VALUE <= alpha:
+                return total + remaining * self.HIGHEST_VALUE
+            if total + remaining * self.LOWEST_VALUE >= beta:
+                return total + remaining * self.LOWEST_VALUE
+
+        self._chance_values[key] = total
+        return total
+
+
+    def _outcomes(self, state: CountsState, action: Action) -> List[Tuple[Tuple[int, ...], float]]:
+        """
+        Outcomes of an action, reduced to at most chance_samples outcomes sampled by probability.
+        Kept per exact state (outcomes are card types, so they are not shared between colour renamings),
+        which keeps memoised values consistent between iterations.
+        """
+        key = (state, action)
+        if key not in self._outcomes_cache:
+            outcomes = action_outcomes(state, action, rng=self.rng)
+            if len(outcomes) > self.chance_samples:
+                sampled = self.rng.choices([gained for gained, _ in outcomes],
+                                           weights=[probability for _, probability in outcomes], k=self.chance_samples)
+                counts: Dict[Tuple[int, ...], int] = {}
+                for gained in sampled:
+                    counts[gained] = counts.get(gained, 0) + 1
+                outcomes = [(gained, count / self.chance_samples) for gained, count in counts.items()]
+            outcomes.sort(key=lambda outcome: outcome[1], reverse=True)
+            self._outcomes_cache[key] = outcomes
+        return self._outcomes_cache[key]
+
+
+    def _evaluate(self, state: CountsState) -> float:
+        """Share of the win of the searching player, in inverse proportion to the hand sizes"""
+        weights = [1 / (1 + sum(hand)) for hand in state.hands]
+        return weights[self.root_player] / sum(weights)
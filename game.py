@@ -8,14 +8,25 @@ os.dup2(devnull, stderr_fd)
 '''
 
 import pygame
+import argparse
 import json
 from card import Card
 from typing import List, Tuple, Dict, Optional, Set
 from player import Player
 from collection_of_cards import CollectionOfCards
-import random
+import computer_player
 from computer_player import ComputerPlayer, RandomStrategyPlayer, ExpectationValueStrategyPlayer, ProbabilityStrategyPlayer, RulebasedStrategyPlayer
+import game_engine
+from game_log import HUMAN, GameLog
+from replay import ReplaySeeker, describe_record
+from hand_counts import COLOURS
+import time
 from animations import CardAnimation  
+from tweens import Script, Timeline
+from panel_model import PanelModel
+from dirty_rects import RENDER_MODES, DirtyRectScreen
+from decision_worker import DecisionWorker, decision_snapshot, real_action
+from hint_worker import HintCache, HintWorker, discard_cards, hint_cache_key, hint_updates, live_update, speculative_hints
 
 with open("config.json") as config_file:
     config = json.load(config_file)
@@ -24,6 +35,7 @@ class GamePhase:
     WELCOME = "welcome"
     PLAYER_TURN = "player_turn"
     GAME_OVER = "game_over"
+    REPLAY = "replay"
 
 
 class OptionBox():
@@ -102,6 +114,7 @@ class Game:
         os.environ['SDL_VIDEO_CENTERED'] = '1'
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE | pygame.SHOWN)
         pygame.display.set_caption("Notty Game")
+        self.canvas = DirtyRectScreen(self.screen)     #Game screen drawing, repainting only what changed between frames
 
         # Card layout constants
         self.CARD_WIDTH = 60
@@ -216,16 +229,21 @@ class Game:
         self.MAX_HAND_SIZE = 20
         self.INITIAL_HAND_SIZE = 5
 
+        self.seed = config.get('seed', game_engine.new_seed())     #A fixed seed in config.json replays the same deals and shuffles
+        self.rng = game_engine.derived_rng(self.seed, 'game')
+        self.game_log: Optional[GameLog] = None
+        self.state: Optional[game_engine.GameState] = None     #The rules' view of the game, every action is played on it
+
         self.deck: List[Card] = [              #Deck
             Card(colour, number, 
                  card_width=self.CARD_WIDTH, 
                  card_height=self.CARD_HEIGHT,
                  position=(0, 0))
-            for colour in {'red', 'blue', 'green', 'yellow'} 
+            for colour in COLOURS
             for number in range(1, 11) 
             for _ in range(2)
         ]
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
         self.selected_cards: List[Card] = []   #Selected cards by human player pointer
 
@@ -246,21 +264,22 @@ class Game:
         self.deck_area = pygame.Rect(50, 0, self.CARD_WIDTH, self.CARD_HEIGHT)   #Deck area
         self.temp_draw_area = pygame.Rect(0, 0, self.CARD_WIDTH, self.CARD_HEIGHT) #After drawing cards, temporary area to display drawn cards
 
-        Card.initialize_back_image(self.CARD_WIDTH, self.CARD_HEIGHT)    #Initialize card back image
-
-        self.card_back = pygame.image.load('cards/card_back.png')
-        self.card_back = pygame.transform.scale(self.card_back, (self.CARD_WIDTH, self.CARD_HEIGHT))
+        self.card_back = Card.textures.back(self.CARD_WIDTH, self.CARD_HEIGHT)     #The same texture as the cards' backs
 
         self.clock = pygame.time.Clock()        #Clock for animation
         self.FPS = 60                           #Frames per second
 
+        self.timeline = Timeline()              #Animations and turn sequences, ticked once per frame by run()
+        self.hidden_players: List[Player] = []  #Players whose hands are being animated instead of drawn
+        self.hide_temp_cards = False            #Drawn cards are being animated instead of drawn in the temporary draw area
+        self.hidden_cards: List[Card] = []      #Cards an animation is still bringing into a hand
+        self.decisions = DecisionWorker()       #Computer players' decisions, made on a background thread
+        self.thinking_player: Optional[Player] = None     #Player shown as thinking while a decision is made
+
         #Animation controller instance
         self.card_animation = CardAnimation(
-            self.screen,
-            self.clock,
+            self.timeline,
             self.card_back,
-            self.background,
-            self.BACKGROUND_COLOR,
             self.CARD_WIDTH,
             self.CARD_HEIGHT,
             self  # 添加game参数
@@ -301,6 +320,17 @@ class Game:
 
         self._hint_probabilities = {}
         self._hint_expectations = {}
+        self._hint_plans = {}
+        self.hint_version = 0           #Changes with every hint update, for the cached hint panel lines
+        self.hints = HintWorker()       #Hint calculation on a background thread, shown as its results arrive
+        self.speculation = HintWorker() #Hints of the likely next states, calculated once the current ones are complete
+        self.hint_cache = HintCache()
+        self.panel_model = PanelModel(self.BLACK)
+        self._fonts: Dict[int, pygame.font.Font] = {}
+        self._text_cache: Dict[Tuple[str, int, Tuple[int, int, int]], pygame.Surface] = {}
+        self.scaled_take_from_buttons: Dict[Tuple[str, Tuple[int, int]], pygame.Surface] = {}
+        self._static_layer: Optional[pygame.Surface] = None
+        self._static_layer_key = None
 
 
     def initial_turn_state(self):
@@ -350,6 +380,17 @@ class Game:
             'Princess Peach': pygame.image.load('buttons/take from princess peach.png')
         }
 
+    def render_text(self, text: str, size: int, colour: Tuple[int, int, int]) -> pygame.Surface:
+        """Rendered text, the same Surface for the same text on every frame so unchanged text is not repainted"""
+        key = (text, size, colour)
+        if key not in self._text_cache:
+            if size not in self._fonts:
+                self._fonts[size] = pygame.font.Font(None, size)
+            if len(self._text_cache) >= 256:          #Messages keep changing
+                self._text_cache.clear()
+            self._text_cache[key] = self._fonts[size].render(text, True, colour)
+        return self._text_cache[key]
+
     def background_music_control(self):
 
         if not self.bgm_switch:
@@ -359,49 +400,10 @@ class Game:
 
     def game_screen(self, draw_temp_cards=True):
         """Screen displayed during the game"""
-        self.screen.fill(self.BACKGROUND_COLOR)
-        self.screen.blit(self.background, (0, 0))
-
-        message_font = pygame.font.Font(None, 28)  
-        turn_font = pygame.font.Font(None, 36)
-
-        if self.current_player:
-            top_margin = int(self.height * 0.03)  # Use 3% of window height as top margin
-            turn_text = f"Current Turn: {self.current_player.name}"
-            turn_surface = turn_font.render(turn_text, True, self.BLACK) 
-            turn_rect = turn_surface.get_rect(centerx=self.width // 2, top=top_margin)
-            self.screen.blit(turn_surface, turn_rect)
-
-            # Display messages below the turn text
-            if self.message:
-                messages = self.message.split('\n')
-                message_y = turn_rect.bottom + 10
-
-                for i, message_line in enumerate(messages):
-                    words = message_line.split()
-                    lines = []
-                    current_line = []
-                    current_length = 0
-                    
-                    for word in words:
-                        if current_length + len(word) + 1 <= 100:
-                            current_line.append(word)
-                            current_length += len(word) + 1
-                        else:
-                            lines.append(' '.join(current_line))
-                            current_line = [word]
-                            current_length = len(word)
-                    if current_line:
-                        lines.append(' '.join(current_line))
-
-                    # Display each line centered horizontally
-                    for j, line in enumerate(lines):
-                        message_text = message_font.render(line, True, self.BLACK)
-                        message_rect = message_text.get_rect(
-                            centerx=self.width // 2,
-                            top=message_y + (i * len(lines) + j) * 25
-                        )
-                        self.screen.blit(message_text, message_rect)
+        top_margin = int(self.height * 0.03)  # Use 3% of window height as top margin
+        turn_text = f"Current Turn: {self.current_player.name}"
+        turn_surface = self.render_text(turn_text, 36, self.BLACK) 
+        turn_rect = turn_surface.get_rect(centerx=self.width // 2, top=top_margin)
 
         #Calculate the total height of the message area (considering up to 2 lines of message)
         message_area_height = top_margin + turn_rect.height + 10 + (2 * 25)  
@@ -412,16 +414,6 @@ class Game:
         # Calculate the starting position of the computer player's hand area (below the message area)   
         computer_cards_start_y = message_area_height + 25
 
-        # Display all players' hands
-        for i, player in enumerate(self.players):
-            if player.is_human:
-                # The human player's hand is displayed at the bottom
-                self.display_player_hand(player, human_cards_y)
-            else:
-                # Computer player's hand displayed above, with 150 pixels spacing between each player
-                computer_index = sum(1 for p in self.players[:i] if not p.is_human)
-                self.display_player_hand(player, computer_cards_start_y + computer_index * 150)
-      
         # Calculate the position of the last computer player's hand
         last_computer_y = computer_cards_start_y + (len([p for p in self.players if not p.is_human]) - 1) * 150
 
@@ -432,53 +424,122 @@ class Game:
         self.deck_area.x = deck_x
         self.deck_area.y = deck_y
 
-        # Display the text showing the number of cards remaining in the deck
-        deck_text = message_font.render(f"Deck: {len(self.deck)} cards", True, self.BLACK)
-        deck_text_rect = deck_text.get_rect(centerx=self.deck_area.centerx, top=self.deck_area.bottom + 50)
-        self.screen.blit(deck_text, deck_text_rect)
-
         # Update the position of the temporary draw area (to the left of the deck area)
         self.temp_draw_area.x = self.deck_area.x - self.CARD_WIDTH - 160  # 160 pixels to the left
         self.temp_draw_area.y = deck_y
 
-        if self.deck:  # Display cards in the deck, creating a stacking effect
-            for i in range(min(10, len(self.deck))):
-                deck_rect = self.deck_area.copy()
-                deck_rect.x += i * 2
-                deck_rect.y += i * 2
-                self.screen.blit(self.card_back, deck_rect)
+        self.canvas.blit(self.static_layer(), (0, 0))      #Background, deck stack and buttons, composited on changes only
+
+        self.canvas.blit(turn_surface, turn_rect)
+
+        # Display messages below the turn text
+        if self.message:
+            messages = self.message.split('\n')
+            message_y = turn_rect.bottom + 10
+
+            for i, message_line in enumerate(messages):
+                words = message_line.split()
+                lines = []
+                current_line = []
+                current_length = 0
+                
+                for word in words:
+                    if current_length + len(word) + 1 <= 100:
+                        current_line.append(word)
+                        current_length += len(word) + 1
+                    else:
+                        lines.append(' '.join(current_line))
+                        current_line = [word]
+                        current_length = len(word)
+                if current_line:
+                    lines.append(' '.join(current_line))
+
+                # Display each line centered horizontally
+                for j, line in enumerate(lines):
+                    message_text = self.render_text(line, 28, self.BLACK)
+                    message_rect = message_text.get_rect(
+                        centerx=self.width // 2,
+                        top=message_y + (i * len(lines) + j) * 25
+                    )
+                    self.canvas.blit(message_text, message_rect)
+
+        # Display all players' hands
+        for i, player in enumerate(self.players):
+            if player.is_human:
+                # The human player's hand is displayed at the bottom
+                self.display_player_hand(player, human_cards_y)
+            else:
+                # Computer player's hand displayed above, with 150 pixels spacing between each player
+                computer_index = sum(1 for p in self.players[:i] if not p.is_human)
+                self.display_player_hand(player, computer_cards_start_y + computer_index * 150)
+
+        # Display the text showing the number of cards remaining in the deck
+        deck_text = self.render_text(f"Deck: {self.deck_left()} cards", 28, self.BLACK)
+        deck_text_rect = deck_text.get_rect(centerx=self.deck_area.centerx, top=self.deck_area.bottom + 50)
+        self.canvas.blit(deck_text, deck_text_rect)
 
-        if draw_temp_cards and self.turn_state['is_drawing']:    # Display drawn cards in temporary area if currently drawing
+        if draw_temp_cards and self.turn_state['is_drawing'] and not self.hide_temp_cards:    # Display drawn cards in temporary area if currently drawing
             for i, _ in enumerate(self.turn_state['drawn_cards']):
                 x = self.temp_draw_area.x + i * 20
                 y = self.temp_draw_area.y
-                self.screen.blit(self.card_back, (x, y))
+                self.canvas.blit(self.card_back, (x, y))
 
         self.display_valid_groups_panel()  # Draw Valid groups panel first
+        if self.game_phase == GamePhase.REPLAY:     #Replays show no hints and no action buttons
+            return
         self.display_hint_panel()
 
-        if self.current_player and self.current_player.is_human and not self.taken_turn_by_computer:
-            self.display_action_buttons()
-            
-            if self.showing_computer_strategy_buttons:
-                for strategy in ['X-AGGRESSIVE', 'AGGRESSIVE', 'DEFENSIVE', 'X-DEFENSIVE']:
-                    rect = self.computer_strategy_buttons[strategy]
-                    pygame.draw.rect(self.screen, self.WHITE, rect)
-                    pygame.draw.rect(self.screen, self.BLACK, rect, 2)
-                    self.screen.blit(self.buttons[strategy], rect)
-        elif self.current_player and self.current_player.is_human and self.taken_turn_by_computer and self.temp_computer_finished:
-            self.screen.blit(self.buttons['next'], self.button_positions['next'])
-        
-        if len(self.current_player.cards) >= 20:
-            self.screen.blit(self.buttons['next'], self.button_positions['next'])
-        
-        self.display_system_buttons()
+        if self.current_player.is_human and not self.taken_turn_by_computer and self.showing_computer_strategy_buttons:
+            for strategy in ['X-AGGRESSIVE', 'AGGRESSIVE', 'DEFENSIVE', 'X-DEFENSIVE']:
+                rect = self.computer_strategy_buttons[strategy]
+                self.canvas.draw_rect(self.WHITE, rect)
+                self.canvas.draw_rect(self.BLACK, rect, 2)
+                self.canvas.blit(self.buttons[strategy], rect)
+
         if self.selected_cards:                                    #Highlight valid groups if human player has selected cards
             self.highlight_human_valid_groups()
 
         if self.showing_player_select_buttons:                      #Display select buttons for human player to take card from other players after clicking 'Take' 
             self.display_player_select_buttons()
 
+
+    def static_buttons(self) -> List[Tuple[pygame.Surface, pygame.Rect]]:
+        """Images of the buttons shown in the current state, in drawing order"""
+        buttons = []
+        if self.game_phase != GamePhase.REPLAY:     #Replays show no action buttons
+            if self.current_player.is_human and not self.taken_turn_by_computer:
+                buttons += self.action_buttons()
+            elif self.current_player.is_human and self.taken_turn_by_computer and self.temp_computer_finished:
+                buttons.append((self.buttons['next'], self.button_positions['next']))
+
+            if len(self.current_player.cards) >= 20:
+                buttons.append((self.buttons['next'], self.button_positions['next']))
+
+        buttons += [(self.system_buttons[action], rect) for action, rect in self.system_button_positions.items()]
+        return buttons
+
+
+    def static_layer(self) -> pygame.Surface:
+        """
+        The background, the deck stack and the buttons in one Surface, composited again only when the window
+        size, the deck stack depth, the deck position or a button's image changes.
+        """
+        buttons = self.static_buttons()
+        deck_depth = min(10, self.deck_left())
+        key = (self.width, self.height, id(self.background), self.deck_area.topleft, deck_depth,
+               tuple((id(image), tuple(rect)) for image, rect in buttons))
+        if key != self._static_layer_key:
+            layer = pygame.Surface((self.width, self.height))
+            if pygame.display.get_surface() is not None:
+                layer = layer.convert()
+            layer.fill(self.BACKGROUND_COLOR)
+            layer.blit(self.background, (0, 0))
+            layer.blits([(self.card_back, (self.deck_area.x + i * 2, self.deck_area.y + i * 2)) for i in range(deck_depth)],
+                        doreturn=False)    # Display cards in the deck, creating a stacking effect
+            layer.blits(buttons, doreturn=False)
+            self._static_layer, self._static_layer_key = layer, key
+        return self._static_layer
+
     def welcome_screen(self):
         """Screen displayed when setting up the game"""
 
@@ -575,14 +636,7 @@ class Game:
 
         selected_option_1 = self.drop_down_button_solo.selected
 
-        if self.drop_down_button_1.option_list[selected_option_1] == "DEFENSIVE":
-            self.player1 = RandomStrategyPlayer("Bowser")
-        elif self.drop_down_button_1.option_list[selected_option_1] == "X-DEFENSIVE":
-            self.player1 = ExpectationValueStrategyPlayer("Bowser")
-        elif self.drop_down_button_1.option_list[selected_option_1] == "AGGRESSIVE":
-            self.player1 = RulebasedStrategyPlayer("Bowser")
-        elif self.drop_down_button_1.option_list[selected_option_1] == "X-AGGRESSIVE":
-            self.player1 = ProbabilityStrategyPlayer("Bowser")
+        self.player1 = self.create_computer_player(self.drop_down_button_solo.option_list[selected_option_1], "Bowser")
 
 
 
@@ -655,79 +709,65 @@ class Game:
         selected_option_1 = self.drop_down_button_1.selected
         selected_option_2 = self.drop_down_button_2.selected
 
-        if self.drop_down_button_1.option_list[selected_option_1] == "DEFENSIVE":
-            self.player1 = RandomStrategyPlayer("Bowser")
-        elif self.drop_down_button_1.option_list[selected_option_1] == "X-DEFENSIVE":
-            self.player1 = ExpectationValueStrategyPlayer("Bowser")
-        elif self.drop_down_button_1.option_list[selected_option_1] == "X-AGGRESSIVE":
-            self.player1 = ProbabilityStrategyPlayer("Bowser")
-        elif self.drop_down_button_1.option_list[selected_option_1] == "AGGRESSIVE":
-            self.player1 = RulebasedStrategyPlayer("Bowser")
-
-        if self.drop_down_button_2.option_list[selected_option_2] == "DEFENSIVE":
-            self.player2 = RandomStrategyPlayer("Princess Peach")
-        elif self.drop_down_button_2.option_list[selected_option_2] == "X-DEFENSIVE":
-            self.player2 = ExpectationValueStrategyPlayer("Princess Peach")
-        elif self.drop_down_button_2.option_list[selected_option_2] == "X-AGGRESSIVE":
-            self.player2 = ProbabilityStrategyPlayer("Princess Peach")
-        elif self.drop_down_button_2.option_list[selected_option_2] == "AGGRESSIVE":
-            self.player2 = RulebasedStrategyPlayer("Princess Peach")
-
-
-    def display_action_buttons(self):
+        self.player1 = self.create_computer_player(self.drop_down_button_1.option_list[selected_option_1], "Bowser")
+        self.player2 = self.create_computer_player(self.drop_down_button_2.option_list[selected_option_2], "Princess Peach")
+
+
+    def create_computer_player(self, strategy: str, name: str) -> ComputerPlayer:
+        """Create a computer player of the class registered for the strategy in config.json"""
+        return getattr(computer_player, config["strategy_class_dict"][strategy])(name)
+
+
+    def action_buttons(self) -> List[Tuple[pygame.Surface, pygame.Rect]]:
+        """Images of the action buttons in drawing order, banned or not depending on the turn state"""
+        buttons = []
         for action, rect in self.button_positions.items():    #Display all the action buttons
             if action == 'finish draw':                       #Display 'Finish Draw' button if currently drawing cards, otherwise don't display this button
                 if self.turn_state['is_drawing']:
-                    self.screen.blit(self.buttons[action], rect)
+                    buttons.append((self.buttons[action], rect))
             else:
-                self.screen.blit(self.buttons[action], rect)
+                buttons.append((self.buttons[action], rect))
             
             if action == 'draw':
                 if self.turn_state['is_finished_drawing'] or self.turn_state['cards_drawn_count'] >= 3 or len(self.current_player.cards) + self.turn_state['cards_drawn_count'] >= self.MAX_HAND_SIZE or self.target_player:
-                    self.screen.blit(self.buttons['draw_banned'], rect)
+                    buttons.append((self.buttons['draw_banned'], rect))
                 else:
-                    self.screen.blit(self.buttons['draw'], rect)
+                    buttons.append((self.buttons['draw'], rect))
 
             if action == 'take':
                 if self.turn_state['is_drawing'] or self.turn_state['has_taken'] or len(self.current_player.cards) >= self.MAX_HAND_SIZE or self.target_player:
-                    self.screen.blit(self.buttons['take_banned'], rect)
+                    buttons.append((self.buttons['take_banned'], rect))
                 else:
-                    self.screen.blit(self.buttons['take'], rect)
+                    buttons.append((self.buttons['take'], rect))
 
             if action == 'pass':
                 if self.turn_state['has_drawn'] or self.turn_state['has_taken']:
-                    self.screen.blit(self.buttons['pass_banned'], rect)
+                    buttons.append((self.buttons['pass_banned'], rect))
                 else:
-                    self.screen.blit(self.buttons['pass'], rect)
+                    buttons.append((self.buttons['pass'], rect))
 
             if action == 'discard':
                 if self.turn_state['is_drawing'] or not self.current_player.exist_valid_group() or not self.selected_cards or self.target_player:
-                    self.screen.blit(self.buttons['discard_banned'], rect)
+                    buttons.append((self.buttons['discard_banned'], rect))
                 else:
-                    self.screen.blit(self.buttons['discard'], rect)
+                    buttons.append((self.buttons['discard'], rect))
 
             if action == 'next':
                 if self.turn_state['is_drawing'] or (not self.turn_state['has_drawn'] and not self.turn_state['has_taken'] and not self.turn_state['has_passed']) or self.target_player:
-                    self.screen.blit(self.buttons['next_banned'], rect)
+                    buttons.append((self.buttons['next_banned'], rect))
                 else:
-                    self.screen.blit(self.buttons['next'], rect)
+                    buttons.append((self.buttons['next'], rect))
 
             if action == 'computer_takeover':
                 if self.turn_state['has_drawn'] or self.turn_state['has_taken'] or self.turn_state['has_passed'] or self.taken_turn_by_computer or self.target_player:
-                    self.screen.blit(self.buttons['computer_takeover_banned'], rect)
+                    buttons.append((self.buttons['computer_takeover_banned'], rect))
                 else:
-                    self.screen.blit(self.buttons['computer_takeover'], rect)
+                    buttons.append((self.buttons['computer_takeover'], rect))
                     
-                    # If strategy buttons are displayed, draw them in order from top to bottom
+                    # Add warning message when strategy buttons are shown (game_screen draws them on top)
                     if self.showing_computer_strategy_buttons:
-                        for strategy in ['X-AGGRESSIVE', 'AGGRESSIVE', 'DEFENSIVE', 'X-DEFENSIVE']:
-                            rect = self.computer_strategy_buttons[strategy]
-                            pygame.draw.rect(self.screen, self.WHITE, rect)
-                            pygame.draw.rect(self.screen, self.BLACK, rect, 2)
-                            self.screen.blit(self.buttons[strategy], rect)
-                    
-                            # Add warning message when strategy buttons are shown
-                            self.message = "Note: The X-DEFENSIVE computer player will take longer to decide on its actions because it carefully considers all possible scenarios!"
+                        self.message = "Note: The X-DEFENSIVE computer player will take longer to decide on its actions because it carefully considers all possible scenarios!"
+        return buttons
 
 
     def display_system_buttons(self):
@@ -736,54 +776,56 @@ class Game:
             if action == 'hint':
                 # Display appropriate hint button based on state
                 button_image = self.system_buttons['hint_on'] if self._hint_enabled else self.system_buttons['hint_off']
-                self.screen.blit(button_image, rect)
+                self.canvas.blit(button_image, rect)
             else:
             '''
-            self.screen.blit(self.system_buttons[action], rect)
+            self.canvas.blit(self.system_buttons[action], rect)
 
 
     def display_player_hand(self, player: Player, y_position: int):
-        font = pygame.font.Font(None, 32)
         if player.is_human:
             if player == self.current_player:
-                text = font.render(f"You", True, self.RED)
+                text = self.render_text("You", 32, self.RED)
             elif player == self.target_player:
-                text = font.render(f"You", True, self.WHITE)
+                text = self.render_text("You", 32, self.WHITE)
             else:
-                text = font.render(f"You", True, self.BLACK)
+                text = self.render_text("You", 32, self.BLACK)
         else:
             if player == self.current_player:
-                text = font.render(f"{player.name}", True, self.RED)
+                text = self.render_text(player.name, 32, self.RED)
             elif player == self.target_player:
-                text = font.render(f"{player.name}", True, self.WHITE)
+                text = self.render_text(player.name, 32, self.WHITE)
             else:
-                text = font.render(f"{player.name}", True, self.BLACK)
-        self.screen.blit(text, (self.CARD_LEFT_MARGIN, y_position - 30))
-
+                text = self.render_text(player.name, 32, self.BLACK)
+        self.canvas.blit(text, (self.CARD_LEFT_MARGIN, y_position - 30))
+        if player is self.thinking_player:
+            dots = "." * (pygame.time.get_ticks() // 400 % 3 + 1)
+            self.canvas.blit(self.render_text(f"thinking{dots}", 24, self.BLACK),
+                             (self.CARD_LEFT_MARGIN + text.get_width() + 15, y_position - 25))
+
+        cards = [card for card in player.cards if card not in self.hidden_cards]
         x_spacing = 70   
-        start_x = max(50, (self.width - (len(player.cards) * x_spacing)) // 2)   #Calculate the starting x position of the first card
+        start_x = max(50, (self.width - (len(cards) * x_spacing)) // 2)   #Calculate the starting x position of the first card
         
-        for i, card in enumerate(player.cards):                                  #Calculate and set each card position with animation
+        for i, card in enumerate(cards):                                  #Calculate and set each card position with animation
             new_x = start_x + i * x_spacing
             card.set_position(new_x, y_position, animate=True)
       
-        for card in player.cards:                                              
+        for card in cards:                                              
             card.update()  
-            self.screen.blit(card.image, card.rect)
+        if player in self.hidden_players:
+            return
+        self.canvas.blits([(card.image, card.rect) for card in cards])     #One call for the whole hand
 
 
     def display_player_select_buttons(self):
         if not self.showing_player_select_buttons:    
             return
 
-        message_font = pygame.font.Font(None, 28)
-        turn_font = pygame.font.Font(None, 36)
-        name_font = pygame.font.Font(None, 32)  # The font size used in display_player_hand
-        
         # Calculate the position of the message area
         top_margin = int(self.height * 0.03)
         turn_text = f"Current Turn: {self.current_player.name}"
-        turn_surface = turn_font.render(turn_text, True, self.BLACK) 
+        turn_surface = self.render_text(turn_text, 36, self.BLACK) 
         turn_rect = turn_surface.get_rect(centerx=self.width // 2, top=top_margin)
         
         # Calculate the total height of the message area
@@ -797,7 +839,7 @@ class Game:
         
         # Calculate the maximum width of all player names
         max_text_width = max(
-            name_font.render(f"{player.name}", True, self.BLACK).get_rect().width 
+            self.render_text(player.name, 32, self.BLACK).get_rect().width 
             for player in other_players
         )
         
@@ -809,12 +851,15 @@ class Game:
             computer_index = sum(1 for p in self.players[:player_index] if not p.is_human)
             y_position = computer_cards_start_y + computer_index * 150
             
-            name_text = name_font.render(f"{player.name}: ", True, self.BLACK)
+            name_text = self.render_text(f"{player.name}: ", 32, self.BLACK)
             text_height = name_text.get_rect().height
             
             button_image = self.take_from_buttons[player.name]
-            # Scale the button image to uniform width and text height
-            scaled_button = pygame.transform.scale(button_image, (max_text_width + 20, text_height * 1.5))
+            # Scale the button image to uniform width and text height, once per size
+            button_size = (max_text_width + 20, int(text_height * 1.5))
+            if (player.name, button_size) not in self.scaled_take_from_buttons:
+                self.scaled_take_from_buttons[(player.name, button_size)] = pygame.transform.scale(button_image, button_size)
+            scaled_button = self.scaled_take_from_buttons[(player.name, button_size)]
             button_rect = scaled_button.get_rect()
             
             # Set the button position: Overlap with the player's name text
@@ -822,16 +867,16 @@ class Game:
             button_rect.y = y_position - 40  
             
             self.player_select_buttons[player.name] = button_rect
-            self.screen.blit(scaled_button, button_rect)
+            self.canvas.blit(scaled_button, button_rect)
 
 
     def display_valid_groups_panel(self):
         """Display all current valid groups in a panel"""
-        if not self.current_player.exist_valid_group():
+        lines = self.panel_model.valid_groups_lines(self.current_player)     #Cached until the hand changes
+        if not lines:
             return
 
         left_margin = 20  
-        panel_width = 400
         panel_x = left_margin
 
         computer_cards_start_y = self.height * 0.03 + 60  
@@ -843,32 +888,8 @@ class Game:
         available_height = human_cards_y - (last_computer_y + last_computer_cards_height)
         panel_y = last_computer_y + last_computer_cards_height + (available_height * 0.2)  
 
-        title_font = pygame.font.Font(None, 28)
-        text_font = pygame.font.Font(None, 22)
-        
-        title = "Current Valid Groups"
-        title_text = title_font.render(title, True, self.BLACK)
-        title_y = panel_y + 8
-        self.screen.blit(title_text, (panel_x + 10, title_y))
-
-        y = title_y + 30
-        line_height = 16  
-        
-        valid_groups = self.current_player.all_valid_groups()
-        # Limit the number of valid groups displayed to 18
-        max_groups = min(18, len(valid_groups))
-        
-        for i, group in enumerate(valid_groups[:max_groups]):
-            group_desc = ', '.join(f"{card.color} {card.number}" for card in group)
-            group_text = text_font.render(f"{i + 1}. {group_desc}", True, self.BLACK)
-            self.screen.blit(group_text, (panel_x + 20, y))
-            y += line_height
-        
-        # If there are more valid groups, display the remaining groups count
-        if len(valid_groups) > max_groups:
-            remaining = len(valid_groups) - max_groups
-            more_text = text_font.render(f"...and {remaining} more groups", True, self.BLACK)
-            self.screen.blit(more_text, (panel_x + 20, y))
+        for surface, (dx, dy) in lines:
+            self.canvas.blit(surface, (panel_x + dx, panel_y + dy))
 
 
     def update_hint_calculations(self):
@@ -883,11 +904,29 @@ class Game:
             
         if not self.current_player or not self.current_player.is_human or self.taken_turn_by_computer:
             return
+        self.hint_version += 1
+        self._hint_probabilities = {}
+        self._hint_expectations = {}
+        self._hint_plans = {}
+
+        draws = not self.turn_state['is_finished_drawing']
+        takes = not self.turn_state['has_taken']
+        cached = self.hint_cache.get(self.hint_cache_key(draws, takes))
 
         # If there is a valid group, no need to calculate probabilities and expectations
-        if self.current_player.exist_valid_group():
-            self._hint_probabilities = {}
-            self._hint_expectations = {}
+        self.panel_model.refresh(self.current_player)
+        if self.panel_model.valid_groups:
+            self.hints.cancel()
+            if cached and cached[3] is not None:
+                self.panel_model.use_best_discard(self.current_player, discard_cards(cached[3], self.current_player.cards))
+            return
+        if not draws and not takes:
+            self.hints.cancel()
+            return
+        if cached:                      # Precomputed while the player was deciding on the last action
+            self.hints.cancel()
+            self._hint_probabilities, self._hint_expectations, self._hint_plans = (dict(hints) for hints in cached[:3])
+            self.start_speculation()
             return
 
         game_state = {
@@ -898,24 +937,63 @@ class Game:
         }
         
         # Determine which hint information to calculate based on the current state
-        if not self.turn_state['is_finished_drawing'] and not self.turn_state['has_taken']:
-            self._hint_probabilities = self.current_player.calculate_probability(game_state)
-            #draw_exp = {}
-            #take_exp = {}
-            draw_exp = self.current_player.draw_expectation(game_state)
-            take_exp = self.current_player.take_expectation(game_state)
-            self._hint_expectations = {**draw_exp, **take_exp}
-        elif self.turn_state['is_finished_drawing'] and not self.turn_state['has_taken']:
-            self._hint_probabilities = {k: v for k, v in self.current_player.calculate_probability(game_state).items() 
-                                    if k[0] == 'take'}
-            self._hint_expectations = self.current_player.take_expectation(game_state)
-        elif self.turn_state['has_taken'] and not self.turn_state['is_finished_drawing']:
-            self._hint_probabilities = {k: v for k, v in self.current_player.calculate_probability(game_state).items() 
-                                    if k[0] == 'draw'}
-            self._hint_expectations = self.current_player.draw_expectation(game_state)
-        else:
-            self._hint_probabilities = {}
-            self._hint_expectations = {}
+        snapshot, originals = decision_snapshot(game_state, None)
+        updates = hint_updates(snapshot['current_player'], snapshot, draws, takes, draws and takes, self.MAX_HAND_SIZE)
+        self.hints.start(self.hint_state_key(), (live_update(update, originals) for update in updates))
+
+
+    def hint_cache_key(self, draws: bool, takes: bool):
+        """Key of the current state in the hint cache"""
+        return hint_cache_key(self.current_player.cards, [(p, p.cards) for p in self.players if p != self.current_player],
+                              self.deck, draws, takes)
+
+
+    def start_speculation(self):
+        """Precompute the hints of the states the human player's next action likely leads to"""
+        game_state = {
+            'current_player': self.current_player,
+            'other_players': [p for p in self.players if p != self.current_player],
+            'deck_cards': self.deck,
+            'deck_size': len(self.deck)
+        }
+        snapshot, originals = decision_snapshot(game_state, None)
+        self.speculation.start(self.hint_state_key(),
+                               speculative_hints(snapshot, originals, not self.turn_state['is_finished_drawing'],
+                                                 not self.turn_state['has_taken'], self.MAX_HAND_SIZE))
+
+
+    def hint_state_key(self) -> tuple:
+        """The state the hints depend on: whose turn, what has been done in it, the hands and the deck"""
+        return (self.current_player, self.taken_turn_by_computer, self.turn_state['is_finished_drawing'],
+                self.turn_state['has_taken'], tuple(player.hand_version for player in self.players), len(self.deck))
+
+
+    def poll_hints(self):
+        """Add the hint results that arrived since the last frame, cancelling the calculations the game has moved past"""
+        if self.hints.key is None and self.speculation.key is None:
+            return
+        key = self.hint_state_key()
+        if self.speculation.key is not None:
+            if self.speculation.key != key:
+                self.speculation.cancel()
+            else:
+                for cache_key, hints in self.speculation.poll():
+                    self.hint_cache.put(cache_key, hints)
+
+        if self.hints.key is None:
+            return
+        if self.hints.key != key:
+            self.hints.cancel()
+            return
+        updates = self.hints.poll()
+        for probabilities, expectations, plans in updates:
+            self._hint_probabilities.update(probabilities)
+            self._hint_expectations.update(expectations)
+            self._hint_plans.update(plans)
+        if updates:
+            self.hint_version += 1
+        if not self.hints.running and self.speculation.key != key:
+            self.start_speculation()
 
 
     def display_hint_panel(self):
@@ -938,90 +1016,17 @@ class Game:
         
         available_height = human_cards_y - (last_computer_y + last_computer_cards_height)
         panel_y = last_computer_y + last_computer_cards_height + (available_height * 0.2)
-        
-        hint_font = pygame.font.Font(None, 28)
-        text_font = pygame.font.Font(None, 22)
-        
-        title = hint_font.render("Hint", True, self.BLACK)
-        title_y = panel_y + 8
-        self.screen.blit(title, (panel_x + 10, title_y))
 
-        #If there is a valid group, find the best discard combination and display it
-        if self.current_player.exist_valid_group():
-            best_discard = self.current_player.find_best_discard()
-            if best_discard:
-                y = title_y + 30
-                line_height = 16
-                
-                text = text_font.render("Best discard combination:", True, self.BLACK)
-                self.screen.blit(text, (panel_x + 10, y))
-                y += line_height + 3
-                
-                for group in best_discard:
-                    cards_text = ", ".join(str(card) for card in group)
-                    text = text_font.render(cards_text, True, self.BLACK)
-                    self.screen.blit(text, (panel_x + 20, y))
-                    y += line_height
-            return
-            
-        # If there is no valid group, display probabilities and expectations of each action
-        if not hasattr(self, '_hint_probabilities') or not hasattr(self, '_hint_expectations'):
-            return
-            
-        if not self._hint_probabilities and not self._hint_expectations:
-            return
-        
-        # Custom sorting function
-        def action_sort_key(action):
-            action_type, count_or_none, player_or_none = action
-            if action_type == 'draw':
-                return (0, count_or_none or 0) 
-            elif action_type == 'take':
-                return (1, player_or_none.name)  
-            else:  #Pass operation
-                return (2, 0)
-        
-        y = title_y + 40
-        line_height = 16  
-        
-        if self._hint_probabilities:
-            text = text_font.render("Probability of obtaining a valid group:", True, self.BLACK)
-            self.screen.blit(text, (panel_x + 10, y))
-            y += line_height + 3  
-            
-            for action in sorted(self._hint_probabilities.keys(), key=action_sort_key):
-                action_type, count_or_none, player_or_none = action
-                if action_type == 'draw':
-                    text = f"draw {count_or_none} cards: {self._hint_probabilities[action]:.2%}"
-                elif action_type == 'take':
-                    text = f"take 1 card from {player_or_none.name}: {self._hint_probabilities[action]:.2%}"
-                elif action_type == 'pass':
-                    continue  
-                text = text_font.render(text, True, self.BLACK)
-                self.screen.blit(text, (panel_x + 20, y))
-                y += line_height
-        
-        if self._hint_expectations:
-            y += line_height
-            text = text_font.render("Expected value of the number of hand cards to be reduced:", True, self.BLACK)
-            self.screen.blit(text, (panel_x + 10, y))
-            y += line_height + 3  
-            
-            for action in sorted(self._hint_expectations.keys(), key=action_sort_key):
-                action_type, count_or_none, player_or_none = action
-                if action_type == 'draw':
-                    text = f"draw {count_or_none} cards: {self._hint_expectations[action]:.2f}"
-                elif action_type == 'take':
-                    text = f"take 1 card from {player_or_none.name}: {self._hint_expectations[action]:.2f}"
-                elif action_type == 'pass':
-                    continue  
-                text = text_font.render(text, True, self.BLACK)
-                self.screen.blit(text, (panel_x + 20, y))
-                y += line_height
+        #The best discard if there is a valid group, otherwise probabilities and expectations of each action
+        lines = self.panel_model.hint_lines(self.current_player, self.hint_version, self._hint_probabilities,
+                                            self._hint_expectations, self._hint_plans, self.hints.running)
+        for surface, (dx, dy) in lines:
+            self.canvas.blit(surface, (panel_x + dx, panel_y + dy))
 
 
     def show_game_over_popup(self, winner: Player):
-        """If one player wins, display a popup"""
+        """If one player wins, save the game log and display a popup"""
+        self.save_game_log()
         popup_width = 800
         popup_height = 200
         popup_x = (self.width - popup_width) // 2
@@ -1116,6 +1121,13 @@ class Game:
                 self.taken_turn_by_computer and not self.temp_computer_finished):  # If it is not human player's turn or temporary computer player has not finished its operations, do not allow human player to click buttons
             return
 
+        if self.timeline.busy:                  # Wait for the running animations to finish
+            return
+
+        if self.target_player and self.turn_state['waiting_for_take']:     # Taking a card from the target player's shuffled hand
+            self.click_take(pos)
+            return
+
         clicked_button = None
         clicked_player_button = None
         clicked_strategy_button = None
@@ -1143,15 +1155,15 @@ class Game:
 
                     if clicked_button == 'finish draw':
                         if self.turn_state['is_drawing']:
-                            self.human_finish_drawing()
+                            self.timeline.spawn(self.human_finish_drawing())
                     elif clicked_button == 'draw':
-                        self.human_draw()
+                        self.timeline.spawn(self.human_draw())
                     elif clicked_button == 'take':
                         self.human_select_take()
                     elif clicked_button == 'pass':
                         self.human_pass()
                     elif clicked_button == 'discard':
-                        self.human_discard()
+                        self.timeline.spawn(self.human_discard())
                     elif clicked_button == 'next':
                         self.human_start_next_turn()
                     return
@@ -1174,7 +1186,7 @@ class Game:
             return
 
         if clicked_strategy_button:
-            self.let_computer_take_turn(clicked_strategy_button)
+            self.timeline.spawn(self.let_computer_take_turn(clicked_strategy_button))
             return
 
         if self.showing_player_select_buttons:  # If human player clicked on any player select button
@@ -1183,7 +1195,7 @@ class Game:
                     if player.name == clicked_player_button:
                         self.target_player = player
                         self.showing_player_select_buttons = False
-                        self.human_take(self.target_player)
+                        self.timeline.spawn(self.human_take(self.target_player))
                         return
 
         if clicked_button:  # If clicked on any action button, take actions accordingly
@@ -1193,15 +1205,15 @@ class Game:
 
             if clicked_button == 'finish draw':
                 if self.turn_state['is_drawing']:
-                    self.human_finish_drawing()
+                    self.timeline.spawn(self.human_finish_drawing())
             elif clicked_button == 'draw':
-                self.human_draw()
+                self.timeline.spawn(self.human_draw())
             elif clicked_button == 'take':
                 self.human_select_take()
             elif clicked_button == 'pass':
                 self.human_pass()
             elif clicked_button == 'discard':
-                self.human_discard()
+                self.timeline.spawn(self.human_discard())
             elif clicked_button == 'next':
                 self.human_start_next_turn()
             return
@@ -1210,6 +1222,17 @@ class Game:
             'waiting_for_take']:  # When not waiting for taking a card, handle card clicking means selecting cards to discard
             self.click_card(pos)
 
+
+    def click_take(self, pos: Tuple[int, int]):
+        """Human player clicks while taking a card: only the target player's cards can be clicked"""
+        if any(rect.collidepoint(pos) for rect in self.button_positions.values()):
+            self.message = "Cannot perform other actions - please first click one card to take"
+            return
+
+        self.click_card(pos)
+        if self.taken_card:
+            self.timeline.spawn(self.human_take_card(self.target_player))
+
     def system_actions_in_game(self, pos: Tuple[int, int]):
         """Human player clicks buttons on the game screen"""
         clicked_button = None
@@ -1227,6 +1250,16 @@ class Game:
                 clicked_button = action
                 break
 
+        if clicked_button in ("restart", "quit"):     # Stop the running animations, turns and decisions
+            self.timeline.cancel()
+            self.decisions.cancel()
+            self.hints.cancel()
+            self.speculation.cancel()
+            self.hint_cache.clear()
+            self.thinking_player = None
+            self.hidden_players = []
+            self.hide_temp_cards = False
+            self.hidden_cards = []
         if clicked_button == "restart":
             self.game_phase = GamePhase.WELCOME
         if clicked_button == "quit":
@@ -1287,27 +1320,31 @@ class Game:
                     break
 
 
-    def human_draw(self):
+    def human_draw(self) -> Script:
         if self.turn_state['is_finished_drawing']:
             self.message = "Cannot draw - already finished drawing this turn"
             return
 
-        if self.turn_state['cards_drawn_count'] >= 3:
-            self.message = "Cannot draw - already drew maximum 3 cards this turn"
+        if self.turn_state['cards_drawn_count'] >= game_engine.MAX_DRAW_COUNT:
+            self.message = f"Cannot draw - already drew maximum {game_engine.MAX_DRAW_COUNT} cards this turn"
             return
 
-        if len(self.current_player.cards) + self.turn_state['cards_drawn_count'] >= self.MAX_HAND_SIZE:
+        if not self.deck_left():
+            self.message = "Cannot draw - the deck is empty"
+            return
+
+        if not game_engine.draw_allowed(len(self.current_player.cards), len(self.deck), self.turn_state['cards_drawn_count'] + 1):
             self.message = f"Cannot draw - already has {self.MAX_HAND_SIZE} cards"
             return
         self.card_draw_sound.play()
-        card = self.deck.pop()                                          #Draw a card from the deck each time human player clicks 'Draw'
+        card = self.deck_top_card()                                     #Draw a card from the deck each time human player clicks 'Draw'
         
-        start_pos = (self.deck_area.x + min(5, len(self.deck)) * 2,     #Calculate the starting position and target position of the drawn card animation
-                self.deck_area.y + min(5, len(self.deck)) * 2)
+        start_pos = (self.deck_area.x + min(5, self.deck_left() - 1) * 2,     #Calculate the starting position and target position of the drawn card animation
+                self.deck_area.y + min(5, self.deck_left() - 1) * 2)
         target_pos = (self.temp_draw_area.x + self.turn_state['cards_drawn_count'] * 20,
                      self.temp_draw_area.y + self.turn_state['cards_drawn_count'] * 2)
         
-        self.card_animation.draw_to_temp_draw_area(start_pos, target_pos, self.game_screen)  #Animate the drawn card from deck to the temporary draw area
+        yield from self.card_animation.draw_to_temp_draw_area(start_pos, target_pos)  #Animate the drawn card from deck to the temporary draw area
 
         self.turn_state['drawn_cards'].append(card)
         self.turn_state['is_drawing'] = True    
@@ -1320,75 +1357,52 @@ class Game:
         else:
             self.message += f" ({3 - self.turn_state['cards_drawn_count']} draws remaining)"
 
-    def human_finish_drawing(self):
+    def human_finish_drawing(self) -> Script:
         if not self.turn_state['is_drawing']:
             self.message = "Cannot finish drawing - not currently drawing"
             return
         
         self.turn_state['is_finished_drawing'] = True
+        yield from self.show_drawn_cards()
+
+        self.check_and_display_valid_groups()                                        #Check and display valid groups after drawing
+        self.update_hint_calculations()
+
 
+    def show_drawn_cards(self) -> Script:
+        """Flip and show the cards drawn this turn, then add them to current player's hand"""
         temp_area_pos = (self.temp_draw_area.x, self.temp_draw_area.y)           #Drawn cards animation starting from the temporary draw area
         hand_pos = (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y)  #Drawn cards animation targeting at the leftmost end of current player's hand which is the temporary display area
+        drawn_cards = game_engine.apply_action(self.state, ('draw', len(self.turn_state['drawn_cards']), None))
+        self.turn_state['drawn_cards'] = []
+        self.hidden_cards = list(drawn_cards)
         
         card_positions = [(temp_area_pos[0] + i * 30, temp_area_pos[1])        #Calculate the positions to display the flipping animation of drawn cards
-                         for i in range(len(self.turn_state['drawn_cards']))]
-        self.card_animation.flip_cards_animation(                                #Animate the flipping of drawn cards
-            self.turn_state['drawn_cards'],
-            card_positions,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
+                         for i in range(len(drawn_cards))]
+        self.hide_temp_cards = True
+        yield from self.card_animation.flip_cards_animation(drawn_cards, card_positions)   #Animate the flipping of drawn cards
         
-        self.card_animation.spread_cards_animation(                                #Animate the spreading of drawn cards after flipping
-            self.turn_state['drawn_cards'],
-            temp_area_pos, 20, 70,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
+        yield from self.card_animation.spread_cards_animation(drawn_cards, temp_area_pos, 20, 70)   #Animate the spreading of drawn cards after flipping
         
-        self.message = f"{self.current_player.name} finished drawing cards"
-        self.message += f"\nHas drew: {', '.join(f'{card.color} {card.number}' for card in self.turn_state['drawn_cards'])}"
+        if self.current_player.is_human and self.taken_turn_by_computer:
+            self.message = f"{self.temp_computer.get_strategy_name()} computer player finished helping you draw cards"
+        else:
+            self.message = f"{self.current_player.name} finished drawing cards"
+        self.message += f"\nHas drew: {', '.join(f'{card.color} {card.number}' for card in drawn_cards)}"
 
         self.turn_state['is_drawing'] = False
         
-        self.card_animation.display_cards_temporarily(                                #Display temporarily the drawn cards in the temporary draw area
-            self.turn_state['drawn_cards'],
-            temp_area_pos, 70,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
+        yield from self.card_animation.display_cards_temporarily(drawn_cards, temp_area_pos, 70)   #Display temporarily the drawn cards in the temporary draw area
         
-        self.card_animation.move_to_temp_display_area(                                #Animate the moving of drawn cards to the temporary display area at the leftmost end of current player's hand
-            self.turn_state['drawn_cards'],
-            temp_area_pos, hand_pos, 70,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
+        yield from self.card_animation.move_to_temp_display_area(drawn_cards, temp_area_pos, hand_pos, 70)   #Animate the moving of drawn cards to the temporary display area at the leftmost end of current player's hand
         
-        self.card_animation.show_in_temp_display_area(                                #Display the drawn cards in the temporary display area for a short period of time
-            self.turn_state['drawn_cards'],
-            (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y),
-            20,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
+        yield from self.card_animation.show_in_temp_display_area(drawn_cards, hand_pos, 20)   #Display the drawn cards in the temporary display area for a short period of time
 
-        for card in self.turn_state['drawn_cards']:                                    #Add the drawn cards to current player's hand
-            self.current_player.add_card(card)
+        self.hidden_cards = []                                                        #Show the drawn cards in current player's hand
+        self.hide_temp_cards = False
         
-        animation_frames = 0                                                           #Final animation to complete card positioning
-        while animation_frames < 45:
-            self.screen.fill(self.BACKGROUND_COLOR)
-            self.screen.blit(self.background, (0, 0))
-            self.game_screen(draw_temp_cards=False)
-            
-            for card in self.current_player.cards:
-                card.update()
-            self.update_screen()
-            
-            animation_frames += 1
-            self.clock.tick(40)
+        yield 1125                                                                     #Let the cards slide into their positions in the hand
 
-        self.turn_state['is_finished_drawing'] = True
-        self.turn_state['drawn_cards'] = []
-        
-        self.check_and_display_valid_groups()                                        #Check and display valid groups after drawing
-        self.update_hint_calculations()
 
     def human_select_take(self):
         if self.turn_state['is_drawing']:
@@ -1399,7 +1413,7 @@ class Game:
             self.message = "Cannot take - already took a card this turn"
             return
 
-        if len(self.current_player.cards) >= self.MAX_HAND_SIZE:
+        if game_engine.must_pass(len(self.current_player.cards)):
             self.message = f"Cannot take - hand already has {self.MAX_HAND_SIZE} cards"
             return
 
@@ -1408,95 +1422,30 @@ class Game:
         self.message = "Select a player to take one card from"
 
 
-    def human_take(self, target_player: Player):
+    def human_take(self, target_player: Player) -> Script:
         if not self.turn_state['waiting_for_take'] or not target_player:
             return
 
-        self.hand_card_shuffle_sound.play()
-        self.card_animation.flip_player_cards_to_back(                            #Animate the flipping of target player's cards from face up to face down
-            target_player,
-            lambda: self.game_screen()
-        )
-
-        pygame.time.wait(200)
-
-        center_x = target_player.cards[0].rect.x + len(target_player.cards) * 35 // 2  #Calculate the center position of displaying the shuffling animation
-        center_y = target_player.cards[0].rect.y
-        
-        self.card_animation.shuffle_in_player_hand(                                #Animate the shuffling of target player's cards
-            target_player,
-            (center_x, center_y),
-            lambda: self.game_screen()
-        )
-
-        random.shuffle(target_player.cards)                                        #Acturally shuffle the cards in target player's hand
-        
-        spacing = 70                                                                
-        start_x = max(50, (self.width - (len(target_player.cards) * spacing)) // 2)
-        y_position = target_player.cards[0].rect.y
-        
-        for i, card in enumerate(target_player.cards):                              #Again set the position of the cards after simulating shuffling
-            card.face_down = True
-            card.set_position(start_x + i * spacing, y_position)
+        yield from self.shuffle_target_hand(target_player)
         
         self.taken_card = None
-        self.message = "Click a card to take"
-        
-        while self.turn_state['waiting_for_take']:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    clicked_button = None                  #First check whether user clicks on some action buttons
-                    for action, rect in self.button_positions.items():
-                        if rect.collidepoint(event.pos):
-                            clicked_button = action
-                            break
-                    
-                    if clicked_button:
-                        self.message = "Cannot perform other actions - please first click one card to take"
-                        continue  
-                    
-                    self.click_card(event.pos)        #If not clicking on any action button, handle card clicking
-                elif event.type == pygame.MOUSEMOTION:
-                    self.card_hover(event.pos)
-        
-            self.update_screen()
-            self.clock.tick(self.FPS)
-        
+        self.message = "Click a card to take"                                      #click_take() goes on with human_take_card() once a card is clicked
+
+
+    def human_take_card(self, target_player: Player) -> Script:
+        """Take the card that human player clicked in target player's shuffled hand"""
         if self.taken_card:
             self.turn_state['has_taken'] = True
             self.turn_state['waiting_for_take'] = False
 
             self.taken_card.face_down = False                                          #Set the taken card to face up after human player clicks on it
-            original_pos = (self.taken_card.rect.x, self.taken_card.rect.y)            #The original position and the target position (temporary display area) of the taken card animation
-            temp_display_pos = (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y) 
-            
-            target_player.cards.remove(self.taken_card)                              #Remove the taken card from target player's hand
-            self.taken_card.reset_state()                                             #Reset the state of the taken card to default
-
-            self.card_draw_sound.play()
-            self.card_animation.move_to_temp_display_area(                            #Animate the moving of the taken card to the temporary display area
-                [self.taken_card],
-                original_pos, temp_display_pos, 0,
-                lambda: self.game_screen()
-            )
-            
-            self.card_animation.show_in_temp_display_area(                            #Display the taken card in the temporary display area for a short period of time
-                [self.taken_card],
-                temp_display_pos,
-                0,
-                lambda: self.game_screen()
-            )
-            
-            self.current_player.add_card(self.taken_card)                            #Add the taken card to current player's hand
+            yield from self.move_taken_card(target_player, self.taken_card)
             self.showing_player_select_buttons = False
             self.player_select_buttons.clear()
 
             self.message = f"{self.current_player.name} took {self.taken_card.color} {self.taken_card.number} from {target_player.name}"
 
-            if len(target_player.cards) == 0:                                       #If target player has no cards left, game over
+            if self.state.winner is target_player:                                  #If target player has no cards left, game over
                 self.game_phase = GamePhase.GAME_OVER
                 self.message = f"{target_player.name} wins!"
                 self.update_screen()
@@ -1509,24 +1458,52 @@ class Game:
             self.taken_card = None
             self.target_player = None
 
-            animation_frames = 0                                                           #Final animation to complete card positioning
-            while animation_frames < 35:
-                self.screen.fill(self.BACKGROUND_COLOR)
-                self.screen.blit(self.background, (0, 0))
-                self.game_screen(draw_temp_cards=False)
-                
-                for card in self.current_player.cards:
-                    card.update()
-                self.update_screen()
-                
-                animation_frames += 1
-                self.clock.tick(40)
+            yield 875                                                               #Let the cards slide into their positions in the hand
             
             self.check_and_display_valid_groups()                                    #Check and display valid groups after taking
             self.update_hint_calculations()
 
 
-    def human_discard(self):
+    def shuffle_target_hand(self, target_player: Player) -> Script:
+        """Flip target player's cards to their backs, shuffle them and lay them out again face down"""
+        self.hand_card_shuffle_sound.play()
+        yield from self.card_animation.flip_player_cards_to_back(target_player)   #Animate the flipping of target player's cards from face up to face down
+
+        yield 200
+
+        center_x = target_player.cards[0].rect.x + len(target_player.cards) * 35 // 2  #Calculate the center position of displaying the shuffling animation
+        center_y = target_player.cards[0].rect.y
+        
+        yield from self.card_animation.shuffle_in_player_hand(target_player, (center_x, center_y))   #Animate the shuffling of target player's cards
+
+        self.rng.shuffle(target_player.cards)                                        #Acturally shuffle the cards in target player's hand
+        
+        spacing = 70                                                                
+        start_x = max(50, (self.width - (len(target_player.cards) * spacing)) // 2)
+        y_position = target_player.cards[0].rect.y
+        
+        for i, card in enumerate(target_player.cards):                              #Again set the position of the cards after simulating shuffling
+            card.face_down = True
+            card.set_position(start_x + i * spacing, y_position)
+
+
+    def move_taken_card(self, target_player: Player, taken_card: Card) -> Script:
+        """Move the taken card from target player's hand through the temporary display area to current player's hand"""
+        original_pos = (taken_card.rect.x, taken_card.rect.y)            #The original position and the target position (temporary display area) of the taken card animation
+        temp_display_pos = (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y) 
+        
+        game_engine.apply_action(self.state, ('take', None, target_player), taken_card)   #Move the taken card to current player's hand
+        self.hidden_cards = [taken_card]
+
+        self.card_draw_sound.play()
+        yield from self.card_animation.move_to_temp_display_area([taken_card], original_pos, temp_display_pos, 0)   #Animate the moving of the taken card to the temporary display area
+        
+        yield from self.card_animation.show_in_temp_display_area([taken_card], temp_display_pos, 0)   #Display the taken card in the temporary display area for a short period of time
+        
+        self.hidden_cards = []
+
+
+    def human_discard(self) -> Script:
         if self.turn_state['is_drawing']:
             self.message = "Cannot discard - please finish drawing cards first"
             return
@@ -1544,50 +1521,19 @@ class Game:
             self.message = "Not a valid group"
             return
 
-        CARDS_DELAY = 5                                                          #Delay between cards being discarded
-        
-        for card_index, card in enumerate(self.selected_cards):
-            self.current_player.remove_card(card)
-            start_pos = (card.rect.x, card.rect.y)                                #Starting position of the discard animation is the position of this card
-            target_pos = (self.deck_area.x + min(5, len(self.deck)) * 2,          #Target position of the discard animation is the position of the top card of the deck
-                         self.deck_area.y + min(5, len(self.deck)) * 2)
-
-            for _ in range(card_index * CARDS_DELAY):                     
-                self.update_screen()
-                self.clock.tick(self.FPS)
-
-            self.card_draw_sound.play()
-
-            self.card_animation.discard_card_animation(                            #Animate the discarding of the selected cards
-                card, start_pos, target_pos, self.game_screen
-            )
-            
-            card.reset_state()
-            self.deck.append(card)
-
-        random.shuffle(self.deck)
-        self.card_shuffle_sound.play()
-        self.card_animation.shuffle_animation(                                    #Animate the shuffling of the deck
-            self.deck_area,
-            redraw_game_screen=self.game_screen
-        )
+        yield from self.discard_group(self.selected_cards)
 
         self.selected_cards = []
         self.current_player.clear_selections()
         self.message = "Group discarded"
 
-        if len(self.current_player.cards) == 0:
+        if self.state.winner is self.current_player:
             self.game_phase = GamePhase.GAME_OVER
             self.message = f"{self.current_player.name} wins!"
             self.update_screen()
             self.show_game_over_popup(self.current_player)
         else:
             if self.current_player.exist_valid_group():                            # Check if there are still valid groups after discarding
-                valid_groups = self.current_player.all_valid_groups()
-                group_descriptions = []
-                for i, group in enumerate(valid_groups, 1):
-                    group_desc = ', '.join(f"{card.color} {card.number}" for card in group)
-                    group_descriptions.append(f"{i}. {group_desc}")
                 self.message = "More valid groups found! Select cards and click Discard to remove them"
             else:
                 self.message = "Group discarded"
@@ -1595,6 +1541,22 @@ class Game:
         self.update_hint_calculations()
 
 
+    def discard_group(self, group: List[Card]) -> Script:
+        """Discard a group of current player's cards into the deck and shuffle it"""
+        target_pos = (self.deck_area.x + min(5, self.deck_left()) * 2,          #Target position of the discard animation is the position of the top card of the deck
+                      self.deck_area.y + min(5, self.deck_left()) * 2)
+        game_engine.discard_group(self.state, self.current_player, group)        #Shuffle the group into the deck
+
+        def landed(card: Card):
+            self.card_draw_sound.play()
+            card.reset_state()
+
+        yield from self.card_animation.discard_card_animation(group, target_pos, landed)   #Animate the discarding of the cards, each reset as it lands
+
+        self.card_shuffle_sound.play()
+        yield from self.card_animation.shuffle_animation(self.deck_area)      #Animate the shuffling of the deck
+
+
     def human_pass(self):
         if self.turn_state['has_drawn'] or self.turn_state['has_taken']:
             self.message = "Cannot pass - already took other actions this turn"
@@ -1615,13 +1577,12 @@ class Game:
             self.message = "You must take an action before starting next turn"
             return
         
+        self.end_turn()
         self.taken_turn_by_computer = False
         self.temp_computer = None
         self.temp_computer_finished = False
         self.selected_cards = []
         self.turn_state = self.initial_turn_state()
-        current_index = self.players.index(self.current_player)                      #Get the index of the current player
-        self.current_player = self.players[(current_index + 1) % len(self.players)]  #Set the player with the next index as the current player
         self.message = f"{self.current_player.name}'s turn"
 
 
@@ -1635,8 +1596,6 @@ class Game:
                 return True
             else:
                 self.message = f"{self.current_player.name} has valid groups!"
-                self.update_screen()
-                pygame.time.wait(500)
                 return True
         return False
     
@@ -1659,7 +1618,7 @@ class Game:
             card.update()
 
 
-    def let_computer_take_turn(self, strategy: str):
+    def let_computer_take_turn(self, strategy: str) -> Script:
         """Let computer take over the current turn with specified strategy"""
         self.showing_computer_strategy_buttons = False
         self.taken_turn_by_computer = True
@@ -1673,6 +1632,7 @@ class Game:
             self.temp_computer = ProbabilityStrategyPlayer("Temp Computer")
         elif strategy == 'AGGRESSIVE':
             self.temp_computer = RulebasedStrategyPlayer("Temp Computer")
+        self.temp_computer.set_rng(game_engine.derived_rng(self.seed, 'assist', self.game_log.turn_count))
               
         self.temp_computer.cards = self.current_player.cards.copy() 
                
@@ -1684,51 +1644,48 @@ class Game:
         }
         
         self.message = f"{self.temp_computer.get_strategy_name()} computer player is helping you take this turn..."
-        self.update_screen()
-        pygame.time.wait(500)
+        yield 500
         
         if self.check_and_display_valid_groups():
-            self.computer_discard()
+            yield from self.computer_discard()
 
-        if len(self.current_player.cards) >= self.MAX_HAND_SIZE:     
+        if game_engine.must_pass(len(self.current_player.cards)):
             self.message = f"You have reached maximum hand size ({self.MAX_HAND_SIZE} cards), passing turn"
-            self.update_screen()
-            pygame.time.wait(1000)
+            yield 1000
             self.human_start_next_turn()
             return
 
-        action, draw_count, target_player = self.temp_computer.choose_first_action(game_state)
+        action, draw_count, target_player = self.legal_or_pass(
+            (yield from self.decide(self.temp_computer, self.temp_computer.choose_first_action, game_state)))
         
         if action == 'draw':
-            self.computer_draw(draw_count)
+            yield from self.computer_draw(draw_count)
             self.turn_state['has_drawn'] = True
             self.temp_computer.cards = self.current_player.cards.copy()
         elif action == 'take':
-            self.computer_take(target_player)
+            yield from self.computer_take(target_player)
             self.turn_state['has_taken'] = True
             self.temp_computer.cards = self.current_player.cards.copy()
         elif action == 'pass':
             self.turn_state['has_passed'] = True
             self.message = f"{self.temp_computer.get_strategy_name()} computer player helps you choose to pass"
             self.temp_computer_finished = True
-            self.update_screen()
-            pygame.time.wait(800)
+            yield 800
             self.message = f"{self.temp_computer.get_strategy_name()} computer player has finished helping you take this turn, click 'Next' to continue"
-            self.update_screen()
             return
 
         if type(self.temp_computer) == ExpectationValueStrategyPlayer:
             self.message = f"{self.temp_computer.get_strategy_name()} computer player is thinking about the next action..."
-            self.update_screen()
         
-        action, draw_count, target_player = self.temp_computer.choose_second_action(game_state, action)
+        action, draw_count, target_player = self.legal_or_pass(
+            (yield from self.decide(self.temp_computer, self.temp_computer.choose_second_action, game_state, action)))
         
         if action == 'draw':
-            self.computer_draw(draw_count)
+            yield from self.computer_draw(draw_count)
             self.turn_state['has_drawn'] = True
             self.temp_computer.cards = self.current_player.cards.copy()           
         elif action == 'take':
-            self.computer_take(target_player)
+            yield from self.computer_take(target_player)
             self.turn_state['has_taken'] = True
             self.temp_computer.cards = self.current_player.cards.copy()
         elif action == 'pass':
@@ -1736,19 +1693,34 @@ class Game:
         
         self.temp_computer_finished = True
         self.message = f"{self.temp_computer.get_strategy_name()} computer player has finished helping you take this turn, click 'Next' to continue"
-        self.update_screen()
 
 
-    def computer_turn(self):
-        pygame.time.wait(500)
+    def decide(self, decider: Player, choose, game_state: Dict, *args) -> Script:
+        """
+        Run choose(snapshot of game_state, *args) on the decision thread, showing the current player as thinking
+        until it returns; the script's result is the chosen action, naming the live players
+        """
+        snapshot, originals = decision_snapshot(game_state, decider)
+        future = self.decisions.submit(choose, snapshot, *args)
+        self.thinking_player = self.current_player
+        try:
+            while not future.done():
+                yield
+        finally:                                #Also when the script is dropped by a restart
+            self.thinking_player = None
+            future.cancel()
+        return real_action(future.result(), originals)
+
+
+    def computer_turn(self) -> Script:
+        yield 500
 
         if self.check_and_display_valid_groups():
-            self.computer_discard()
+            yield from self.computer_discard()
 
-        if len(self.current_player.cards) >= self.MAX_HAND_SIZE:     # Check if the current computer player has reached the maximum hand size. If so, pass turn.
+        if game_engine.must_pass(len(self.current_player.cards)):     # Check if the current computer player has reached the maximum hand size. If so, pass turn.
             self.message = f"{self.current_player.name} has reached maximum hand size ({self.MAX_HAND_SIZE} cards), passing turn"
-            self.update_screen()
-            pygame.time.wait(1000)
+            yield 1000
             self.computer_start_next_turn()
             return
 
@@ -1760,108 +1732,59 @@ class Game:
         }
 
         self.message = f"{self.current_player.name} is thinking..."
-        self.update_screen()
 
-        action, draw_count, target_player = self.current_player.choose_first_action(game_state)
+        action, draw_count, target_player = self.legal_or_pass(
+            (yield from self.decide(self.current_player, self.current_player.choose_first_action, game_state)))
 
         if action == 'draw':
-            self.computer_draw(draw_count)
+            yield from self.computer_draw(draw_count)
+            self.turn_state['has_drawn'] = True
             
         elif action == 'take':
-            self.computer_take(target_player)
+            yield from self.computer_take(target_player)
+            self.turn_state['has_taken'] = True
 
         elif action == 'pass':
             self.message = f"{self.current_player.name} chooses to pass"
-            self.update_screen()
-            pygame.time.wait(800)
+            yield 800
             self.computer_start_next_turn()
             return
         
         if type(self.current_player) == ExpectationValueStrategyPlayer:
             self.message = f"{self.current_player.name} is thinking about the next action..."
-            self.update_screen()
         
-        action, draw_count, target_player = self.current_player.choose_second_action(game_state, action)
+        action, draw_count, target_player = self.legal_or_pass(
+            (yield from self.decide(self.current_player, self.current_player.choose_second_action, game_state, action)))
 
         if action == 'draw':
-            self.computer_draw(draw_count)
-            self.computer_start_next_turn()
+            yield from self.computer_draw(draw_count)
+            self.turn_state['has_drawn'] = True
         elif action == 'take':
-            self.computer_take(target_player)
-            self.computer_start_next_turn()
-        elif action == 'pass':
-            self.computer_start_next_turn()
+            yield from self.computer_take(target_player)
+            self.turn_state['has_taken'] = True
+        self.computer_start_next_turn()
 
 
-    def computer_take(self, target_player: Player):
+    def computer_take(self, target_player: Player) -> Script:
         if self.current_player.is_human:
             self.message = f"{self.temp_computer.get_strategy_name()} computer player decided to help you take a card from {target_player.name}"
         else:
             self.message = f"{self.current_player.name} decided to take a card from {target_player.name}"
-        self.update_screen()
-        pygame.time.wait(800)
-
-        self.hand_card_shuffle_sound.play()
-        self.card_animation.flip_player_cards_to_back(
-            target_player,
-            lambda: self.game_screen()
-        )
-
-        pygame.time.wait(200)
-
-        center_x = target_player.cards[0].rect.x + len(target_player.cards) * 35 // 2
-        center_y = target_player.cards[0].rect.y
-        self.card_animation.shuffle_in_player_hand(
-            target_player,
-            (center_x, center_y),
-            lambda: self.game_screen()
-        )
-
-        random.shuffle(target_player.cards)
-        
-        spacing = 70
-        start_x = max(50, (self.width - (len(target_player.cards) * spacing)) // 2)
-        y_position = target_player.cards[0].rect.y
-        
-        for i, card in enumerate(target_player.cards):
-            card.face_down = True
-            card.set_position(start_x + i * spacing, y_position)
+        yield 800
 
-        self.update_screen()
-        pygame.time.wait(500)
+        yield from self.shuffle_target_hand(target_player)
+        yield 500
         
-        taken_card = random.choice(target_player.cards)
-        self.card_animation.reveal_selected_card(
-            taken_card,
-            lambda: self.update_screen()
-        )
+        taken_card = self.rng.choice(target_player.cards)
+        yield from self.card_animation.reveal_selected_card(taken_card)
 
-        original_pos = (taken_card.rect.x, taken_card.rect.y)
-        temp_display_pos = (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y)
-        
-        target_player.cards.remove(taken_card)
-        taken_card.reset_state()
-        self.card_draw_sound.play()
-        self.card_animation.move_to_temp_display_area(
-            [taken_card],
-            original_pos, temp_display_pos, 0,
-            lambda: self.game_screen()
-        )
-        
-        self.card_animation.show_in_temp_display_area(
-            [taken_card],
-            temp_display_pos,
-            0,
-            lambda: self.game_screen()
-        )
-
-        self.current_player.add_card(taken_card)
+        yield from self.move_taken_card(target_player, taken_card)
         if self.current_player.is_human:
             self.message = f"{self.temp_computer.get_strategy_name()} computer player helps you took {taken_card.color} {taken_card.number} from {target_player.name}"
         else:
             self.message = f"{self.current_player.name} took {taken_card.color} {taken_card.number} from {target_player.name}"
 
-        if len(target_player.cards) == 0:
+        if self.state.winner is target_player:
             self.game_phase = GamePhase.GAME_OVER
             self.message = f"{target_player.name} wins!"
             self.update_screen()
@@ -1871,50 +1794,30 @@ class Game:
             card.face_down = False
             card.update()
 
-        animation_frames = 0
-        while animation_frames < 50:
-            for card in self.current_player.cards:
-                card.update()
-            self.update_screen()
-            animation_frames += 1
-            self.clock.tick(40)
-        
-        pygame.time.wait(500)
+        yield 1750                                          #Let the cards slide into their positions in the hand
 
         while self.check_and_display_valid_groups():
-            self.computer_discard()
-            self.update_screen()
-            pygame.time.wait(200)
+            yield from self.computer_discard()
+            yield 200
 
-        self.update_screen()
 
-
-    def computer_draw(self, draw_count: int):
+    def computer_draw(self, draw_count: int) -> Script:
         if self.current_player.is_human:
             self.message = f"{self.temp_computer.get_strategy_name()} computer player decided to help you draw from deck"
         else:
             self.message = f"{self.current_player.name} decided to draw from deck"
-        self.update_screen()
-        pygame.time.wait(800)
-
-        for i in range(draw_count):
-            if len(self.current_player.cards) + i > self.MAX_HAND_SIZE:
-                if self.current_player.is_human:
-                    self.message = f"You have reached maximum hand size ({self.MAX_HAND_SIZE} cards)"
-                else:
-                    self.message = f"{self.current_player.name} has reached maximum hand size"
-                self.update_screen()
-                return
+        yield 800
 
-            card = self.deck.pop()
+        for i in range(draw_count):                         #legal_or_pass has checked the hand size and the deck
+            card = self.deck_top_card()
             self.card_draw_sound.play()
 
-            start_pos = (self.deck_area.x + min(5, len(self.deck)) * 2,
-                         self.deck_area.y + min(5, len(self.deck)) * 2)
+            start_pos = (self.deck_area.x + min(5, self.deck_left() - 1) * 2,
+                         self.deck_area.y + min(5, self.deck_left() - 1) * 2)
             target_pos = (self.temp_draw_area.x + self.turn_state['cards_drawn_count'] * 20,
                          self.temp_draw_area.y + self.turn_state['cards_drawn_count'] * 2)
 
-            self.card_animation.draw_to_temp_draw_area(start_pos, target_pos, self.game_screen)
+            yield from self.card_animation.draw_to_temp_draw_area(start_pos, target_pos)
 
             self.turn_state['drawn_cards'].append(card)
             self.turn_state['cards_drawn_count'] += 1
@@ -1929,79 +1832,19 @@ class Game:
                 self.message += " (reached maximum draw limit 3 for this turn)"
             else:
                 self.message += f" ({3 - self.turn_state['cards_drawn_count']} draws remaining)"
-            pygame.time.wait(300)
-
-        temp_area_pos = (self.temp_draw_area.x, self.temp_draw_area.y)
-        card_positions = [(temp_area_pos[0] + i * 30, temp_area_pos[1]) 
-                         for i in range(len(self.turn_state['drawn_cards']))]
-        self.card_animation.flip_cards_animation(
-            self.turn_state['drawn_cards'],
-            card_positions,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
-
-        self.card_animation.spread_cards_animation(
-            self.turn_state['drawn_cards'],
-            temp_area_pos, 20, 70,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
-        
-        if self.current_player.is_human:
-            self.message = f"{self.temp_computer.get_strategy_name()} computer player finished helping you draw cards"
-        else:
-            self.message = f"{self.current_player.name} finished drawing cards"
-        self.message += f"\nHas drew: {', '.join(f'{card.color} {card.number}' for card in self.turn_state['drawn_cards'])}"
-
-        self.turn_state['is_drawing'] = False
-        
-        self.card_animation.display_cards_temporarily(
-            self.turn_state['drawn_cards'],
-            temp_area_pos, 70,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
-
-        hand_pos = (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y)
-        self.card_animation.move_to_temp_display_area(
-            self.turn_state['drawn_cards'],
-            temp_area_pos, hand_pos, 70,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
-        
-        self.card_animation.show_in_temp_display_area(
-            self.turn_state['drawn_cards'],
-            (self.CARD_LEFT_MARGIN, self.current_player.cards[0].rect.y),
-            20,
-            lambda: self.game_screen(draw_temp_cards=False)
-        )
-        
-        for card in self.turn_state['drawn_cards']:
-            self.current_player.add_card(card)
-        
-        animation_frames = 0
-        max_frames = 45
-        while animation_frames < max_frames:
-            self.screen.fill(self.BACKGROUND_COLOR)
-            self.screen.blit(self.background, (0, 0))
-            self.game_screen(draw_temp_cards=False)
-            
-            for card in self.current_player.cards:
-                card.update()
-            self.update_screen()
-            
-            animation_frames += 1
-            self.clock.tick(40)
+            yield 300
 
-        self.turn_state['drawn_cards'] = []
+        yield from self.show_drawn_cards()
 
         while self.check_and_display_valid_groups():
-            self.computer_discard()
-            self.update_screen()
-            pygame.time.wait(200)
+            yield from self.computer_discard()
+            yield 200
 
-        self.update_screen()
 
+    def computer_discard(self) -> Script:
+        if not self.current_player.is_human:
+            yield 500                                        #Show that the computer player has valid groups
 
-    def computer_discard(self):
         if self.current_player.exist_valid_group():
             groups_to_discard = self.current_player.find_best_discard()
 
@@ -2009,8 +1852,7 @@ class Game:
             i = 0
             for group in groups_to_discard:
                 self.highlight_computer_valid_groups(group)
-                self.update_screen()
-                pygame.time.wait(300)
+                yield 800
 
                 index_order_dict = dict(zip(range(0, 10), ["first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth"])) 
 
@@ -2019,57 +1861,23 @@ class Game:
                 else:
                     self.message = f"{self.current_player.name} decided to {index_order_dict[i]} discard group: {', '.join(f'{card.color} {card.number}' for card in group)}"
 
-                CARDS_DELAY = 5
-                
-                for card_index, card in enumerate(group):
-                    self.current_player.remove_card(card)
-                    start_pos = (card.rect.x, card.rect.y)
-                    target_pos = (self.deck_area.x + min(5, len(self.deck)) * 2, 
-                         self.deck_area.y + min(5, len(self.deck)) * 2)
-
-                    for _ in range(card_index * CARDS_DELAY):
-                        self.update_screen()
-                        self.clock.tick(self.FPS)
-                    self.card_draw_sound.play()
-                    self.card_animation.discard_card_animation(
-                        card, start_pos, target_pos, self.game_screen
-                    )
-                    
-                    card.reset_state()
-                    self.deck.append(card)
-
-                random.shuffle(self.deck)
-                self.card_shuffle_sound.play()
-                self.card_animation.shuffle_animation(
-                    self.deck_area,
-                    redraw_game_screen=self.game_screen
-                )
+                yield from self.discard_group(group)
                 
                 if self.current_player.is_human:
                     self.message = f"{self.temp_computer.get_strategy_name()} computer player helps you discarded group: {', '.join(f'{card.color} {card.number}' for card in group)}"
                 else:
                     self.message = f"{self.current_player.name} discarded group: {', '.join(f'{card.color} {card.number}' for card in group)}"
                 
-                animation_frames = 0                                 #Wait for the remaining cards to animate to their new positions
-                while animation_frames < 30:
-                    for card in self.current_player.cards:
-                        card.update()
-                    
-                    self.update_screen()
-                    animation_frames += 1
-                    self.clock.tick(self.FPS)
-                
-                pygame.time.wait(300)
+                yield 800                                        #Wait for the remaining cards to animate to their new positions
 
-                if len(self.current_player.cards) == 0:
+                if self.state.winner is self.current_player:
                     self.game_phase = GamePhase.GAME_OVER
                     self.message = f"{self.current_player.name} wins!"
                     self.update_screen()
                     self.show_game_over_popup(self.current_player)
                 else:
                     i += 1
-                    self.update_screen()
-                    pygame.time.wait(300)
+                    yield 300
 
 
     def highlight_computer_valid_groups(self, cards_to_highlight: List[Card]):
@@ -2084,9 +1892,6 @@ class Game:
             card.selected = True
             card.update()
 
-        pygame.display.flip()
-        pygame.time.wait(500)
-
 
     def update_screen(self):
         self.screen.fill(self.BACKGROUND_COLOR)
@@ -2095,11 +1900,38 @@ class Game:
         pygame.display.flip()
 
 
+    def legal_or_pass(self, action: game_engine.Action) -> game_engine.Action:
+        """A computer player's action if the rules allow it in the current turn, otherwise a pass"""
+        return action if game_engine.is_legal(self.state, action) else game_engine.PASS_ACTION
+
+
+    def end_turn(self):
+        """End the current turn with a pass in the game state, unless the game is over, and follow it to the next player"""
+        if self.state.winner is None:
+            game_engine.apply_action(self.state, game_engine.PASS_ACTION)
+        self.current_player = self.state.current_player
+
+
+    def deck_left(self) -> int:
+        """Cards shown in the deck: the cards drawn this turn stay in it until the drawing is finished"""
+        return len(self.deck) - len(self.turn_state['drawn_cards'])
+
+
+    def deck_top_card(self) -> Card:
+        """The next card drawn this turn"""
+        return self.deck[-1 - len(self.turn_state['drawn_cards'])]
+
+
+    def save_game_log(self):
+        """Save the log of the finished game to replays/, to be replayed with replay.py"""
+        os.makedirs("replays", exist_ok=True)
+        self.game_log.save(os.path.join("replays", f"{time.strftime('%Y%m%d_%H%M%S')}_{self.seed}.nlog"))
+
+
     def computer_start_next_turn(self):
+        self.end_turn()
         self.selected_cards = []
         self.turn_state = self.initial_turn_state()
-        current_index = self.players.index(self.current_player)
-        self.current_player = self.players[(current_index + 1) % len(self.players)]
         self.message = f"{self.current_player.name}'s turn"
         if self.current_player.is_human:
             self.update_hint_calculations()
@@ -2117,40 +1949,145 @@ class Game:
     def start_game(self, selected_computers: List[ComputerPlayer]):
         self.players = [Player("Human Player", is_human=True)]
         self.players.extend(selected_computers)
+        game_engine.seed_players(self.players, self.seed)
+        self.game_log = GameLog(self.seed, [game_engine.strategy_name(player) for player in self.players])
 
-        for player in self.players:
+        for seat, player in enumerate(self.players):
             for _ in range(self.INITIAL_HAND_SIZE):
                 if self.deck:
                     player.add_card(self.deck.pop())
+            self.game_log.deal(seat, game_engine.card_types(player.cards))
 
-        self.current_player = self.players[0]
+        self.state = game_engine.GameState(self.players, self.deck, self.rng, log=self.game_log, interactive=True)
+        game_engine.start_turn(self.state)
+        self.current_player = self.state.current_player
         self.game_phase = GamePhase.PLAYER_TURN
         self.message = "Game started!"
         self.turn_state = self.initial_turn_state()
 
         num_players = len(self.players)
         if num_players == 2:
-            self.card_animation.deal_cards_with_trailing_effect(
-            self.get_deck_positions(),
-            self.card_animation.get_two_players_positions()
-        )
+            player_positions = self.card_animation.get_two_players_positions()
         elif num_players == 3:
-            self.card_animation.deal_cards_with_trailing_effect(
-            self.get_deck_positions(),
-            self.card_animation.get_three_players_positions()
-            )
+            player_positions = self.card_animation.get_three_players_positions()
         else:
             raise ValueError("Only 2 or 3 players are supported!")
 
-    # Update screen after animations
-        self.update_screen()
-
         self.update_hint_calculations()
 
         self.check_and_display_valid_groups()
+        self.timeline.spawn(self.deal_cards(player_positions))
+
+
+    def deal_cards(self, player_positions: List[Tuple[int, int]]) -> Script:
+        """Deal animation, the hands being shown once it has finished"""
+        self.hidden_players = list(self.players)
+        yield from self.card_animation.deal_cards_with_trailing_effect(self.get_deck_positions(), player_positions)
+        self.hidden_players = []
         
 
 
+    def start_replay(self, path: str, speed: float = 1.0):
+        """
+        Show a saved game log instead of playing. Right/Left step through the events, Shift+Right/Left and
+        PageDown/PageUp jump 1 and 10 turns, Home/End go to the start and the end, a turn number followed by
+        Enter jumps to that turn and Space plays or pauses. speed scales the card movements and the playback;
+        0 skips the animations and plays one event per frame.
+        """
+        log = GameLog.load(path)
+        self.players = [Player(f"{strategy} {seat + 1}", is_human=strategy == HUMAN) for seat, strategy in enumerate(log.strategies)]
+        self.replay = ReplaySeeker(log, self.players, card_factory=lambda colour, number: Card(
+            colour, number, card_width=self.CARD_WIDTH, card_height=self.CARD_HEIGHT))
+        self.deck = self.replay.state.deck
+        self.replay_speed = speed
+        self.replay_playing = False
+        self.replay_turn_input = ''
+        self.replay_last_step = 0
+        self.game_phase = GamePhase.REPLAY
+        self.show_replay(0, animate=False)
+
+
+    def show_replay(self, record_index: int, animate: bool = True):
+        """Move the replay to the state after record_index records; cards jump into place unless animate"""
+        state = self.replay.seek(record_index)
+        record_index = self.replay.record_index                      #Clamped to the log
+        records = self.replay.log.records
+        self.current_player = state.current_player
+        turn = self.replay.turn_at(record_index)
+        self.message = f"Replay turn {max(turn, 0) + 1}/{self.replay.turn_count}, event {record_index}/{len(records)}"
+        if record_index:
+            self.message += f": {describe_record(records[record_index - 1])}"
+        if state.winner is not None:
+            self.message += f"\n{state.winner.name} wins!"
+        elif self.replay_turn_input:
+            self.message += f"\nJump to turn: {self.replay_turn_input}"
+
+        if animate and self.replay_speed > 0:
+            animation_speed = max(1, 16 / self.replay_speed)         #Cards move 1/animation_speed of the way each frame
+        else:
+            animation_speed = 1
+        for cards in self.replay.cards.values():
+            for card in cards:
+                card.animation_speed = animation_speed
+
+
+    def replay_key(self, event: pygame.event.Event):
+        record_index = self.replay.record_index
+        turn = self.replay.turn_at(record_index)
+        shift = event.mod & pygame.KMOD_SHIFT
+
+        if event.key == pygame.K_SPACE:
+            self.replay_playing = not self.replay_playing
+        elif event.key == pygame.K_RIGHT and shift:
+            self.show_replay(self.replay.turn_start(turn + 1), animate=False)
+        elif event.key == pygame.K_LEFT and shift:
+            self.show_replay(self.replay.turn_start(turn - 1), animate=False)
+        elif event.key == pygame.K_RIGHT:
+            self.show_replay(record_index + 1)
+        elif event.key == pygame.K_LEFT:
+            self.show_replay(record_index - 1)
+        elif event.key == pygame.K_PAGEDOWN:
+            self.show_replay(self.replay.turn_start(turn + 10), animate=False)
+        elif event.key == pygame.K_PAGEUP:
+            self.show_replay(self.replay.turn_start(turn - 10), animate=False)
+        elif event.key == pygame.K_HOME:
+            self.show_replay(0, animate=False)
+        elif event.key == pygame.K_END:
+            self.show_replay(len(self.replay.log.records), animate=False)
+        elif event.unicode.isdigit():
+            self.replay_turn_input += event.unicode
+            self.show_replay(record_index, animate=False)
+        elif event.key == pygame.K_RETURN and self.replay_turn_input:
+            target_turn = int(self.replay_turn_input) - 1
+            self.replay_turn_input = ''
+            self.show_replay(self.replay.turn_start(target_turn), animate=False)
+
+
+    def replay_screen(self):
+        """Draw the replayed state and advance it while playing"""
+        now = pygame.time.get_ticks()
+        event_ms = 600 / self.replay_speed if self.replay_speed > 0 else 0
+        if self.replay_playing and now - self.replay_last_step >= event_ms:
+            if self.replay.record_index < len(self.replay.log.records):
+                self.show_replay(self.replay.record_index + 1)
+                self.replay_last_step = now
+            else:
+                self.replay_playing = False
+        self.game_screen()
+
+
+    def draw_game_frame(self) -> List[pygame.Rect]:
+        """Draw the game or replay screen with the animated sprites and present it, only the regions that changed in dirty mode"""
+        self.canvas.begin_frame()
+        if self.game_phase == GamePhase.REPLAY:
+            self.replay_screen()
+        else:
+            self.game_screen()
+        self.canvas.begin_layer()
+        self.timeline.draw(self.canvas)
+        return self.canvas.end_frame()
+
+
     def run(self):
         running = True
         while running:
@@ -2163,6 +2100,7 @@ class Game:
                     self.width = event.w
                     self.height = event.h
                     self.screen = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE)
+                    self.canvas.set_surface(self.screen)
                     
                     button_width = 120
                     button_height = 50  
@@ -2250,31 +2188,56 @@ class Game:
                         self.click_on_setup(event.pos)
                     elif self.game_phase == GamePhase.PLAYER_TURN:
                         self.click_in_game(event.pos)
+                    self.canvas.invalidate()        #Clicks can open popups that draw directly
                 elif event.type == pygame.MOUSEMOTION:
                     if self.game_phase == GamePhase.PLAYER_TURN:
                         self.card_hover(event.pos)
+                elif event.type == pygame.KEYDOWN and self.game_phase == GamePhase.REPLAY:
+                    self.replay_key(event)
+
+            if self.game_phase == GamePhase.PLAYER_TURN and self.current_player and not self.current_player.is_human \
+                    and not self.timeline.busy:
+                self.timeline.spawn(self.computer_turn())
+            self.timeline.tick(pygame.time.get_ticks())     #Animations and turns advance one frame while events keep being handled
+            self.poll_hints()
 
-            self.screen.fill(self.BACKGROUND_COLOR)
-            self.screen.blit(self.background, (0, 0))
-
-            if self.game_phase == GamePhase.WELCOME:
-                self.welcome_screen()
-            elif self.game_phase == GamePhase.SETUP:
-                if self.no_of_player == 2:
-                    self.selected_computers = [self.player1]
-                    self.setup_screen_solo()
-                elif self.no_of_player == 3:
-                    self.selected_computers = [self.player1,self.player2]
-                    self.setup_screen_2()
-            elif self.game_phase == GamePhase.PLAYER_TURN:
-                self.game_screen()
-                if self.current_player and not self.current_player.is_human:
-                    self.computer_turn()
-
-            pygame.display.flip()
+            if self.game_phase in (GamePhase.PLAYER_TURN, GamePhase.REPLAY):
+                self.draw_game_frame()
+            else:
+                self.canvas.invalidate()
+                self.screen.fill(self.BACKGROUND_COLOR)
+                self.screen.blit(self.background, (0, 0))
+
+                if self.game_phase == GamePhase.WELCOME:
+                    self.welcome_screen()
+                elif self.game_phase == GamePhase.SETUP:
+                    if self.no_of_player == 2:
+                        self.selected_computers = [self.player1]
+                        self.setup_screen_solo()
+                    elif self.no_of_player == 3:
+                        self.selected_computers = [self.player1,self.player2]
+                        self.setup_screen_2()
+
+                pygame.display.flip()
             self.clock.tick(self.FPS)
 
+        self.decisions.cancel()
+        self.hints.cancel()
+        self.speculation.cancel()
         pygame.quit()
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Notty Game")
+    parser.add_argument('--replay', metavar='LOG', help="show a saved game log instead of playing")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed, 0 skips the animations")
+    parser.add_argument('--texture-report', action='store_true', help="print the card texture cache use on exit")
+    parser.add_argument('--render', choices=RENDER_MODES, default='dirty',
+                        help="repaint only the changed regions of the game screen (dirty) or all of it (full)")
+    args = parser.parse_args()
+
     game = Game()
+    game.canvas.mode = args.render
+    if args.replay:
+        game.start_replay(args.replay, args.speed)
     game.run()
+    if args.texture_report:
+        print(f"Card textures: {Card.textures.report()}")
@@ -0,0 +1,356 @@
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_log import DEAL, DISCARD, DRAW, HUMAN, TAKE, TURN, GameLog, LogRecord
+from hand_counts import (COLOURS, COPIES_PER_TYPE, NUMBERS, best_discard, card_type, counts_from_cards, forms_group_with,
+                         has_valid_group, max_discard)
+from rules_engine import INITIAL_HAND_SIZE, MAX_DRAW_COUNT, MAX_HAND_SIZE, draw_allowed, must_pass, take_allowed
+
+'''
+Headless Notty game engine.
+
+GameState holds a whole game as plain Python objects: the players with their hands, the ordered deck,
+whose turn it is and which actions have been played this turn. apply_action plays one action with the
+same rules as the GUI: draws and takes at most once per turn, the maximum hand size limits, discarded
+groups shuffled back into the deck, and the win when a hand becomes empty. Nothing here draws, plays
+sounds or waits, so computer players can play complete games as fast as their strategies decide.
+The limits themselves (draw_allowed, take_allowed, must_pass) are those of rules_engine, shared with
+the search engines.
+
+The GUI plays its games on an interactive GameState: every draw, take, discard and pass of its animated
+flows is played with apply_action and discard_group, but its players discard their groups themselves
+and end their turns with a pass, instead of the best groups being discarded automatically.
+
+Every game is played from a seed: the game's own random stream (shuffles and takes) and one stream for
+each seat's strategy are derived from it, and all events are recorded in a GameLog, so a game can be
+replayed (apply_record) or re-run from its seed.
+'''
+
+Action = Tuple[str, Optional[int], Optional[object]]
+PASS_ACTION: Action = ('pass', None, None)
+
+
+class HeadlessCard:
+    """Card without images or screen position, for games that are never displayed"""
+    __slots__ = ('color', 'number')
+
+    def __init__(self, color: str, number: int):
+        self.color = color
+        self.number = number
+
+
+    def set_position(self, x: int, y: int, animate: bool = False):
+        pass
+
+
+    def reset_state(self):
+        pass
+
+
+    def __repr__(self) -> str:
+        return f"{self.color} {self.number}"
+
+
+def derived_rng(seed: int, *labels) -> random.Random:
+    """Independent random stream for a purpose (labels) within the game of a seed"""
+    return random.Random(':'.join(str(part) for part in (seed,) + labels))
+
+
+def new_seed() -> int:
+    return random.SystemRandom().getrandbits(63)
+
+
+def strategy_name(player) -> str:
+    return HUMAN if player.is_human else player.get_strategy_name()
+
+
+def seed_players(players: List, seed: int):
+    """Give each computer player its own strategy random stream derived from the game's seed"""
+    for seat, player in enumerate(players):
+        if hasattr(player, 'set_rng'):
+            player.set_rng(derived_rng(seed, 'strategy', seat))
+
+
+def card_types(cards: List) -> List[int]:
+    return [card_type(card.color, card.number) for card in cards]
+
+
+def new_deck(card_factory: Callable[[str, int], object] = HeadlessCard) -> List:
+    return [card_factory(colour, number) for colour in COLOURS for number in NUMBERS for _ in range(COPIES_PER_TYPE)]
+
+
+class GameState:
+    """
+    Players, deck, current player and the progress of the current turn.
+    An interactive state leaves discarding to its players (discard_group), and its turns only end with a pass.
+    """
+    def __init__(self, players: List, deck: List, rng: Optional[random.Random] = None, current_index: int = 0,
+                 has_drawn: bool = False, has_taken: bool = False, log: Optional[GameLog] = None,
+                 interactive: bool = False):
+        self.players = players
+        self.deck = deck
+        self.rng = rng or random.Random()
+        self.current_index = current_index
+        self.has_drawn = has_drawn
+        self.has_taken = has_taken
+        self.log = log
+        self.interactive = interactive
+        self.winner = None
+        self.turn_count = 0
+
+
+    @classmethod
+    def new_game(cls, players: List, seed: Optional[int] = None,
+                 card_factory: Callable[[str, int], object] = HeadlessCard) -> 'GameState':
+        """Shuffle a new deck, deal the initial hands and start the first player's turn"""
+        seed = new_seed() if seed is None else seed
+        seed_players(players, seed)
+        rng = derived_rng(seed, 'game')
+        log = GameLog(seed, [strategy_name(player) for player in players])
+
+        deck = new_deck(card_factory)
+        rng.shuffle(deck)
+        for seat, player in enumerate(players):
+            player.cards = []
+            for _ in range(INITIAL_HAND_SIZE):
+                player.add_card(deck.pop())
+            log.deal(seat, card_types(player.cards))
+
+        state = cls(players, deck, rng, log=log)
+        start_turn(state)
+        return state
+
+
+    @classmethod
+    def for_replay(cls, log: GameLog, players: List,
+                   card_factory: Callable[[str, int], object] = HeadlessCard) -> 'GameState':
+        """Empty-handed state to apply the records of a log to; the deck holds all cards in a fixed order"""
+        for player in players:
+            player.cards = []
+        return cls(players, new_deck(card_factory), log=GameLog(log.seed, log.strategies))
+
+
+    @property
+    def current_player(self):
+        return self.players[self.current_index]
+
+
+    @property
+    def other_players(self) -> List:
+        return [player for player in self.players if player is not self.current_player]
+
+
+    def strategy_view(self) -> Dict:
+        """The game_state dictionary passed to the computer players' choose_*_action methods"""
+        return {
+            'current_player': self.current_player,
+            'other_players': self.other_players,
+            'deck_cards': self.deck,
+            'deck_size': len(self.deck)
+        }
+
+
+def legal_actions(state: GameState) -> List[Action]:
+    if state.winner is not None:
+        return []
+
+    hand_size = len(state.current_player.cards)
+    actions = [PASS_ACTION]
+    if must_pass(hand_size):
+        return actions
+
+    if not state.has_drawn:
+        for draw_count in range(1, MAX_DRAW_COUNT + 1):
+            if draw_allowed(hand_size, len(state.deck), draw_count):
+                actions.append(('draw', draw_count, None))
+    if not state.has_taken:
+        for player in state.other_players:
+            if take_allowed(hand_size, len(player.cards)):
+                actions.append(('take', None, player))
+    return actions
+
+
+def is_legal(state: GameState, action: Action) -> bool:
+    """Whether action is in legal_actions(state), checked without listing them"""
+    action_type, draw_count, target = action
+    if state.winner is not None:
+        return False
+    if action_type == 'pass':
+        return draw_count is None and target is None
+    hand_size = len(state.current_player.cards)
+    if action_type == 'draw':
+        return (not state.has_drawn and target is None and draw_count in range(1, MAX_DRAW_COUNT + 1)
+                and draw_allowed(hand_size, len(state.deck), draw_count))
+    if action_type == 'take':
+        return (not state.has_taken and draw_count is None and target is not state.current_player
+                and any(target is player for player in state.players) and take_allowed(hand_size, len(target.cards)))
+    return False
+
+
+def discard_group(state: GameState, player, cards: List):
+    """
+    Discard cards of a player's hand into the deck and declare the player the winner if its hand is empty.
+    The cards must form disjoint valid groups. Shuffling the deck is played as putting each card at a random
+    position: the order of the rest of the deck is unknown to every player, so the deck is as random.
+    """
+    counts = counts_from_cards(cards)
+    if not cards or max_discard(counts) != len(cards):
+        raise ValueError(f"Not a valid group: {cards}")
+    if state.log is not None:
+        state.log.discard(state.players.index(player), card_types(cards))
+    for card in cards:
+        player.remove_card(card)
+        state.deck.insert(state.rng.randrange(len(state.deck) + 1), card)
+    if not player.cards:
+        state.winner = player
+
+
+def discard_groups(state: GameState, player) -> List[List]:
+    """Discard the best valid groups of a player's hand (the same optimum as find_best_discard_count)"""
+    counts = counts_from_cards(player.cards)
+    if not has_valid_group(counts):
+        return []
+    discarded = []
+    for group in best_discard(counts)[1]:
+        cards = []
+        for t in group:
+            card = next(card for card in player.cards if card_type(card.color, card.number) == t and card not in cards)
+            card.reset_state()
+            cards.append(card)
+        discard_group(state, player, cards)
+        discarded.append(cards)
+    return discarded
+
+
+def start_turn(state: GameState):
+    state.has_drawn = False
+    state.has_taken = False
+    if state.log is not None:
+        state.log.turn(state.current_index)
+    #Automatic play discards every group a hand gains, so only dealt hands can hold groups at the start of a turn
+    if not state.interactive and state.turn_count < len(state.players):
+        discard_groups(state, state.current_player)
+
+
+def end_turn(state: GameState):
+    state.current_index = (state.current_index + 1) % len(state.players)
+    state.turn_count += 1
+    start_turn(state)
+
+
+def apply_action(state: GameState, action: Action, taken_card=None) -> List:
+    """
+    Play a legal action for the current player and return the cards it gained. A take gains taken_card,
+    when the caller has picked it from the target's hand, or a card picked at random.
+    The turn ends after a pass or, unless the state is interactive, once both a draw and a take have been played.
+    """
+    action_type, draw_count, target = action
+    player = state.current_player
+    gained = []
+
+    if action_type == 'pass':
+        if state.log is not None and not (state.has_drawn and state.has_taken):
+            state.log.pass_turn(state.current_index)       #Logs end turns with both actions without a pass
+        end_turn(state)
+        return gained
+
+    if action_type == 'draw':
+        gained = [state.deck.pop() for _ in range(draw_count)]
+        state.has_drawn = True
+        if state.log is not None:
+            state.log.draw(state.current_index, card_types(gained))
+    elif action_type == 'take':
+        card = state.rng.choice(target.cards) if taken_card is None else taken_card
+        target.remove_card(card)
+        card.reset_state()
+        gained = [card]
+        state.has_taken = True
+        if state.log is not None:
+            state.log.take(state.current_index, state.players.index(target), card_type(card.color, card.number))
+
+    for card in gained:
+        player.add_card(card)
+    if action_type == 'take' and not target.cards:
+        state.winner = target           #Taking the last card of a player makes that player win
+        return gained
+    if state.interactive:
+        return gained
+
+    #The hand had no valid group before the action, so only groups with a gained card can be discarded
+    if forms_group_with(counts_from_cards(player.cards), card_types(gained)):
+        discard_groups(state, player)
+    if state.winner is None and state.has_drawn and state.has_taken:
+        end_turn(state)
+    return gained
+
+
+def play_turn(state: GameState):
+    """Let the current computer player play its turn; actions that break the rules are played as a pass"""
+    player = state.current_player
+    if must_pass(len(player.cards)):
+        apply_action(state, PASS_ACTION)
+        return
+
+    action = player.choose_first_action(state.strategy_view())
+    if not is_legal(state, action):
+        action = PASS_ACTION
+    apply_action(state, action)
+    if action[0] == 'pass' or state.winner is not None:
+        return
+
+    second_action = player.choose_second_action(state.strategy_view(), action[0])
+    if not is_legal(state, second_action):
+        second_action = PASS_ACTION
+    apply_action(state, second_action)
+
+
+def play_game(players: List, seed: Optional[int] = None, max_turns: Optional[int] = None) -> GameState:
+    """
+    Play a complete game between computer players and return its final state.
+    state.winner is None if the game was stopped after max_turns turns.
+    """
+    state = GameState.new_game(players, seed)
+    while state.winner is None and (max_turns is None or state.turn_count < max_turns):
+        play_turn(state)
+    return state
+
+
+def _move_card(source: List, destination_player, t: int):
+    """Move the first card of type t from a list of cards to a player's hand"""
+    card = next(card for card in source if card_type(card.color, card.number) == t)
+    source.remove(card)
+    card.reset_state()
+    destination_player.add_card(card)
+
+
+def apply_record(state: GameState, record: LogRecord):
+    """
+    Replay one logged event on a state from GameState.for_replay: its cards are moved as logged instead
+    of being chosen at random, and the record is added to the state's own log.
+    """
+    player = state.players[record.seat]
+    if record.kind == TURN:
+        state.turn_count = state.log.turn_count         #Turns are counted from 0
+        state.current_index = record.seat
+        state.has_drawn = False
+        state.has_taken = False
+    elif record.kind in (DEAL, DRAW):
+        for t in record.card_types:
+            _move_card(state.deck, player, t)
+        state.has_drawn = state.has_drawn or record.kind == DRAW
+    elif record.kind == TAKE:
+        target = state.players[record.target]
+        _move_card(target.cards, player, record.card_types[0])
+        state.has_taken = True
+        if not target.cards:
+            state.winner = target
+    elif record.kind == DISCARD:
+        for t in record.card_types:
+            card = next(card for card in player.cards if card_type(card.color, card.number) == t)
+            player.remove_card(card)
+            card.reset_state()
+            state.deck.append(card)
+        if not player.cards:
+            state.winner = player
+
+    state.log.append(record)
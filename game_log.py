@@ -0,0 +1,133 @@
+import struct
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+'''
+Compact binary action logs.
+
+A log starts with a header: magic, format version, the game's seed and the strategy of each seat
+('HUMAN' for human players). Every event of the game follows as one record:
+
+    byte 0          kind << 4 | seat
+    DEAL, DRAW,     number of cards, then one byte per card type
+    DISCARD
+    TAKE            target seat, card type
+    TURN, PASS      nothing else
+
+Card types are the 0-39 indices of hand_counts.card_type. All random outcomes (dealt, drawn, taken and
+discarded cards) are in the log, so a replay does not depend on how they were chosen, and the seed lets
+a computer-only game be re-run from scratch with the same strategy random streams. A game of a few
+hundred turns takes a few kilobytes.
+'''
+
+MAGIC = b'NOTTYLOG'
+VERSION = 1
+HEADER = struct.Struct('<8sBQB')        #Magic, version, seed, player count
+
+DEAL, TURN, PASS, DRAW, TAKE, DISCARD = range(6)
+KIND_NAMES = ('deal', 'turn', 'pass', 'draw', 'take', 'discard')
+HUMAN = 'HUMAN'
+
+
+class LogRecord(NamedTuple):
+    kind: int
+    seat: int
+    card_types: Tuple[int, ...] = ()
+    target: Optional[int] = None
+
+
+class GameLog:
+    """Seed, seating and records of one game"""
+    def __init__(self, seed: int, strategies: List[str], records: Optional[List[LogRecord]] = None):
+        self.seed = seed
+        self.strategies = strategies
+        self.records = []
+        self.turn_count = 0
+        for record in records or ():
+            self.append(record)
+
+
+    def append(self, record: LogRecord):
+        self.records.append(record)
+        self.turn_count += record.kind == TURN
+
+
+    def deal(self, seat: int, card_types: Iterable[int]):
+        self.append(LogRecord(DEAL, seat, tuple(card_types)))
+
+
+    def turn(self, seat: int):
+        self.append(LogRecord(TURN, seat))
+
+
+    def pass_turn(self, seat: int):
+        self.append(LogRecord(PASS, seat))
+
+
+    def draw(self, seat: int, card_types: Iterable[int]):
+        self.append(LogRecord(DRAW, seat, tuple(card_types)))
+
+
+    def take(self, seat: int, target: int, card_type: int):
+        self.append(LogRecord(TAKE, seat, (card_type,), target))
+
+
+    def discard(self, seat: int, card_types: Iterable[int]):
+        self.append(LogRecord(DISCARD, seat, tuple(card_types)))
+
+
+    def to_bytes(self) -> bytes:
+        data = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, len(self.strategies)))
+        for strategy in self.strategies:
+            name = strategy.encode('ascii')
+            data.append(len(name))
+            data += name
+
+        for record in self.records:
+            data.append(record.kind << 4 | record.seat)
+            if record.kind == TAKE:
+                data.append(record.target)
+                data.append(record.card_types[0])
+            elif record.kind in (DEAL, DRAW, DISCARD):
+                data.append(len(record.card_types))
+                data += bytes(record.card_types)
+        return bytes(data)
+
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GameLog':
+        magic, version, seed, player_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a game log of version {VERSION}")
+
+        offset = HEADER.size
+        strategies = []
+        for _ in range(player_count):
+            length = data[offset]
+            strategies.append(data[offset + 1:offset + 1 + length].decode('ascii'))
+            offset += 1 + length
+
+        records = []
+        while offset < len(data):
+            kind, seat = data[offset] >> 4, data[offset] & 0x0F
+            offset += 1
+            if kind == TAKE:
+                records.append(LogRecord(kind, seat, (data[offset + 1],), data[offset]))
+                offset += 2
+            elif kind in (DEAL, DRAW, DISCARD):
+                count = data[offset]
+                records.append(LogRecord(kind, seat, tuple(data[offset + 1:offset + 1 + count])))
+                offset += 1 + count
+            else:
+                records.append(LogRecord(kind, seat))
+        return cls(seed, strategies, records)
+
+
+    def save(self, path: str):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+
+    @classmethod
+    def load(cls, path: str) -> 'GameLog':
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
@@ -0,0 +1,202 @@
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Iterable, Iterator, List, Tuple
+
+'''
+Hands and decks as card-type counts.
+
+The deck holds two copies of each of the 40 (colour, number) card types, so any hand or
+deck can be described by a tuple of 40 counts indexed by card type. This representation is
+hashable, cheap to copy and independent of pygame Card objects, which makes it suitable for
+memoisation and for enumerating action outcomes.
+'''
+
+COLOURS = ('red', 'blue', 'green', 'yellow')
+NUMBERS = tuple(range(1, 11))
+COLOUR_INDEX = {colour: index for index, colour in enumerate(COLOURS)}
+
+NUMBER_COUNT = len(NUMBERS)
+TYPE_COUNT = len(COLOURS) * NUMBER_COUNT
+COPIES_PER_TYPE = 2
+
+EMPTY_HAND = (0,) * TYPE_COUNT
+FULL_DECK = (COPIES_PER_TYPE,) * TYPE_COUNT
+
+Counts = Tuple[int, ...]
+PACKED_COUNTS_SIZE = TYPE_COUNT // 4
+
+
+def card_type(colour: str, number: int) -> int:
+    return COLOUR_INDEX[colour] * NUMBER_COUNT + number - 1
+
+
+def type_colour(card_type_index: int) -> str:
+    return COLOURS[card_type_index // NUMBER_COUNT]
+
+
+def type_number(card_type_index: int) -> int:
+    return card_type_index % NUMBER_COUNT + 1
+
+
+def counts_from_cards(cards: Iterable) -> Counts:
+    """Count the card types of any objects with 'color' and 'number' attributes"""
+    counts = [0] * TYPE_COUNT
+    for card in cards:
+        counts[COLOUR_INDEX[card.color] * NUMBER_COUNT + card.number - 1] += 1
+    return tuple(counts)
+
+
+def add_types(counts: Counts, card_types: Iterable[int]) -> Counts:
+    new_counts = list(counts)
+    for t in card_types:
+        new_counts[t] += 1
+    return tuple(new_counts)
+
+
+def remove_types(counts: Counts, card_types: Iterable[int]) -> Counts:
+    new_counts = list(counts)
+    for t in card_types:
+        new_counts[t] -= 1
+    return tuple(new_counts)
+
+
+def has_valid_group(counts: Counts) -> bool:
+    for start in range(0, TYPE_COUNT, NUMBER_COUNT):       #Runs of at least 3 consecutive numbers in one colour
+        run = 0
+        for t in range(start, start + NUMBER_COUNT):
+            if counts[t]:
+                run += 1
+                if run == 3:
+                    return True
+            else:
+                run = 0
+
+    for n in range(NUMBER_COUNT):                           #Sets of at least 3 colours with the same number
+        if (counts[n] > 0) + (counts[n + 10] > 0) + (counts[n + 20] > 0) + (counts[n + 30] > 0) >= 3:
+            return True
+
+    return False
+
+
+def forms_group_with(counts: Counts, added_types: Iterable[int]) -> bool:
+    """
+    Check whether a valid group contains at least one of the added card types.
+    counts must already include the added types. For a hand without valid groups before
+    the addition, this is equivalent to has_valid_group but only inspects the neighbourhood
+    of the added cards.
+    """
+    for t in added_types:
+        colour_start = t - t % NUMBER_COUNT
+        low = t
+        while low > colour_start and counts[low - 1]:
+            low -= 1
+        high = t
+        while high < colour_start + NUMBER_COUNT - 1 and counts[high + 1]:
+            high += 1
+        if high - low >= 2:
+            return True
+
+        n = t % NUMBER_COUNT
+        if (counts[n] > 0) + (counts[n + 10] > 0) + (counts[n + 20] > 0) + (counts[n + 30] > 0) >= 3:
+            return True
+
+    return False
+
+
+def groups_starting_at(counts: Counts, t: int) -> Iterator[Tuple[int, ...]]:
+    """Valid groups whose smallest card type is t, given that no smaller type is in counts"""
+    colour_start = t - t % NUMBER_COUNT
+    end = t + 1
+    while end < colour_start + NUMBER_COUNT and counts[end]:
+        end += 1
+        if end - t >= 3:
+            yield tuple(range(t, end))
+
+    n = t % NUMBER_COUNT
+    other_colours = [u for u in range(t + NUMBER_COUNT, TYPE_COUNT, NUMBER_COUNT) if counts[u]]
+    for size in range(2, len(other_colours) + 1):
+        for others in combinations(other_colours, size):
+            yield (t,) + others
+
+
+@lru_cache(maxsize=1 << 17)
+def best_discard(counts: Counts) -> Tuple[int, Tuple[Tuple[int, ...], ...]]:
+    """
+    Returns: (discard_count, groups)
+    The largest number of cards that can be discarded from the hand using disjoint valid groups,
+    and one combination of groups (as tuples of card types) achieving it.
+    Same optimum as CollectionOfCards.find_best_discard_count, found by a memoised search instead of an ILP.
+    """
+    if not has_valid_group(counts):
+        return (0, ())
+
+    t = 0
+    while not counts[t]:
+        t += 1
+
+    #The smallest remaining card type is either kept in hand, or is the smallest card of one discarded group
+    best_count, best_groups = best_discard(counts[:t] + (counts[t] - 1,) + counts[t + 1:])
+    for group in groups_starting_at(counts, t):
+        remaining = list(counts)
+        for u in group:
+            remaining[u] -= 1
+        rest_count, rest_groups = best_discard(tuple(remaining))
+        if rest_count + len(group) > best_count:
+            best_count = rest_count + len(group)
+            best_groups = (group,) + rest_groups
+
+    return (best_count, best_groups)
+
+
+def max_discard(counts: Counts) -> int:
+    return best_discard(counts)[0]
+
+
+def discard_best_groups(counts: Counts) -> Tuple[Counts, List[int]]:
+    """Returns: (hand after discarding the best groups, discarded card types)"""
+    discarded = [t for group in best_discard(counts)[1] for t in group]
+    if not discarded:
+        return counts, discarded
+    return remove_types(counts, discarded), discarded
+
+
+def pack_counts(counts: Counts) -> bytes:
+    """Counts in 10 bytes, 2 bits per type with type 0 in the highest bits, so byte order equals tuple order"""
+    packed = 0
+    for count in counts:
+        packed = (packed << 2) | count
+    return packed.to_bytes(PACKED_COUNTS_SIZE, 'big')
+
+
+def unpack_counts(data: bytes) -> Counts:
+    packed = int.from_bytes(data[:PACKED_COUNTS_SIZE], 'big')
+    return tuple((packed >> 2 * (TYPE_COUNT - 1 - t)) & 3 for t in range(TYPE_COUNT))
+
+
+def types_list(counts: Counts) -> List[int]:
+    """Expand counts into a list with one entry per card"""
+    return [t for t in range(TYPE_COUNT) for _ in range(counts[t])]
+
+
+def draw_outcomes(deck_counts: Counts, draw_count: int) -> Iterator[Tuple[Tuple[int, ...], float]]:
+    """
+    Every distinct multiset of card types that can be drawn from the deck, with its probability.
+    Identical copies are merged, so there are at most as many outcomes as combinations of deck cards.
+    """
+    deck_size = sum(deck_counts)
+    if draw_count > deck_size:
+        return
+    total = comb(deck_size, draw_count)
+    available = [t for t in range(TYPE_COUNT) if deck_counts[t]]
+
+    def extend(start: int, remaining: int, drawn: Tuple[int, ...], ways: int):
+        if remaining == 0:
+            yield drawn, ways / total
+            return
+        for i in range(start, len(available)):
+            t = available[i]
+            for m in range(1, min(deck_counts[t], remaining) + 1):
+                yield from extend(i + 1, remaining - m, drawn + (t,) * m, ways * comb(deck_counts[t], m))
+
+    yield from extend(0, draw_count, (), 1)
@@ -0,0 +1,232 @@
+import copy
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from collection_of_cards import CollectionOfCards
+from decision_worker import real_action
+from turn_planner import TurnPlanner
+
+'''
+Background hint calculation for the human player.
+
+The hint panel's probabilities, expectations and whole-turn plans used to be calculated on the thread that
+handles events and draws, freezing the window for up to a few seconds after every draw, take and discard.
+HintWorker calculates them on a daemon thread, one action at a time, and the game shows each result as it
+arrives: drawing 1 card and taking first, as they are quick, then drawing 2 and 3 cards and the plans.
+
+Each calculation is started for a key of the game state it was started on. Starting another calculation,
+or cancelling, stops the one in flight after the action it is on, and its results are dropped even if they
+are already queued, so a stale result never overwrites the hints of a newer state.
+
+Once the hints of the current state are complete, a second worker precomputes the hints of the states the
+next action most likely leads to: drawing each distinct card type in the deck, which only needs the quick
+take hints, then taking each distinct card type from each other player. A follow-up state whose hand has a
+valid group gets its best discard instead, as the panel shows that. The results go to a bounded HintCache keyed by the card types of
+the hands and the deck, so the panel is complete as soon as the action has been played.
+'''
+
+HintUpdate = Tuple[Dict, Dict, Dict]    #Probabilities, expectations and plans to add to the hints
+CachedHints = Tuple[Dict, Dict, Dict, Optional[List[List[Tuple[str, int]]]]]   #Hints, or the best discard as card types
+
+HINT_CACHE_SIZE = 128           #States kept in the hint cache, more than the follow-ups of one state
+
+
+def hint_updates(player, game_state: Dict, draws: bool, takes: bool, plans: bool,
+                 max_hand_size: int) -> Iterator[HintUpdate]:
+    """The hints of player for game_state one action at a time, quickest first"""
+    if draws:
+        action, probability = player.calculate_draw_probability(1, game_state)
+        yield {action: probability}, {}, {}
+        action, value = player.calculate_draw_expectation(1, game_state)
+        yield {}, {action: value}, {}
+    if takes:
+        for target_player in game_state['other_players']:
+            action, probability = player.calculate_take_probability(game_state, target_player)
+            yield {action: probability}, {}, {}
+            action, value = player.calculate_take_expectations(game_state, target_player)
+            yield {}, {action: value}, {}
+    if draws:
+        for draw_count in (2, 3):
+            action, probability = player.calculate_draw_probability(draw_count, game_state)
+            yield {action: probability}, {}, {}
+            action, value = player.calculate_draw_expectation(draw_count, game_state)
+            yield {}, {action: value}, {}
+    if plans:
+        _, plan_values = player.plan_turn(game_state, max_hand_size)
+        yield {}, {}, plan_values
+
+
+def live_update(update: HintUpdate, originals: Dict[int, object]) -> HintUpdate:
+    """An update calculated on a snapshot, naming the live players instead of their copies"""
+    probabilities, expectations, plans = update
+    return ({real_action(action, originals): value for action, value in probabilities.items()},
+            {real_action(action, originals): value for action, value in expectations.items()},
+            {tuple(real_action(action, originals) for action in plan): value for plan, value in plans.items()})
+
+
+def hint_cache_key(hand: List, opponents: List[Tuple[object, List]], deck: List, draws: bool,
+                   takes: bool) -> Hashable:
+    """The hints of a state only depend on the card types of the hands and the deck, and on the actions left"""
+    def types(cards):
+        return tuple(sorted((card.color, card.number) for card in cards))
+    return (types(hand), tuple((player, types(cards)) for player, cards in opponents), types(deck), draws, takes)
+
+
+def speculative_hints(snapshot: Dict, originals: Dict[int, object], draws: bool, takes: bool,
+                      max_hand_size: int) -> Iterator[Optional[Tuple[Hashable, CachedHints]]]:
+    """
+    The cache keys and hints of the likely states after the next action on snapshot, draws of 1 card first as
+    they are quick, each kind of action by how likely its outcome is. None is yielded between actions, as a point to be cancelled at.
+    """
+    planner = TurnPlanner(max_hand_size)
+    player = snapshot['current_player']
+    take_follow_ups = []                            #Probability, state, draws and takes left
+    draw_follow_ups = []
+    if takes:
+        for target_player in snapshot['other_players']:
+            if not planner.can_take(len(player.cards), len(target_player.cards)):
+                continue
+            counts = Counter((card.color, card.number) for card in target_player.cards)
+            for card_type, count in counts.items():
+                card = next(card for card in target_player.cards if (card.color, card.number) == card_type)
+                target_after = copy.copy(target_player)
+                target_after.cards = [other for other in target_player.cards if other is not card]
+                originals[id(target_after)] = originals[id(target_player)]
+                state = follow_up_state(snapshot, player.cards + [card], target_player, target_after)
+                take_follow_ups.append((count / len(target_player.cards), state, draws, False))
+    if draws and planner.can_draw(len(player.cards), len(snapshot['deck_cards']), 1):
+        counts = Counter((card.color, card.number) for card in snapshot['deck_cards'])
+        for card_type, count in counts.most_common():
+            card = next(card for card in snapshot['deck_cards'] if (card.color, card.number) == card_type)
+            state = follow_up_state(snapshot, player.cards + [card])
+            state['deck_cards'] = [other for other in snapshot['deck_cards'] if other is not card]
+            state['deck_size'] = len(state['deck_cards'])
+            draw_follow_ups.append((count / len(snapshot['deck_cards']), state, False, takes))
+    take_follow_ups.sort(key=lambda follow_up: -follow_up[0])
+
+    for _, state, next_draws, next_takes in draw_follow_ups + take_follow_ups:
+        hand = state['current_player'].cards
+        key = hint_cache_key(hand, [(originals[id(other)], other.cards) for other in state['other_players']],
+                             state['deck_cards'], next_draws, next_takes)
+        collection = CollectionOfCards(list(hand))
+        if collection.exist_valid_group():
+            best_discard = collection.find_best_discard() or []
+            yield key, ({}, {}, {}, [[(card.color, card.number) for card in group] for group in best_discard])
+        elif next_draws or next_takes:
+            probabilities, expectations = {}, {}
+            for update in hint_updates(state['current_player'], state, next_draws, next_takes, False, max_hand_size):
+                update_probabilities, update_expectations, _ = live_update(update, originals)
+                probabilities.update(update_probabilities)
+                expectations.update(update_expectations)
+                yield None
+            yield key, (probabilities, expectations, {}, None)
+
+
+def follow_up_state(snapshot: Dict, hand: List, target_player=None, target_after=None) -> Dict:
+    """snapshot with the current player holding hand, and target_player replaced by target_after"""
+    state = dict(snapshot)
+    state['current_player'] = copy.copy(snapshot['current_player'])
+    state['current_player'].cards = hand
+    state['other_players'] = [target_after if other is target_player else other for other in snapshot['other_players']]
+    return state
+
+
+def discard_cards(best_discard: List[List[Tuple[str, int]]], cards: List) -> List[List]:
+    """A best discard given as card types, as groups of distinct cards from cards"""
+    unused = list(cards)
+    groups = []
+    for group_types in best_discard:
+        group = []
+        for card_type in group_types:
+            card = next(card for card in unused if (card.color, card.number) == card_type)
+            unused.remove(card)
+            group.append(card)
+        groups.append(group)
+    return groups
+
+
+class HintCache:
+    def __init__(self, size: int = HINT_CACHE_SIZE):
+        """The hints of up to size states, dropping the least recently used"""
+        self.size = size
+        self._hints: OrderedDict = OrderedDict()
+
+
+    def get(self, key: Hashable) -> Optional[CachedHints]:
+        if key not in self._hints:
+            return None
+        self._hints.move_to_end(key)
+        return self._hints[key]
+
+
+    def put(self, key: Hashable, hints: CachedHints):
+        self._hints[key] = hints
+        self._hints.move_to_end(key)
+        while len(self._hints) > self.size:
+            self._hints.popitem(last=False)
+
+
+    def clear(self):
+        self._hints.clear()
+
+
+class HintWorker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0                    #Changes with every start and cancel
+        self._updates: List = []
+        self._error: Optional[BaseException] = None
+        self.key: Optional[Hashable] = None     #Game state of the calculation in flight
+        self.running = False
+
+
+    def start(self, key: Hashable, updates: Iterator):
+        """
+        Calculate updates on a background thread for the game state key, cancelling the calculation in flight.
+        An update of None only marks a point where the calculation can be cancelled.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._updates = []
+            self._error = None
+            self.key = key
+            self.running = True
+
+        def run():
+            try:
+                for update in updates:
+                    with self._lock:
+                        if generation != self._generation:
+                            return
+                        if update is not None:
+                            self._updates.append(update)
+            except BaseException as error:
+                with self._lock:
+                    if generation == self._generation:
+                        self._error = error
+            finally:
+                with self._lock:
+                    if generation == self._generation:
+                        self.running = False
+
+        threading.Thread(target=run, name="hints", daemon=True).start()
+
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            self._updates = []
+            self.key = None
+            self.running = False
+
+
+    def poll(self) -> List:
+        """The updates that arrived since the last poll; raises the error the calculation stopped with"""
+        with self._lock:
+            error, self._error = self._error, None
+            updates, self._updates = self._updates, []
+        if error:
+            raise error
+        return updates
@@ -0,0 +1,123 @@
+import math
+import random
+import time
+from typing import Dict, List, Optional
+
+from packed_state import (PackedState, apply_action, canonical_key, from_counts_state, hand_size, legal_actions,
+                          sample_outcome, winner)
+from rules_engine import MAX_HAND_SIZE, Action, CountsState
+
+
+class _Node:
+    """Statistics of one decision state, shared by every path reaching it through the transposition table"""
+    __slots__ = ('actions', 'visits', 'action_visits', 'action_rewards', 'untried')
+
+    def __init__(self, actions: List[Action], rng: random.Random):
+        self.actions = actions
+        self.visits = 0
+        self.action_visits = {action: 0 for action in actions}
+        self.action_rewards = {action: 0.0 for action in actions}
+        self.untried = actions.copy()
+        rng.shuffle(self.untried)
+
+
+    def select(self, exploration: float) -> Action:
+        if self.untried:
+            return self.untried.pop()
+        log_visits = math.log(self.visits)
+        return max(
+            self.actions,
+            key=lambda action: self.action_rewards[action] / self.action_visits[action]
+            + exploration * math.sqrt(log_visits / self.action_visits[action])
+        )
+
+
+class MonteCarloTreeSearch:
+    """
+    UCT search over draw/take/pass sequences on CountsState, played on its int-packed form (packed_state).
+    Draws and takes are chance nodes: each iteration samples their outcome from the true distribution
+    (uniform over the unseen deck cards or over the target's hand), and the resulting state is looked up
+    in a transposition table keyed by the canonical state, so identical positions reached through
+    different outcomes share statistics.
+    Rewards are per player: 1 for the winner, or a hand-size based estimate when a rollout is cut off.
+    """
+    def __init__(self, iterations: int = 2000, time_limit: float = 2.0, exploration: float = 1.0,
+                 rollout_depth: int = 12, tree_depth: int = 24, max_hand_size: int = MAX_HAND_SIZE,
+                 rng: Optional[random.Random] = None):
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.tree_depth = tree_depth
+        self.MAX_HAND_SIZE = max_hand_size
+        self.rng = rng or random.Random()
+
+        self.table: Dict[tuple, _Node] = {}
+        self.last_iterations = 0
+        self.last_elapsed = 0.0
+
+
+    def best_action(self, state: CountsState) -> Action:
+        """Search from state within the iteration and time budget (at least one iteration), and return the most visited action"""
+        state = from_counts_state(state)
+        actions = legal_actions(state, self.MAX_HAND_SIZE)
+        if len(actions) == 1:
+            return actions[0]
+
+        self.table.clear()
+        start_time = time.perf_counter()
+        iterations = 0
+        while iterations == 0 or (iterations < self.iterations and time.perf_counter() - start_time < self.time_limit):
+            self._iterate(state)                    #The first iteration expands the root, whatever the budget
+            iterations += 1
+
+        self.last_iterations = iterations
+        self.last_elapsed = time.perf_counter() - start_time
+
+        root = self.table[canonical_key(state)]
+        return max(root.actions, key=lambda action: root.action_visits[action])
+
+
+    def _iterate(self, state: PackedState):
+        path = []
+        for _ in range(self.tree_depth):
+            if winner(state) is not None:
+                break
+
+            key = canonical_key(state)
+            node = self.table.get(key)
+            if node is None:
+                self.table[key] = _Node(legal_actions(state, self.MAX_HAND_SIZE), self.rng)
+                break
+
+            action = node.select(self.exploration)
+            path.append((node, action, state.current))
+            state = apply_action(state, action, sample_outcome(state, action, self.rng))
+
+        rewards = self._rollout(state)
+
+        for node, action, player in path:
+            node.visits += 1
+            node.action_visits[action] += 1
+            node.action_rewards[action] += rewards[player]
+
+
+    def _rollout(self, state: PackedState) -> List[float]:
+        """Play random legal actions until someone wins or the depth limit is reached"""
+        for _ in range(self.rollout_depth):
+            if winner(state) is not None:
+                break
+            action = self.rng.choice(legal_actions(state, self.MAX_HAND_SIZE))
+            state = apply_action(state, action, sample_outcome(state, action, self.rng))
+        return self._rewards(state)
+
+
+    def _rewards(self, state: PackedState) -> List[float]:
+        won = winner(state)
+        if won is not None:
+            return [1.0 if index == won else 0.0 for index in range(len(state.hands))]
+
+        #Unfinished game: share the win between players in inverse proportion to their hand sizes
+        weights = [1 / (1 + hand_size(hand)) for hand in state.hands]
+        total = sum(weights)
+        return [weight / total for weight in weights]
@@ -0,0 +1,160 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from multiprocessing import Pool
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from hand_counts import (COPIES_PER_TYPE, FULL_DECK, NUMBER_COUNT, PACKED_COUNTS_SIZE, TYPE_COUNT, Counts, add_types,
+                         draw_outcomes, forms_group_with, has_valid_group, max_discard, pack_counts)
+from rules_engine import INITIAL_HAND_SIZE
+
+'''
+Precomputed opening table.
+
+For every hand without valid groups up to a maximum size, the table stores the expected hand reduction
+and the probability of forming a valid group when drawing 1, 2 or 3 cards from a full deck (all cards
+not in the hand). Hands that only differ by a renaming of the colours share one record.
+
+File layout: a header (magic, version, maximum hand size, record count) followed by fixed-size records
+sorted by key. A key packs the 40 card-type counts into 10 bytes, 2 bits per type with type 0 in the
+highest bits, so byte order equals the order of the count tuples. The values are 6 float32: draw
+expectations for 1, 2, 3 cards, then draw probabilities for 1, 2, 3 cards.
+The file is memory-mapped and searched in place, so loading it costs nothing.
+'''
+
+MAGIC = b'NOTTYOPN'
+VERSION = 1
+HEADER = struct.Struct('<8sHHI')
+KEY_SIZE = PACKED_COUNTS_SIZE
+VALUES = struct.Struct('<6f')
+RECORD_SIZE = KEY_SIZE + VALUES.size
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_table.bin')
+
+
+class OpeningEntry(NamedTuple):
+    draw_expectations: Tuple[float, float, float]
+    draw_probabilities: Tuple[float, float, float]
+
+
+def canonical_hand(counts: Counts) -> Counts:
+    """Representative of all hands that only differ by a renaming of the colours"""
+    colour_rows = sorted((counts[start:start + NUMBER_COUNT] for start in range(0, TYPE_COUNT, NUMBER_COUNT)), reverse=True)
+    return tuple(count for row in colour_rows for count in row)
+
+
+def pack_key(counts: Counts) -> bytes:
+    return pack_counts(counts)
+
+
+def iter_canonical_hands(max_size: int) -> Iterator[Counts]:
+    """Canonical hands without valid groups, of 1 to max_size cards"""
+    hand = [0] * TYPE_COUNT
+
+    def extend(start: int, size: int):
+        if size:
+            counts = tuple(hand)
+            if counts == canonical_hand(counts) and not has_valid_group(counts):
+                yield counts
+        if size == max_size:
+            return
+        for t in range(start, TYPE_COUNT):
+            if hand[t] < COPIES_PER_TYPE:
+                hand[t] += 1
+                yield from extend(t, size + 1)
+                hand[t] -= 1
+
+    yield from extend(0, 0)
+
+
+def hand_values(hand: Counts) -> Tuple[float, ...]:
+    """Draw expectations and draw probabilities for 1, 2, 3 cards against the full deck minus the hand"""
+    deck = tuple(FULL_DECK[t] - hand[t] for t in range(TYPE_COUNT))
+    expectations, probabilities = [], []
+    for draw_count in range(1, 4):
+        expected_discard, group_probability = 0.0, 0.0
+        for drawn, probability in draw_outcomes(deck, draw_count):
+            new_hand = add_types(hand, drawn)
+            if forms_group_with(new_hand, drawn):
+                expected_discard += probability * max_discard(new_hand)
+                group_probability += probability
+        expectations.append(expected_discard - draw_count)
+        probabilities.append(group_probability)
+    return tuple(expectations + probabilities)
+
+
+def _record(hand: Counts) -> bytes:
+    return pack_key(hand) + VALUES.pack(*hand_values(hand))
+
+
+def build_table(path: str = DEFAULT_TABLE_PATH, max_size: int = INITIAL_HAND_SIZE, processes: Optional[int] = None):
+    """Compute every record in a process pool and write the sorted table to path"""
+    hands = list(iter_canonical_hands(max_size))
+    with Pool(processes) as pool:
+        records: List[bytes] = pool.map(_record, hands, chunksize=64)
+    records.sort()
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_size, len(records)))
+        for record in records:
+            file.write(record)
+
+
+class OpeningTable:
+    """Read-only view of a table file, searched with a binary search over the memory-mapped records"""
+    def __init__(self, path: str = DEFAULT_TABLE_PATH):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_size, self.record_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not an opening table of version {VERSION}")
+
+
+    def lookup(self, counts: Counts) -> Optional[OpeningEntry]:
+        """Entry of a hand without valid groups, or None if the hand is larger than the table's maximum size"""
+        if not 0 < sum(counts) <= self.max_size:
+            return None
+
+        key = pack_key(canonical_hand(counts))
+        low, high = 0, self.record_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD_SIZE
+            record_key = self._map[offset:offset + KEY_SIZE]
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                values = VALUES.unpack_from(self._map, offset + KEY_SIZE)
+                return OpeningEntry(values[:3], values[3:])
+        return None
+
+
+    def close(self):
+        self._map.close()
+
+
+_loaded_tables = {}
+
+
+def load_opening_table(path: str = DEFAULT_TABLE_PATH) -> Optional[OpeningTable]:
+    """Shared table for path, or None if it has not been built"""
+    if path not in _loaded_tables:
+        _loaded_tables[path] = OpeningTable(path) if os.path.exists(path) else None
+    return _loaded_tables[path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening table used by the X-DEFENSIVE and X-AGGRESSIVE players")
+    parser.add_argument('--max-size', type=int, default=INITIAL_HAND_SIZE, help="largest hand size in the table")
+    parser.add_argument('--output', default=DEFAULT_TABLE_PATH)
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    build_table(args.output, args.max_size, args.processes)
+    print(f"Wrote {args.output} in {time.time() - start_time:.1f}s")
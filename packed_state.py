@@ -0,0 +1,193 @@
+import random
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+from hand_counts import COPIES_PER_TYPE, NUMBER_COUNT, TYPE_COUNT, Counts, discard_best_groups
+from rules_engine import (AFTER_DRAW, AFTER_TAKE, MAX_DRAW_COUNT, MAX_HAND_SIZE, PASS_ACTION, TURN_START, Action,
+                          CountsState, draw_allowed, must_pass, take_allowed)
+
+'''
+Headless Notty rules on int-packed hands, for search players that branch states many times.
+
+A hand is one int holding the 40 card-type counts in 2 bits each, type t in bits 2t and 2t+1, so adding
+or removing a card is one addition and states are a tuple of a few ints. The deck is implied as
+FULL_DECK minus the hands. Derived states share everything they do not change and the parent state is
+never modified, so undoing an action is keeping the parent: apply and undo cost no copies of hands or decks.
+
+Valid groups are found with bit masks instead of loops over the 40 counts. Draws can either be sampled
+from the deck counts (chance nodes) or taken from the deck order. The order is shuffled lazily: only the
+cards about to be drawn are fixed, when a draw first needs them, and derived states share them until a
+discard puts cards back into the deck, which the GUI answers with a reshuffle too.
+The rules are those of rules_engine, and states convert to and from CountsState.
+'''
+
+ONE = sum(1 << 2 * t for t in range(TYPE_COUNT))                 #Count 1 of every type
+FULL_DECK = COPIES_PER_TYPE * ONE
+ROW_BITS = 2 * NUMBER_COUNT                                         #Bits of one colour
+ROW_MASK = (1 << ROW_BITS) - 1
+RUN_STARTS = sum(1 << 2 * t for t in range(TYPE_COUNT) if t % NUMBER_COUNT <= NUMBER_COUNT - 3)
+
+HAND_BYTES = TYPE_COUNT // 4
+BYTE_TYPES = tuple(                         #Card types of each value of each byte of a hand, one entry per card
+    tuple(tuple(4 * position + slot for slot in range(4) for _ in range((value >> 2 * slot) & 3)) for value in range(256))
+    for position in range(HAND_BYTES)
+)
+
+
+class PackedState(NamedTuple):
+    hands: Tuple[int, ...]
+    current: int = 0
+    phase: int = TURN_START
+    order: Tuple[int, ...] = ()                   #Card types on top of the deck, in drawing order, as far as fixed
+
+
+def pack_counts(counts: Counts) -> int:
+    packed = 0
+    for t, count in enumerate(counts):
+        packed |= count << 2 * t
+    return packed
+
+
+def unpack_counts(hand: int) -> Counts:
+    return tuple((hand >> 2 * t) & 3 for t in range(TYPE_COUNT))
+
+
+def from_counts_state(state: CountsState) -> PackedState:
+    return PackedState(tuple(pack_counts(hand) for hand in state.hands), state.current, state.phase)
+
+
+def to_counts_state(state: PackedState) -> CountsState:
+    return CountsState(tuple(unpack_counts(hand) for hand in state.hands), state.current, state.phase)
+
+
+def hand_size(hand: int) -> int:
+    return (hand & ONE).bit_count() + 2 * (hand >> 1 & ONE).bit_count()
+
+
+def hand_types(hand: int) -> List[int]:
+    """One entry per card"""
+    types = []
+    for table, value in zip(BYTE_TYPES, hand.to_bytes(HAND_BYTES, 'little')):
+        types += table[value]
+    return types
+
+
+def deck(state: PackedState) -> int:
+    return FULL_DECK - sum(state.hands)
+
+
+def has_valid_group(hand: int) -> bool:
+    present = (hand | hand >> 1) & ONE
+    if present & present >> 2 & present >> 4 & RUN_STARTS:                   #3 consecutive numbers of one colour
+        return True
+    red, blue, green, yellow = (present & ROW_MASK, present >> ROW_BITS & ROW_MASK,
+                                present >> 2 * ROW_BITS & ROW_MASK, present >> 3 * ROW_BITS)
+    return bool(red & blue & (green | yellow) | green & yellow & (red | blue))  #The same number in 3 colours
+
+
+@lru_cache(maxsize=1 << 17)
+def discard_best_groups_packed(hand: int) -> int:
+    """Hand left after discarding its best groups, the same optimum as hand_counts.discard_best_groups"""
+    remaining, _ = discard_best_groups(unpack_counts(hand))
+    return pack_counts(remaining)
+
+
+def winner(state: PackedState) -> Optional[int]:
+    for index, hand in enumerate(state.hands):
+        if not hand:
+            return index
+    return None
+
+
+def canonical_key(state: PackedState) -> tuple:
+    """Key shared by all states that only differ by a renaming of the colours, like rules_engine.canonical_key"""
+    colour_rows = sorted(tuple(hand >> ROW_BITS * colour & ROW_MASK for hand in state.hands) for colour in range(4))
+    return (tuple(colour_rows), state.current, state.phase)
+
+
+def legal_actions(state: PackedState, max_hand_size: int = MAX_HAND_SIZE) -> List[Action]:
+    if winner(state) is not None:
+        return []
+
+    size = hand_size(state.hands[state.current])
+    actions = [PASS_ACTION]
+    if must_pass(size, max_hand_size):
+        return actions
+
+    if state.phase != AFTER_DRAW:
+        deck_size = hand_size(deck(state))
+        for draw_count in range(1, MAX_DRAW_COUNT + 1):
+            if draw_allowed(size, deck_size, draw_count, max_hand_size):
+                actions.append(('draw', draw_count, None))
+
+    if state.phase != AFTER_TAKE:
+        for target, hand in enumerate(state.hands):
+            if target != state.current and take_allowed(size, hand_size(hand), max_hand_size):
+                actions.append(('take', None, target))
+
+    return actions
+
+
+def sample_outcome(state: PackedState, action: Action, rng: random.Random = random) -> Tuple[int, ...]:
+    """Draw the cards gained by an action at random from the counts, ignoring any deck order"""
+    action_type, draw_count, target = action
+    if action_type == 'take':
+        return (rng.choice(hand_types(state.hands[target])),)
+    if action_type == 'draw':
+        return tuple(rng.sample(hand_types(deck(state)), draw_count))
+    return ()
+
+
+def draw_cards(state: PackedState, draw_count: int, rng: random.Random = random) -> Tuple[PackedState, Tuple[int, ...]]:
+    """
+    Draw the top cards of the deck order, fixing the cards below the known part of the order at random first.
+    Returns the state with the extended order and the drawn types; pass both to apply_action to keep the order.
+    """
+    missing = draw_count - len(state.order)
+    if missing > 0:
+        unordered = deck(state) - sum(1 << 2 * t for t in state.order)
+        state = state._replace(order=state.order + tuple(rng.sample(hand_types(unordered), missing)))
+    return state, state.order[:draw_count]
+
+
+def apply_action(state: PackedState, action: Action, gained: Tuple[int, ...] = ()) -> PackedState:
+    """
+    Play an action whose chance outcome is already known, then discard the best groups, like
+    rules_engine.apply_action. A draw of the top cards of the deck order keeps the rest of the order;
+    any other draw or a discard drops it.
+    """
+    action_type, _, target = action
+    hands = list(state.hands)
+    current = state.current
+    order = state.order
+
+    if gained:
+        new_hand = hands[current]
+        for t in gained:
+            new_hand += 1 << 2 * t
+        if action_type == 'take':
+            for t in gained:
+                hands[target] -= 1 << 2 * t
+            if not hands[target]:               #Taking the last card of a player makes that player win
+                hands[current] = new_hand
+                return PackedState(tuple(hands), current, state.phase, order)
+        elif gained == order[:len(gained)]:
+            order = order[len(gained):]
+        else:
+            order = ()
+        if has_valid_group(new_hand):
+            new_hand = discard_best_groups_packed(new_hand)
+            order = ()
+        hands[current] = new_hand
+
+    if not hands[current]:
+        return PackedState(tuple(hands), current, TURN_START)
+
+    if action_type == 'pass' or state.phase != TURN_START:
+        current = (current + 1) % len(hands)
+        if has_valid_group(hands[current]):
+            hands[current] = discard_best_groups_packed(hands[current])
+            order = ()
+        return PackedState(tuple(hands), current, TURN_START, order)
+
+    return PackedState(tuple(hands), current, AFTER_DRAW if action_type == 'draw' else AFTER_TAKE, order)
@@ -0,0 +1,169 @@
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+from player import Player
+
+'''
+View-model of the valid groups panel and the hint panel.
+
+Both panels used to search the current hand for valid groups and the best discard (which may solve an ILP)
+and render every line of text on every frame, including the redraws inside animations. PanelModel computes
+the groups once per hand version (Player.hand_version changes with every card added or removed) and renders
+the lines once per hand version and hint calculation, so drawing a panel is only blitting its cached lines.
+Lines are kept with their offsets from the panel's top-left corner, which moves with the window size.
+'''
+
+Line = Tuple[pygame.Surface, Tuple[int, int]]
+
+LINE_HEIGHT = 16
+MAX_GROUP_LINES = 18
+
+
+class PanelModel:
+    def __init__(self, colour: Tuple[int, int, int]):
+        self.colour = colour
+        self._fonts: Dict[int, pygame.font.Font] = {}
+
+        self._player: Optional[Player] = None
+        self._hand_version = -1
+        self.valid_groups: List[List] = []
+        self._best_discard: Optional[List[List]] = None
+
+        self._groups_lines: List[Line] = []
+        self._hint_key = None
+        self._hint_lines: List[Line] = []
+
+
+    def font(self, size: int) -> pygame.font.Font:
+        if size not in self._fonts:
+            self._fonts[size] = pygame.font.Font(None, size)
+        return self._fonts[size]
+
+
+    def render(self, text: str, size: int, offset: Tuple[int, int]) -> Line:
+        return self.font(size).render(text, True, self.colour), offset
+
+
+    def refresh(self, player: Player) -> bool:
+        """Recompute the groups of player's hand if it is another player or the hand changed; True if it did"""
+        if player is self._player and player.hand_version == self._hand_version:
+            return False
+        self._player = player
+        self._hand_version = player.hand_version
+        self.valid_groups = player.all_valid_groups() if player.exist_valid_group() else []
+        self._best_discard = None
+
+        self._groups_lines = []
+        if self.valid_groups:
+            self._groups_lines.append(self.render("Current Valid Groups", 28, (10, 8)))
+            y = 38
+            for i, group in enumerate(self.valid_groups[:MAX_GROUP_LINES]):
+                group_desc = ', '.join(f"{card.color} {card.number}" for card in group)
+                self._groups_lines.append(self.render(f"{i + 1}. {group_desc}", 22, (20, y)))
+                y += LINE_HEIGHT
+            if len(self.valid_groups) > MAX_GROUP_LINES:
+                remaining = len(self.valid_groups) - MAX_GROUP_LINES
+                self._groups_lines.append(self.render(f"...and {remaining} more groups", 22, (20, y)))
+        return True
+
+
+    @property
+    def best_discard(self) -> List[List]:
+        """Best discard of the hand, only solved when first needed"""
+        if self._best_discard is None:
+            self._best_discard = (self._player.find_best_discard() or []) if self.valid_groups else []
+        return self._best_discard
+
+
+    def use_best_discard(self, player: Player, best_discard: List[List]):
+        """Take best_discard, solved ahead of time, as the best discard of player's hand"""
+        self.refresh(player)
+        self._best_discard = best_discard
+
+
+    def valid_groups_lines(self, player: Player) -> List[Line]:
+        """Lines of the valid groups panel, empty if the hand has no valid group"""
+        self.refresh(player)
+        return self._groups_lines
+
+
+    def hint_lines(self, player: Player, hint_version: int, probabilities: Dict, expectations: Dict,
+                   plans: Dict, calculating: bool = False) -> List[Line]:
+        """
+        Lines of the hint panel: the best discard if the hand has valid groups, otherwise the hint calculation
+        of version hint_version (probabilities, expectations and plans of each action), followed by a note
+        while more of it is being calculated.
+        """
+        changed = self.refresh(player)
+        key = (player, self._hand_version, hint_version, calculating)
+        if not changed and key == self._hint_key:
+            return self._hint_lines
+        self._hint_key = key
+        self._hint_lines = lines = [self.render("Hint", 28, (10, 8))]
+
+        if self.valid_groups:
+            if self.best_discard:
+                lines.append(self.render("Best discard combination:", 22, (10, 38)))
+                y = 38 + LINE_HEIGHT + 3
+                for group in self.best_discard:
+                    lines.append(self.render(", ".join(str(card) for card in group), 22, (20, y)))
+                    y += LINE_HEIGHT
+            return lines
+
+        y = 48
+        if not probabilities and not expectations:
+            if calculating:
+                lines.append(self.render("Calculating...", 22, (10, y)))
+            return lines
+
+        if probabilities:
+            lines.append(self.render("Probability of obtaining a valid group:", 22, (10, y)))
+            y += LINE_HEIGHT + 3
+            for action in sorted(probabilities, key=action_sort_key):
+                if action[0] != 'pass':
+                    lines.append(self.render(f"{action_description(action)}: {probabilities[action]:.2%}", 22, (20, y)))
+                    y += LINE_HEIGHT
+
+        if expectations:
+            y += LINE_HEIGHT
+            lines.append(self.render("Expected value of the number of hand cards to be reduced:", 22, (10, y)))
+            y += LINE_HEIGHT + 3
+            for action in sorted(expectations, key=action_sort_key):
+                if action[0] != 'pass':
+                    lines.append(self.render(f"{action_description(action)}: {expectations[action]:.2f}", 22, (20, y)))
+                    y += LINE_HEIGHT
+
+        if plans:
+            y += LINE_HEIGHT
+            lines.append(self.render("Best plans for the whole turn (expected reduction):", 22, (10, y)))
+            y += LINE_HEIGHT + 3
+            for plan in sorted(plans, key=lambda plan: plans[plan], reverse=True)[:3]:
+                description = action_description(plan[0])
+                if len(plan) > 1 and plan[1][0] != 'pass':
+                    description += f", then {action_description(plan[1])}"
+                lines.append(self.render(f"{description}: {plans[plan]:.2f}", 22, (20, y)))
+                y += LINE_HEIGHT
+
+        if calculating:
+            lines.append(self.render("Calculating...", 22, (10, y + LINE_HEIGHT)))
+        return lines
+
+
+def action_sort_key(action) -> tuple:
+    """Draws by count, then takes by target name, then the pass"""
+    action_type, count_or_none, player_or_none = action
+    if action_type == 'draw':
+        return (0, count_or_none or 0)
+    elif action_type == 'take':
+        return (1, player_or_none.name)
+    return (2, 0)
+
+
+def action_description(action) -> str:
+    action_type, count_or_none, player_or_none = action
+    if action_type == 'draw':
+        return f"draw {count_or_none} cards"
+    elif action_type == 'take':
+        return f"take 1 card from {player_or_none.name}"
+    return "pass"
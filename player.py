@@ -3,6 +3,7 @@ import random
 from tkinter import Place
 from typing import List, Tuple, Optional, Dict
 from collection_of_cards import CollectionOfCards
+from turn_planner import TurnPlanner
 from card import Card
 import math
 from itertools import combinations
@@ -13,15 +14,27 @@ class Player:
     def __init__(self, name: str, is_human: bool = True):
         self.name = name
         self.is_human = is_human
+        self.hand_version = 0           #Changes whenever the hand changes, for caches of values derived from it
         self.cards: List[Card] = []    
 
+    @property
+    def cards(self) -> List[Card]:
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards: List[Card]):
+        self._cards = cards
+        self.hand_version += 1
+
     def add_card(self, card: Card, position: Tuple[int, int] = (0, 0), animate: bool = False):
         card.set_position(position[0], position[1], animate=animate)
-        self.cards.append(card)
+        self._cards.append(card)
+        self.hand_version += 1
 
     def remove_card(self, card: Card) -> Card:
-        card_index = self.cards.index(card)
-        removed_card = self.cards.pop(card_index)
+        card_index = self._cards.index(card)
+        removed_card = self._cards.pop(card_index)
+        self.hand_version += 1
         return removed_card
 
     def exist_valid_group(self) -> bool:
@@ -49,43 +62,50 @@ class Player:
         return collection.find_best_discard()
     
     def calculate_probability(self, game_state: Dict):
-        collection = CollectionOfCards(game_state['current_player'].cards.copy())
         probabilities = {}
-        
         for draw_count in range(1, 4):
-            valid_count = 0
-            if draw_count == 1:
-                for card in game_state['deck_cards']:
-                    collection.collection.append(card)
-                    if collection.exist_valid_group():
-                        valid_count += 1
-                    collection.collection.pop()
-                probabilities[('draw', 1, None)] = valid_count / game_state['deck_size']
+            action, probability = self.calculate_draw_probability(draw_count, game_state)
+            probabilities[action] = probability
+        for player in game_state['other_players']:
+            action, probability = self.calculate_take_probability(game_state, player)
+            probabilities[action] = probability
 
-            else:
-                combination_count = math.factorial(game_state['deck_size']) // (math.factorial(draw_count) * math.factorial(game_state['deck_size'] - draw_count))
-                for combination in combinations(game_state['deck_cards'], draw_count):
-                    for card in combination:
-                        collection.collection.append(card)
-                    if collection.exist_valid_group():
-                        valid_count += 1
-                    for card in combination:
-                        collection.collection.pop()
-                probabilities[('draw', draw_count, None)] = valid_count / combination_count
+        probabilities[('pass', None, None)] = 0
 
-        for player in game_state['other_players']:
-            valid_count = 0
-            for card in player.cards:
+        return probabilities
+
+
+    def calculate_draw_probability(self, draw_count: int, game_state: Dict) -> Tuple[Tuple, float]:
+        collection = CollectionOfCards(game_state['current_player'].cards.copy())
+        valid_count = 0
+        if draw_count == 1:
+            for card in game_state['deck_cards']:
                 collection.collection.append(card)
                 if collection.exist_valid_group():
                     valid_count += 1
                 collection.collection.pop()
-            probabilities[('take', None, player)] = valid_count / len(player.cards)
+            return (('draw', 1, None), valid_count / game_state['deck_size'])
 
-        probabilities[('pass', None, None)] = 0
+        combination_count = math.factorial(game_state['deck_size']) // (math.factorial(draw_count) * math.factorial(game_state['deck_size'] - draw_count))
+        for combination in combinations(game_state['deck_cards'], draw_count):
+            for card in combination:
+                collection.collection.append(card)
+            if collection.exist_valid_group():
+                valid_count += 1
+            for card in combination:
+                collection.collection.pop()
+        return (('draw', draw_count, None), valid_count / combination_count)
 
-        return probabilities
-    
+
+    def calculate_take_probability(self, game_state: Dict, target_player) -> Tuple[Tuple, float]:
+        collection = CollectionOfCards(game_state['current_player'].cards.copy())
+        valid_count = 0
+        for card in target_player.cards:
+            collection.collection.append(card)
+            if collection.exist_valid_group():
+                valid_count += 1
+            collection.collection.pop()
+        return (('take', None, target_player), valid_count / len(target_player.cards))
     
 
     def calculate_draw_expectation(self, draw_count: int, game_state: Dict) -> Tuple[Tuple, float]:
@@ -181,6 +201,14 @@ class Player:
         return take_expected_values
 
 
+    def plan_turn(self, game_state: Dict, max_hand_size: int = 20):
+        """
+        Returns: (best_plan, plan_values), plans are tuples of the first and second actions of the turn
+        plan_values: key: plans, value: expected hand reduction of the whole turn
+        """
+        return TurnPlanner(max_hand_size).plan(game_state)
+
+
     def clear_selections(self):
         for card in self.cards:
             card.selected = False
@@ -0,0 +1,254 @@
+import argparse
+import bisect
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import computer_player
+from game_engine import (PASS_ACTION, GameState, HeadlessCard, apply_record, is_legal, must_pass, play_turn,
+                         seed_players)
+from game_log import DRAW, HUMAN, KIND_NAMES, PASS, TAKE, TURN, GameLog, LogRecord
+from hand_counts import card_type, type_colour, type_number, types_list
+from state_codec import encode_state, unpack_state
+from player import Player
+from tournament import strategy_class_names
+
+'''
+Replays game logs written by the GUI, the tournament runner or any headless game.
+
+A replay applies the logged events to a headless state, so every hand and the deck contents are exactly
+those of the original game. On top of that:
+  --verify    asks every computer player for each of its logged decisions again, with its strategy random
+              stream re-derived from the game's seed, reports decisions that differ and the slowest ones;
+              games without human players are also re-run from the seed and compared record by record.
+  --turns     prints the events of every turn.
+  --seek      prints the hands at the start of a turn, found through the nearest keyframe.
+'''
+
+
+class Decision(NamedTuple):
+    turn: int
+    seat: int
+    second: bool                #First or second action of the turn
+    seconds: float
+    logged: str
+    chosen: str
+
+
+def create_players(log: GameLog) -> List[Player]:
+    class_names = strategy_class_names()
+    players = []
+    for seat, strategy in enumerate(log.strategies):
+        name = f"{strategy} {seat + 1}"
+        if strategy == HUMAN:
+            players.append(Player(name, is_human=True))
+        else:
+            players.append(getattr(computer_player, class_names[strategy])(name))
+    seed_players(players, log.seed)
+    return players
+
+
+class Keyframe(NamedTuple):
+    """state_codec snapshot of a replay before the record at record_index"""
+    record_index: int
+    snapshot: bytes
+
+
+class ReplaySeeker:
+    """
+    Random access to the states of a logged game. One pass over the log saves a keyframe every interval turns;
+    seeking restores the nearest keyframe before the target and applies only the records after it, or steps
+    forward from the current state when that is closer. The same card objects are reused for every state.
+    """
+    def __init__(self, log: GameLog, players: Optional[List] = None, interval: int = 10,
+                 card_factory: Callable[[str, int], object] = HeadlessCard):
+        self.log = log
+        self.interval = interval
+        self.state = GameState.for_replay(log, players if players is not None else create_players(log), card_factory)
+        self.cards: Dict[int, List] = {}           #Card objects of each card type
+        for card in self.state.deck:
+            self.cards.setdefault(card_type(card.color, card.number), []).append(card)
+
+        self.turn_records: List[int] = []           #Index of the TURN record of each turn
+        self.keyframes = [self.snapshot(0)]
+        for record_index, record in enumerate(log.records):
+            if record.kind == TURN:
+                if self.turn_records and len(self.turn_records) % interval == 0:
+                    self.keyframes.append(self.snapshot(record_index))
+                self.turn_records.append(record_index)
+            apply_record(self.state, record)
+        self.keyframe_records = [keyframe.record_index for keyframe in self.keyframes]
+        self.record_index = len(log.records)        #Number of records applied to self.state
+
+
+    @property
+    def turn_count(self) -> int:
+        return len(self.turn_records)
+
+
+    def snapshot(self, record_index: int) -> Keyframe:
+        return Keyframe(record_index, encode_state(self.state))
+
+
+    def restore(self, keyframe: Keyframe):
+        state = self.state
+        snapshot = unpack_state(keyframe.snapshot)
+        available = {t: list(cards) for t, cards in self.cards.items()}
+        for player, hand in zip(state.players, snapshot.hands):
+            player.cards = [available[t].pop() for t in types_list(hand)]
+        state.deck[:] = [available[t].pop() for t in snapshot.deck]
+        state.turn_count = snapshot.turn_count
+        state.current_index = snapshot.current_index
+        state.has_drawn = snapshot.has_drawn
+        state.has_taken = snapshot.has_taken
+        state.winner = state.players[snapshot.winner] if snapshot.winner is not None else None
+        state.log = GameLog(self.log.seed, self.log.strategies, self.log.records[:keyframe.record_index])
+        self.record_index = keyframe.record_index
+
+
+    def seek(self, record_index: int) -> GameState:
+        """State after the first record_index records of the log"""
+        record_index = max(0, min(record_index, len(self.log.records)))
+        keyframe = self.keyframes[bisect.bisect_right(self.keyframe_records, record_index) - 1]
+        if not keyframe.record_index <= self.record_index <= record_index:
+            self.restore(keyframe)
+        for record in self.log.records[self.record_index:record_index]:
+            apply_record(self.state, record)
+        self.record_index = record_index
+        return self.state
+
+
+    def turn_start(self, turn: int) -> int:
+        """Number of records up to the start of a turn (counted from 0 and clamped to the game's turns)"""
+        return self.turn_records[max(0, min(turn, self.turn_count - 1))] + 1
+
+
+    def seek_turn(self, turn: int) -> GameState:
+        """State at the start of a turn, before its discards and actions"""
+        return self.seek(self.turn_start(turn))
+
+
+    def turn_at(self, record_index: int) -> int:
+        """Turn of the record_index-th record, -1 while dealing"""
+        return bisect.bisect_right(self.turn_records, record_index - 1) - 1
+
+
+def describe_record(record: LogRecord) -> str:
+    cards = ', '.join(f"{type_colour(t)} {type_number(t)}" for t in record.card_types)
+    if record.kind == TAKE:
+        return f"seat {record.seat + 1} takes {cards} from seat {record.target + 1}"
+    if record.kind == TURN:
+        return f"seat {record.seat + 1}'s turn"
+    return f"seat {record.seat + 1} {KIND_NAMES[record.kind]}s" + (f" {cards}" if cards else "")
+
+
+def describe_action(action, players: List[Player]) -> str:
+    action_type, draw_count, target = action
+    if action_type == 'draw':
+        return f"draw {draw_count}"
+    if action_type == 'take':
+        return f"take from seat {players.index(target) + 1}"
+    return 'pass'
+
+
+def logged_action(record: LogRecord) -> str:
+    if record.kind == DRAW:
+        return f"draw {len(record.card_types)}"
+    if record.kind == TAKE:
+        return f"take from seat {record.target + 1}"
+    return 'pass'
+
+
+def replay_state(log: GameLog, record_count: Optional[int] = None) -> GameState:
+    """State after the first record_count records of a log (all of them by default)"""
+    state = GameState.for_replay(log, create_players(log))
+    for record in log.records[:record_count]:
+        apply_record(state, record)
+    return state
+
+
+def replay_decisions(log: GameLog) -> List[Decision]:
+    """Replay a log and time each computer decision again on the replayed state"""
+    state = GameState.for_replay(log, create_players(log))
+    decisions = []
+    first_action = None
+
+    for record in log.records:
+        if record.kind == TURN:
+            first_action = None
+        player = state.players[record.seat]
+        if record.kind in (PASS, DRAW, TAKE) and not player.is_human:
+            forced_pass = first_action is None and must_pass(len(player.cards))
+            if not forced_pass:
+                start_time = time.perf_counter()
+                if first_action is None:
+                    action = player.choose_first_action(state.strategy_view())
+                else:
+                    action = player.choose_second_action(state.strategy_view(), first_action)
+                seconds = time.perf_counter() - start_time
+                if not is_legal(state, action):
+                    action = PASS_ACTION
+                decisions.append(Decision(state.turn_count, record.seat, first_action is not None, seconds,
+                                          logged_action(record), describe_action(action, state.players)))
+            first_action = KIND_NAMES[record.kind]
+        apply_record(state, record)
+
+    return decisions
+
+
+def rerun(log: GameLog) -> GameLog:
+    """Play a computer-only game again from its seed, for as many records as the log holds"""
+    state = GameState.new_game(create_players(log), log.seed)
+    while state.winner is None and len(state.log.records) < len(log.records):
+        play_turn(state)
+    return GameLog(log.seed, log.strategies, state.log.records[:len(log.records)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a game log")
+    parser.add_argument('log')
+    parser.add_argument('--turns', action='store_true', help="print the events of every turn")
+    parser.add_argument('--verify', action='store_true', help="re-run the computer decisions and compare them with the log")
+    parser.add_argument('--slowest', type=int, default=10, help="slowest decisions to report with --verify")
+    parser.add_argument('--seek', type=int, metavar='TURN', help="print the hands at the start of a turn")
+    parser.add_argument('--interval', type=int, default=10, help="turns between keyframes for --seek")
+    args = parser.parse_args()
+
+    log = GameLog.load(args.log)
+    state = replay_state(log)
+    print(f"Seed {log.seed}: {', '.join(log.strategies)}; {log.turn_count} turns, {len(log.records)} events")
+    print(f"Winner: {f'seat {state.players.index(state.winner) + 1}' if state.winner else 'none'}")
+
+    if args.turns:
+        turn = -1
+        for record in log.records:
+            if record.kind == TURN:
+                turn += 1
+                print(f"\nTurn {turn}: {describe_record(record)}")
+            else:
+                print(f"  {describe_record(record)}")
+
+    if args.seek is not None:
+        seeker = ReplaySeeker(log, interval=args.interval)
+        start_time = time.perf_counter()
+        state = seeker.seek_turn(args.seek)
+        seconds = time.perf_counter() - start_time
+        print(f"\nTurn {state.turn_count} ({len(seeker.keyframes)} keyframes, seek took {seconds * 1000:.2f} ms): "
+              f"seat {state.current_index + 1} to play, {len(state.deck)} cards in the deck")
+        for seat, player in enumerate(state.players):
+            print(f"  seat {seat + 1}: {', '.join(f'{card.color} {card.number}' for card in player.cards)}")
+
+    if args.verify:
+        decisions = replay_decisions(log)
+        different = [decision for decision in decisions if decision.logged != decision.chosen]
+        print(f"\n{len(decisions)} computer decisions re-run, {len(different)} differ from the log")
+        for decision in different[:10]:
+            print(f"  turn {decision.turn}, seat {decision.seat + 1}: logged {decision.logged}, now {decision.chosen}")
+
+        print(f"\nSlowest decisions:")
+        for decision in sorted(decisions, key=lambda decision: decision.seconds, reverse=True)[:args.slowest]:
+            print(f"  {decision.seconds * 1000:8.1f} ms  turn {decision.turn}, seat {decision.seat + 1} "
+                  f"({log.strategies[decision.seat]}, {'second' if decision.second else 'first'} action: {decision.chosen})")
+
+        if HUMAN not in log.strategies:
+            identical = rerun(log).to_bytes() == log.to_bytes()
+            print(f"\nRe-run from the seed: {'identical to the log' if identical else 'DIFFERS from the log'}")
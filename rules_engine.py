@@ -0,0 +1,169 @@
+import random
+from math import comb
+from typing import List, NamedTuple, Optional, Tuple
+
+from hand_counts import (COPIES_PER_TYPE, NUMBER_COUNT, TYPE_COUNT, Counts, add_types, discard_best_groups,
+                         draw_outcomes, forms_group_with, remove_types, types_list)
+
+'''
+Headless Notty rules on card-type counts.
+
+A CountsState only stores every player's hand as card-type counts, whose turn it is and how far
+that turn has progressed. All cards that are not in a hand are in the deck, so the deck is implied
+and its order is treated as unknown: drawing and taking are chance events whose outcomes are
+multisets of card types. States are immutable tuples, so they can be copied for free, hashed,
+and shared between search nodes. No pygame Card objects are involved.
+'''
+
+MAX_HAND_SIZE = 20
+INITIAL_HAND_SIZE = 5
+MAX_DRAW_COUNT = 3
+
+#Turn phases
+TURN_START = 0
+AFTER_DRAW = 1
+AFTER_TAKE = 2
+
+#Actions use the same tuples as the computer players, except that take targets are player indices
+Action = Tuple[str, Optional[int], Optional[int]]
+PASS_ACTION: Action = ('pass', None, None)
+
+
+class CountsState(NamedTuple):
+    hands: Tuple[Counts, ...]
+    current: int = 0
+    phase: int = TURN_START
+
+
+def draw_allowed(hand_size: int, deck_size: int, draw_count: int, max_hand_size: int = MAX_HAND_SIZE) -> bool:
+    """Whether draw_count cards can be drawn in one turn, the rule of every engine and of the GUI"""
+    return draw_count <= MAX_DRAW_COUNT and hand_size + draw_count <= max_hand_size and deck_size >= draw_count
+
+
+def take_allowed(hand_size: int, target_size: int, max_hand_size: int = MAX_HAND_SIZE) -> bool:
+    """Whether a card can be taken from a player holding target_size cards; taking its last card makes it win"""
+    return hand_size < max_hand_size and target_size > 0
+
+
+def must_pass(hand_size: int, max_hand_size: int = MAX_HAND_SIZE) -> bool:
+    return hand_size >= max_hand_size
+
+
+def deck_counts(state: CountsState) -> Counts:
+    deck = [COPIES_PER_TYPE] * TYPE_COUNT
+    for hand in state.hands:
+        for t in range(TYPE_COUNT):
+            deck[t] -= hand[t]
+    return tuple(deck)
+
+
+def winner(state: CountsState) -> Optional[int]:
+    for index, hand in enumerate(state.hands):
+        if not any(hand):
+            return index
+    return None
+
+
+def canonical_key(state: CountsState) -> tuple:
+    """
+    Key shared by all states that only differ by a renaming of the colours.
+    Valid groups and actions do not depend on colours, so such states have the same value.
+    """
+    colour_rows = sorted(
+        tuple(hand[start:start + NUMBER_COUNT] for hand in state.hands)
+        for start in range(0, TYPE_COUNT, NUMBER_COUNT)
+    )
+    return (tuple(colour_rows), state.current, state.phase)
+
+
+def legal_actions(state: CountsState, max_hand_size: int = MAX_HAND_SIZE) -> List[Action]:
+    if winner(state) is not None:
+        return []
+
+    hand_size = sum(state.hands[state.current])
+    actions = [PASS_ACTION]
+    if must_pass(hand_size, max_hand_size):
+        return actions
+
+    if state.phase != AFTER_DRAW:
+        deck_size = TYPE_COUNT * COPIES_PER_TYPE - sum(sum(hand) for hand in state.hands)
+        for draw_count in range(1, MAX_DRAW_COUNT + 1):
+            if draw_allowed(hand_size, deck_size, draw_count, max_hand_size):
+                actions.append(('draw', draw_count, None))
+
+    if state.phase != AFTER_TAKE:
+        for target, hand in enumerate(state.hands):
+            if target != state.current and take_allowed(hand_size, sum(hand), max_hand_size):
+                actions.append(('take', None, target))
+
+    return actions
+
+
+def action_outcomes(state: CountsState, action: Action, sampling_threshold: int = 2000,
+                    sample_size: int = 1000, rng: random.Random = random) -> List[Tuple[Tuple[int, ...], float]]:
+    """
+    Returns: list of (gained card types, probability) for a draw or take action.
+    Draws with more than sampling_threshold combinations are estimated from sample_size random draws,
+    the same rule as the expectation calculations of the computer players.
+    """
+    action_type, draw_count, target = action
+    if action_type == 'take':
+        target_hand = state.hands[target]
+        target_size = sum(target_hand)
+        return [((t,), count / target_size) for t, count in enumerate(target_hand) if count]
+
+    if action_type == 'draw':
+        deck = deck_counts(state)
+        if comb(sum(deck), draw_count) <= sampling_threshold:
+            return list(draw_outcomes(deck, draw_count))
+        deck_types = types_list(deck)
+        samples = {}
+        for _ in range(sample_size):
+            drawn = tuple(sorted(rng.sample(deck_types, draw_count)))
+            samples[drawn] = samples.get(drawn, 0) + 1
+        return [(drawn, count / sample_size) for drawn, count in samples.items()]
+
+    return [((), 1.0)]
+
+
+def sample_outcome(state: CountsState, action: Action, rng: random.Random = random) -> Tuple[int, ...]:
+    """Draw the cards gained by an action at random"""
+    action_type, draw_count, target = action
+    if action_type == 'take':
+        return (rng.choice(types_list(state.hands[target])),)
+    if action_type == 'draw':
+        return tuple(rng.sample(types_list(deck_counts(state)), draw_count))
+    return ()
+
+
+def apply_action(state: CountsState, action: Action, gained: Tuple[int, ...] = ()) -> CountsState:
+    """
+    Play an action whose chance outcome is already known, then discard the best groups.
+    Discarded cards go back into the (implied) deck. The turn ends after a pass or a second action,
+    and the next player discards any valid groups at the start of its turn. Taking the last card of a
+    player ends the game with that player's win before anything is discarded.
+    """
+    action_type, _, target = action
+    hands = list(state.hands)
+    current = state.current
+
+    if gained:
+        new_hand = add_types(hands[current], gained)
+        if action_type == 'take':
+            hands[target] = remove_types(hands[target], gained)
+            if not any(hands[target]):
+                hands[current] = new_hand
+                return CountsState(tuple(hands), current, state.phase)
+        if forms_group_with(new_hand, gained):
+            new_hand, _ = discard_best_groups(new_hand)
+        hands[current] = new_hand
+
+    if not any(hands[current]):
+        return CountsState(tuple(hands), current, TURN_START)
+
+    if action_type == 'pass' or state.phase != TURN_START:
+        current = (current + 1) % len(hands)
+        hands[current], _ = discard_best_groups(hands[current])
+        return CountsState(tuple(hands), current, TURN_START)
+
+    return CountsState(tuple(hands), current, AFTER_DRAW if action_type == 'draw' else AFTER_TAKE)
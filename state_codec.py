@@ -0,0 +1,139 @@
+import struct
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from game_engine import GameState, HeadlessCard
+from hand_counts import (COPIES_PER_TYPE, PACKED_COUNTS_SIZE, TYPE_COUNT, Counts, card_type, counts_from_cards,
+                         pack_counts, type_colour, type_number, types_list, unpack_counts)
+from rules_engine import AFTER_DRAW, AFTER_TAKE, TURN_START, CountsState
+
+'''
+Compact binary snapshots of headless game states.
+
+Player and Card objects hold pygame Surfaces and cannot be pickled, and would take kilobytes if they could.
+A snapshot only keeps what the rules and the strategies need:
+
+    header          format version, player count and current seat, flags (has drawn, has taken,
+                    deck order included, winner and its seat), turn count, deck size
+    hands           10 bytes per seat: the 40 card-type counts, 2 bits each
+    deck order      optional, 6 bits per card from the bottom to the top of the deck
+    strategy state  one byte per seat for each of STRATEGY_FIELDS
+
+The deck always holds the cards that are in no hand, so without its order it is implied by the hands.
+A two-player state takes 30 bytes without the deck order and less than 90 with it. Snapshots without the
+order are equal for states that only differ by the deck order, which makes them cache keys.
+'''
+
+VERSION = 2
+HEADER = struct.Struct('<BBBIB')        #Version, player count << 4 | current seat, flags, turn count, deck size
+
+HAS_DRAWN = 1
+HAS_TAKEN = 2
+DECK_ORDER = 4
+HAS_WINNER = 8
+WINNER_SHIFT = 4
+
+TYPE_BITS = 6
+STRATEGY_FIELDS = ('continuous_pass_count',)    #Player attributes that carry strategy state between turns
+
+
+class StateData(NamedTuple):
+    hands: Tuple[Counts, ...]
+    deck: Optional[Tuple[int, ...]]                 #Card types from the bottom to the top, None if not encoded
+    current_index: int
+    has_drawn: bool
+    has_taken: bool
+    turn_count: int
+    winner: Optional[int]
+    strategy_state: Tuple[Tuple[int, ...], ...]     #Values of STRATEGY_FIELDS for each seat
+
+
+def encode_state(state: GameState, deck_order: bool = True) -> bytes:
+    flags = HAS_DRAWN * state.has_drawn | HAS_TAKEN * state.has_taken | DECK_ORDER * deck_order
+    if state.winner is not None:
+        flags |= HAS_WINNER | state.players.index(state.winner) << WINNER_SHIFT
+
+    data = bytearray(HEADER.pack(VERSION, len(state.players) << 4 | state.current_index, flags,
+                                 state.turn_count, len(state.deck)))
+    for player in state.players:
+        data += pack_counts(counts_from_cards(player.cards))
+
+    if deck_order:
+        packed = 0
+        for index, card in enumerate(state.deck):
+            packed |= card_type(card.color, card.number) << TYPE_BITS * index
+        data += packed.to_bytes(deck_order_size(len(state.deck)), 'little')
+
+    for player in state.players:
+        data += bytes(min(getattr(player, field, 0), 255) for field in STRATEGY_FIELDS)
+    return bytes(data)
+
+
+def state_key(state: GameState) -> bytes:
+    """Snapshot without the deck order, equal for all states the players cannot tell apart"""
+    return encode_state(state, deck_order=False)
+
+
+def unpack_state(data: bytes) -> StateData:
+    version, seats, flags, turn_count, deck_size = HEADER.unpack_from(data, 0)
+    if version != VERSION:
+        raise ValueError(f"Not a state snapshot of version {VERSION}")
+    player_count, current_index = seats >> 4, seats & 0x0F
+
+    offset = HEADER.size
+    hands = []
+    for _ in range(player_count):
+        hands.append(unpack_counts(data[offset:offset + PACKED_COUNTS_SIZE]))
+        offset += PACKED_COUNTS_SIZE
+
+    deck = None
+    if flags & DECK_ORDER:
+        size = deck_order_size(deck_size)
+        packed = int.from_bytes(data[offset:offset + size], 'little')
+        deck = tuple((packed >> TYPE_BITS * index) & ((1 << TYPE_BITS) - 1) for index in range(deck_size))
+        offset += size
+
+    strategy_state = []
+    for _ in range(player_count):
+        strategy_state.append(tuple(data[offset:offset + len(STRATEGY_FIELDS)]))
+        offset += len(STRATEGY_FIELDS)
+
+    winner = flags >> WINNER_SHIFT if flags & HAS_WINNER else None
+    return StateData(tuple(hands), deck, current_index, bool(flags & HAS_DRAWN), bool(flags & HAS_TAKEN),
+                     turn_count, winner, tuple(strategy_state))
+
+
+def decode_state(data: bytes, players: List,
+                 card_factory: Callable[[str, int], object] = HeadlessCard) -> GameState:
+    """
+    Rebuild a snapshot on players for its seats: their hands are replaced and their strategy state restored.
+    Without an encoded order the deck is in card-type order.
+    """
+    snapshot = unpack_state(data)
+    for player, hand, values in zip(players, snapshot.hands, snapshot.strategy_state):
+        player.cards = [card_factory(type_colour(t), type_number(t)) for t in types_list(hand)]
+        for field, value in zip(STRATEGY_FIELDS, values):
+            if hasattr(player, field):
+                setattr(player, field, value)
+
+    deck_types = snapshot.deck if snapshot.deck is not None else types_list(deck_counts(snapshot.hands))
+    state = GameState(players, [card_factory(type_colour(t), type_number(t)) for t in deck_types],
+                      current_index=snapshot.current_index, has_drawn=snapshot.has_drawn, has_taken=snapshot.has_taken)
+    state.turn_count = snapshot.turn_count
+    if snapshot.winner is not None:
+        state.winner = players[snapshot.winner]
+    return state
+
+
+def counts_state(data: bytes) -> CountsState:
+    """The rules_engine state of a snapshot, for the search players"""
+    snapshot = unpack_state(data)
+    phase = AFTER_DRAW if snapshot.has_drawn else AFTER_TAKE if snapshot.has_taken else TURN_START
+    return CountsState(snapshot.hands, snapshot.current_index, phase)
+
+
+def deck_counts(hands: Tuple[Counts, ...]) -> Counts:
+    return tuple(COPIES_PER_TYPE - sum(hand[t] for hand in hands) for t in range(TYPE_COUNT))
+
+
+def deck_order_size(deck_size: int) -> int:
+    return (deck_size * TYPE_BITS + 7) // 8
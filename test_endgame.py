@@ -0,0 +1,51 @@
+import random
+from itertools import combinations_with_replacement
+
+from endgame import can_complete
+from hand_counts import COPIES_PER_TYPE, EMPTY_HAND, NUMBER_COUNT, TYPE_COUNT, add_types, card_type, max_discard
+
+MAX_BUDGET = 3
+
+
+def fewest_extra_cards(counts, max_budget: int = MAX_BUDGET):
+    """Fewest extra cards that make counts discardable as a whole by trying every addition, None above max_budget"""
+    held = [t for t in range(TYPE_COUNT) if counts[t]]
+    #Every group of a completion holds a held card, so its extra cards share a colour or a number with one
+    useful = [u for u in range(TYPE_COUNT)
+              if any(u // NUMBER_COUNT == t // NUMBER_COUNT or u % NUMBER_COUNT == t % NUMBER_COUNT for t in held)]
+    for extra in range(max_budget + 1):
+        for added in combinations_with_replacement(useful, extra):
+            hand = add_types(counts, added)
+            if max_discard(hand) == sum(hand):
+                return extra
+    return None
+
+
+def check_against_brute_force(counts):
+    fewest = fewest_extra_cards(counts)
+    for budget in range(MAX_BUDGET + 1):
+        assert can_complete(counts, budget) == (fewest is not None and fewest <= budget), (counts, budget, fewest)
+
+
+def test_isolated_cards_sharing_a_run():
+    red_1, red_4, red_5 = card_type('red', 1), card_type('red', 4), card_type('red', 5)
+    assert can_complete(add_types(EMPTY_HAND, [red_1, red_4]), 2)
+    assert not can_complete(add_types(EMPTY_HAND, [red_1, red_5]), 2)
+    assert can_complete(add_types(EMPTY_HAND, [red_1, red_5]), 3)
+    check_against_brute_force(add_types(EMPTY_HAND, [red_1, red_4]))
+    check_against_brute_force(add_types(EMPTY_HAND, [red_1, red_5]))
+
+
+def test_can_complete_matches_brute_force():
+    rng = random.Random(0)
+    deck = [t for t in range(TYPE_COUNT) for _ in range(COPIES_PER_TYPE)]
+    for _ in range(60):
+        check_against_brute_force(add_types(EMPTY_HAND, rng.sample(deck, rng.randint(1, 4))))
+
+
+def test_can_complete_matches_brute_force_in_one_colour():
+    #Hands packed into one colour have the most runs sharing extra cards
+    rng = random.Random(1)
+    deck = [t for t in range(NUMBER_COUNT) for _ in range(COPIES_PER_TYPE)]
+    for _ in range(40):
+        check_against_brute_force(add_types(EMPTY_HAND, rng.sample(deck, rng.randint(1, 5))))
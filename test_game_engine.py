@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+import rules_engine
+from computer_player import RandomStrategyPlayer, RulebasedStrategyPlayer
+from game_engine import (PASS_ACTION, GameState, HeadlessCard, apply_action, discard_group, is_legal, legal_actions,
+                         play_turn)
+from hand_counts import counts_from_cards
+
+
+def counts_state(state: GameState) -> rules_engine.CountsState:
+    phase = (rules_engine.AFTER_DRAW if state.has_drawn else
+             rules_engine.AFTER_TAKE if state.has_taken else rules_engine.TURN_START)
+    return rules_engine.CountsState(tuple(counts_from_cards(player.cards) for player in state.players),
+                                    state.current_index, phase)
+
+
+def described(actions, players):
+    return sorted((action, draw_count, None if target is None else players.index(target))
+                  for action, draw_count, target in actions)
+
+
+def test_legal_actions_match_rules_engine():
+    rng = random.Random(0)
+    for _ in range(10):
+        players = [RandomStrategyPlayer('A'), RulebasedStrategyPlayer('B'), RandomStrategyPlayer('C')][:rng.choice((2, 3))]
+        state = GameState.new_game(players, rng.getrandbits(32))
+        for _ in range(rng.randint(0, 60)):
+            play_turn(state)
+            if state.winner is not None:
+                break
+        actions = legal_actions(state)
+        assert described(actions, players) == sorted(rules_engine.legal_actions(counts_state(state)))
+        assert all(is_legal(state, action) for action in actions)
+        assert not is_legal(state, ('draw', 4, None)) and not is_legal(state, ('take', None, state.current_player))
+
+
+def interactive_state():
+    players = [RandomStrategyPlayer('A'), RandomStrategyPlayer('B')]
+    players[0].cards = [HeadlessCard('red', number) for number in (1, 2, 3)] + [HeadlessCard('blue', 7)]
+    players[1].cards = [HeadlessCard('green', 5)]
+    deck = [HeadlessCard('yellow', number) for number in range(1, 11)]
+    return GameState(players, deck, random.Random(0), interactive=True)
+
+
+def test_interactive_state_leaves_discards_to_players():
+    state = interactive_state()
+    player = state.current_player
+    apply_action(state, ('draw', 1, None))
+    assert len(player.cards) == 5 and state.current_player is player
+    with pytest.raises(ValueError):
+        discard_group(state, player, player.cards[2:4])
+    discard_group(state, player, player.cards[:3])
+    assert len(player.cards) == 2 and len(state.deck) == 12 and state.winner is None
+    apply_action(state, PASS_ACTION)
+    assert state.current_player is not player and not state.has_drawn
+
+
+def test_taking_the_last_card_makes_the_target_win():
+    state = interactive_state()
+    target = state.players[1]
+    apply_action(state, ('take', None, target))
+    assert state.winner is target and not legal_actions(state)
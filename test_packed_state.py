@@ -0,0 +1,53 @@
+import random
+
+import packed_state
+import rules_engine
+from hand_counts import EMPTY_HAND, FULL_DECK, add_types, discard_best_groups, has_valid_group, types_list
+
+
+def dealt_state(player_count: int, hand_size: int, rng: random.Random) -> rules_engine.CountsState:
+    """Hands of hand_size random cards each, without their valid groups like every hand between turns"""
+    deck = types_list(FULL_DECK)
+    rng.shuffle(deck)
+    return rules_engine.CountsState(tuple(discard_best_groups(add_types(EMPTY_HAND, [deck.pop() for _ in range(hand_size)]))[0]
+                                          for _ in range(player_count)))
+
+
+def test_playouts_match_rules_engine():
+    rng = random.Random(0)
+    for _ in range(40):
+        state = dealt_state(rng.choice((2, 3)), rng.randint(1, 8), rng)
+        packed = packed_state.from_counts_state(state)
+        for _ in range(60):
+            assert packed_state.to_counts_state(packed) == state
+            assert packed_state.winner(packed) == rules_engine.winner(state)
+            assert all(packed_state.has_valid_group(hand) == has_valid_group(counts)
+                       for hand, counts in zip(packed.hands, state.hands))
+            assert (packed_state.canonical_key(packed) == packed_state.canonical_key(
+                packed_state.from_counts_state(state._replace(hands=tuple(hand[10:] + hand[:10] for hand in state.hands)))))
+
+            actions = rules_engine.legal_actions(state)
+            assert packed_state.legal_actions(packed) == actions
+            if not actions:
+                break
+            action = rng.choice(actions)
+            gained = rules_engine.sample_outcome(state, action, rng)
+            state = rules_engine.apply_action(state, action, gained)
+            packed = packed_state.apply_action(packed, action, gained)
+
+
+def test_taking_the_last_card_ends_the_game():
+    state = rules_engine.CountsState((add_types(EMPTY_HAND, [0, 1]), add_types(EMPTY_HAND, [1])))
+    action = ('take', None, 1)
+    expected = rules_engine.apply_action(state, action, (1,))
+    assert rules_engine.winner(expected) == 1 and sum(expected.hands[0]) == 3
+    assert packed_state.to_counts_state(packed_state.apply_action(packed_state.from_counts_state(state), action, (1,))) == expected
+
+
+def test_drawn_cards_follow_the_deck_order():
+    rng = random.Random(1)
+    state = packed_state.from_counts_state(dealt_state(2, 5, rng))
+    ordered, drawn = packed_state.draw_cards(state, 3, rng)
+    assert len(drawn) == 3 and ordered.order[:3] == drawn
+    deck = packed_state.unpack_counts(packed_state.deck(state))
+    assert all(deck[t] >= drawn.count(t) for t in drawn)
@@ -0,0 +1,61 @@
+import random
+
+from computer_player import RandomStrategyPlayer, RulebasedStrategyPlayer
+from game_engine import GameState, card_types, play_turn
+from hand_counts import counts_from_cards
+from rules_engine import AFTER_DRAW, AFTER_TAKE, TURN_START
+from state_codec import counts_state, decode_state, encode_state, state_key, unpack_state
+
+
+def played_states(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        players = [RandomStrategyPlayer('A'), RulebasedStrategyPlayer('B'), RandomStrategyPlayer('C')][:rng.choice((2, 3))]
+        state = GameState.new_game(players, rng.getrandbits(32))
+        for _ in range(rng.randint(0, 80)):
+            if state.winner is not None:
+                break
+            play_turn(state)
+        state.has_drawn, state.has_taken = rng.choice([(False, False), (True, False), (False, True)])
+        yield state
+
+
+def fresh_players(state: GameState):
+    return [type(player)(player.name) for player in state.players]
+
+
+def assert_same_state(decoded: GameState, state: GameState):
+    assert [card_types(player.cards) for player in decoded.players] == [sorted(card_types(player.cards)) for player in state.players]
+    assert card_types(decoded.deck) == card_types(state.deck)
+    assert (decoded.current_index, decoded.has_drawn, decoded.has_taken, decoded.turn_count) == \
+           (state.current_index, state.has_drawn, state.has_taken, state.turn_count)
+    assert (decoded.winner is None) == (state.winner is None)
+    if state.winner is not None:
+        assert decoded.players.index(decoded.winner) == state.players.index(state.winner)
+
+
+def test_round_trip():
+    for state in played_states(30):
+        data = encode_state(state)
+        assert_same_state(decode_state(data, fresh_players(state)), state)
+        assert encode_state(decode_state(data, fresh_players(state))) == data
+
+        counts = counts_state(data)
+        assert counts.hands == tuple(counts_from_cards(player.cards) for player in state.players)
+        assert counts.phase == (AFTER_DRAW if state.has_drawn else AFTER_TAKE if state.has_taken else TURN_START)
+
+
+def test_large_turn_counts():
+    for turn_count in (65535, 65536, 1_000_000, 2 ** 32 - 1):
+        state = next(played_states(1, turn_count))
+        state.turn_count = turn_count
+        assert unpack_state(encode_state(state)).turn_count == turn_count
+        assert decode_state(state_key(state), fresh_players(state)).turn_count == turn_count
+
+
+def test_state_key_ignores_the_deck_order():
+    state = next(played_states(1, 1))
+    key = state_key(state)
+    random.Random(0).shuffle(state.deck)
+    assert state_key(state) == key and unpack_state(key).deck is None
+    assert len(key) == 30 + (len(state.players) - 2) * 11
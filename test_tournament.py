@@ -0,0 +1,44 @@
+import random
+
+from tournament import game_result, pair_score, sequential_test
+
+MAX_PAIRS = 2000
+
+
+def synthetic_scores(pair_win_rate: float, decisive_rate: float, seed: int):
+    """Pair scores of a strategy that wins pair_win_rate of the decisive pairs"""
+    rng = random.Random(seed)
+    for _ in range(MAX_PAIRS):
+        if rng.random() >= decisive_rate:
+            yield 0
+        else:
+            yield 1 if rng.random() < pair_win_rate else -1
+
+
+def test_clearly_better_strategy_is_decided():
+    for seed in range(20):
+        better, pairs, wins, losses, _ = sequential_test(synthetic_scores(0.75, 0.8, seed), 0.05, 0.95, 32)
+        assert better == 1 and pairs <= 200, (seed, pairs, wins, losses)
+        better, pairs, _, _, _ = sequential_test(synthetic_scores(0.25, 0.8, seed), 0.05, 0.95, 32)
+        assert better == -1 and pairs <= 200, (seed, pairs)
+
+
+def test_error_rate_of_close_strategies():
+    #At the edge of the indifference region (p = 0.5 + delta) the wrong decision is made at most 1 - confidence of the time
+    wrong = sum(sequential_test(synthetic_scores(0.55, 1.0, seed), 0.05, 0.95, 32)[0] == -1 for seed in range(200))
+    assert wrong <= 20
+
+
+def test_undecisive_comparison_stops_after_one_batch():
+    better, pairs, wins, losses, _ = sequential_test(synthetic_scores(0.5, 0.0, 0), 0.05, 0.95, 32)
+    assert better is None and pairs == 32 and wins == losses == 0
+
+
+def test_stopped_games_are_scored_by_cards_left():
+    def record(winner, hand_sizes):
+        return {'seats': ['A', 'B'], 'winner': winner, 'hand_sizes': hand_sizes}
+    assert game_result(record('B', [0, 5])) == 'B'
+    assert game_result(record(None, [4, 7])) == 'A'
+    assert game_result(record(None, [6, 6])) is None
+    assert game_result({'seats': ['A', 'B'], 'winner': None}) is None
+    assert pair_score(record(None, [4, 7]), {'seats': ['B', 'A'], 'winner': None, 'hand_sizes': [9, 2]}, 'A', 'B') == 2
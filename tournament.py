@@ -0,0 +1,327 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from itertools import combinations
+from multiprocessing import Pool
+from statistics import NormalDist
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import computer_player
+from game_engine import play_game
+
+'''
+Round-robin tournaments between computer strategies on the headless game engine.
+
+Every combination of 2 or 3 different strategies plays a number of games. Each game has its own seed,
+derived from the tournament seed, the line-up and the game number, so any game can be replayed on its
+own and results do not depend on the number of processes. Seats rotate from game to game, so every
+strategy moves first equally often. Besides the wins, the statistics give each strategy's score: its wins
+and the stopped games it led with the fewest cards left.
+
+Finished games are appended to a JSONL checkpoint as they complete; running the same command again skips
+the games already in the checkpoint, so an interrupted tournament resumes where it stopped.
+
+The comparison mode (--compare) plays two strategies against each other in pairs of games on the same
+deal with the seats swapped, and stops with a sequential probability ratio test as soon as one of them
+is better at the configured confidence. Games rarely end within the turn limit, so a game stopped there is
+scored for the only strategy with the fewest cards left.
+'''
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+DEFAULT_STRATEGIES = ['DEFENSIVE', 'AGGRESSIVE', 'X-DEFENSIVE']     #MCTS and EXPECTIMAX take seconds per decision
+
+
+class GameTask(NamedTuple):
+    game_id: str
+    seats: List[str]            #Strategy of each seat, in playing order
+    seed: int
+    max_turns: int
+    log_dir: Optional[str] = None   #Directory for the game's action log, for replay.py
+
+
+def strategy_class_names() -> Dict[str, str]:
+    """Strategy name -> class name in computer_player, as registered in config.json"""
+    with open(CONFIG_PATH) as config_file:
+        return json.load(config_file)["strategy_class_dict"]
+
+
+def game_seed(seed: int, line_up: Iterable[str], game: int) -> int:
+    return random.Random(f"{seed}:{'/'.join(line_up)}:{game}").getrandbits(32)
+
+
+def tournament_tasks(strategies: List[str], player_counts: List[int], games: int, seed: int,
+                     max_turns: int, log_dir: Optional[str] = None) -> List[GameTask]:
+    tasks = []
+    for player_count in player_counts:
+        for line_up in combinations(strategies, player_count):
+            for game in range(games):
+                rotation = game % player_count
+                seats = list(line_up[rotation:] + line_up[:rotation])
+                game_id = f"{seed}:{'/'.join(line_up)}:{game}:{max_turns}"     #Results under another turn limit are not reused
+                tasks.append(GameTask(game_id, seats, game_seed(seed, line_up, game), max_turns, log_dir))
+    return tasks
+
+
+def _timed(method, timing: List[float]):
+    """Wrap a choose_*_action method to add its running time and call count to timing"""
+    def timed_method(*args):
+        start_time = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            timing[0] += time.perf_counter() - start_time
+            timing[1] += 1
+    return timed_method
+
+
+def play_task(task: GameTask) -> Dict:
+    """Play one game of the tournament and return its result record"""
+    class_names = strategy_class_names()
+    players, timings = [], []
+    for seat, strategy in enumerate(task.seats):
+        player = getattr(computer_player, class_names[strategy])(f"{strategy} {seat + 1}")
+        timing = [0.0, 0]
+        player.choose_first_action = _timed(player.choose_first_action, timing)
+        player.choose_second_action = _timed(player.choose_second_action, timing)
+        players.append(player)
+        timings.append(timing)
+
+    state = play_game(players, task.seed, task.max_turns)
+    if task.log_dir:
+        state.log.save(os.path.join(task.log_dir, task.game_id.replace(':', '_').replace('/', '-') + '.nlog'))
+    return {
+        'game_id': task.game_id,
+        'seats': task.seats,
+        'seed': task.seed,
+        'winner': task.seats[players.index(state.winner)] if state.winner else None,
+        'turns': state.turn_count,
+        'hand_sizes': [len(player.cards) for player in players],
+        'decision_seconds': [timing[0] for timing in timings],
+        'decisions': [timing[1] for timing in timings],
+    }
+
+
+def load_checkpoint(path: str) -> List[Dict]:
+    """Records of the finished games in a checkpoint; a partly written last line is ignored"""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as checkpoint:
+        for line in checkpoint:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+def run_tournament(tasks: List[GameTask], checkpoint_path: str, processes: Optional[int] = None) -> List[Dict]:
+    """Play the tasks missing from the checkpoint in a process pool and return all records"""
+    records = load_checkpoint(checkpoint_path)
+    finished = {record['game_id'] for record in records}
+    pending = [task for task in tasks if task.game_id not in finished]
+    print(f"{len(tasks) - len(pending)} games already played, {len(pending)} to play", file=sys.stderr)
+
+    with open(checkpoint_path, 'w') as checkpoint:       #Rewritten to drop a partly written last line
+        for record in records:
+            checkpoint.write(json.dumps(record) + '\n')
+        checkpoint.flush()
+
+        with Pool(processes) as pool:
+            for count, record in enumerate(pool.imap_unordered(play_task, pending), 1):
+                checkpoint.write(json.dumps(record) + '\n')
+                checkpoint.flush()
+                records.append(record)
+                if count % 100 == 0:
+                    print(f"{count}/{len(pending)} games played", file=sys.stderr)
+
+    task_ids = {task.game_id for task in tasks}
+    return [record for record in records if record['game_id'] in task_ids]
+
+
+def game_result(record: Dict) -> Optional[str]:
+    """
+    The winner of a game or, for a game stopped at the turn limit, the only strategy with the fewest cards left.
+    None for a stopped game with several strategies sharing the fewest cards.
+    """
+    hand_sizes = record.get('hand_sizes')      #Missing in checkpoints written before games were scored
+    if record['winner'] is not None or not hand_sizes:
+        return record['winner']
+    leaders = [seat for seat, size in enumerate(hand_sizes) if size == min(hand_sizes)]
+    return record['seats'][leaders[0]] if len(leaders) == 1 else None
+
+
+def tournament_statistics(records: List[Dict]) -> Dict:
+    """
+    Win rate, score rate (wins and stopped games led), average game length and average decision latency
+    of each strategy, overall and per player count
+    """
+    def summarise(selected: List[Dict]) -> Dict:
+        strategies = {}
+        for record in selected:
+            for seat, strategy in enumerate(record['seats']):
+                stats = strategies.setdefault(strategy, {'games': 0, 'wins': 0, 'scored': 0, 'unfinished': 0,
+                                                         'turns': 0, 'decision_seconds': 0.0, 'decisions': 0})
+                stats['games'] += 1
+                stats['wins'] += record['winner'] == strategy
+                stats['scored'] += game_result(record) == strategy
+                stats['unfinished'] += record['winner'] is None
+                stats['turns'] += record['turns']
+                stats['decision_seconds'] += record['decision_seconds'][seat]
+                stats['decisions'] += record['decisions'][seat]
+
+        return {strategy: {
+            'games': stats['games'],
+            'win_rate': stats['wins'] / stats['games'],
+            'score_rate': stats['scored'] / stats['games'],
+            'unfinished_rate': stats['unfinished'] / stats['games'],
+            'average_game_length': stats['turns'] / stats['games'],
+            'average_decision_ms': 1000 * stats['decision_seconds'] / stats['decisions'] if stats['decisions'] else None,
+        } for strategy, stats in sorted(strategies.items())}
+
+    player_counts = sorted({len(record['seats']) for record in records})
+    return {
+        'games': len(records),
+        'strategies': summarise(records),
+        'by_player_count': {str(count): summarise([record for record in records if len(record['seats']) == count])
+                            for count in player_counts},
+    }
+
+
+def sprt_log_likelihood_ratio(wins: int, losses: int, delta: float) -> float:
+    """Log-likelihood ratio of H1: p = 0.5 + delta against H0: p = 0.5 - delta, for wins and losses of decisive pairs"""
+    p0, p1 = 0.5 - delta, 0.5 + delta
+    return wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+
+
+def pair_score(first: Dict, second: Dict, strategy: str, baseline: str) -> int:
+    """Games of a pair scored for strategy minus those scored for baseline"""
+    results = (game_result(first), game_result(second))
+    return results.count(strategy) - results.count(baseline)
+
+
+def sequential_test(pair_scores: Iterable[int], delta: float, confidence: float,
+                    batch_size: int) -> Tuple[Optional[int], int, int, int, float]:
+    """
+    SPRT on pair scores, stopping as soon as it decides. A positive score is a pair win, a negative one a pair
+    loss, and 0 is ignored. Stops undecided when the first batch_size pairs are all ignored, as the
+    comparison cannot tell the strategies apart then.
+    Returns: (1 for a better strategy, -1 for a better baseline or None, pairs, pair wins, pair losses,
+    log-likelihood ratio)
+    """
+    error = 1 - confidence
+    upper, lower = math.log((1 - error) / error), math.log(error / (1 - error))
+    wins = losses = pairs = 0
+    log_likelihood_ratio = 0.0
+    for score in pair_scores:
+        pairs += 1
+        wins += score > 0
+        losses += score < 0
+        log_likelihood_ratio = sprt_log_likelihood_ratio(wins, losses, delta)
+        if log_likelihood_ratio >= upper:
+            return 1, pairs, wins, losses, log_likelihood_ratio
+        if log_likelihood_ratio <= lower:
+            return -1, pairs, wins, losses, log_likelihood_ratio
+        if pairs == batch_size and wins + losses == 0:
+            break
+    return None, pairs, wins, losses, log_likelihood_ratio
+
+
+def fixed_sample_pairs(delta: float, confidence: float) -> int:
+    """Decisive pairs a fixed-size test with the same error rates needs to tell p = 0.5 + delta from p = 0.5 - delta"""
+    p0, p1 = 0.5 - delta, 0.5 + delta
+    z = NormalDist().inv_cdf(confidence)
+    return math.ceil(((z * math.sqrt(p0 * (1 - p0)) + z * math.sqrt(p1 * (1 - p1))) / (p1 - p0)) ** 2)
+
+
+def compare_strategies(strategy: str, baseline: str, seed: int, max_turns: int, delta: float = 0.05,
+                       confidence: float = 0.95, batch_size: int = 32, max_pairs: int = 5000,
+                       processes: Optional[int] = None) -> Dict:
+    """
+    Play batches of paired games, each pair on one deal with the seats swapped, until the SPRT decides.
+    A pair counts as a win of strategy if more of its two games are scored for it (game_result) than for
+    baseline, as a loss if fewer, and is ignored otherwise. Errors of both kinds are limited to 1 - confidence.
+    """
+    line_up = (strategy, baseline)
+    games = 0
+
+    def pair_scores(pool) -> Iterator[int]:
+        nonlocal games
+        for batch_start in range(0, max_pairs, batch_size):
+            tasks = []
+            for pair in range(batch_start, min(batch_start + batch_size, max_pairs)):
+                pair_seed = game_seed(seed, line_up, pair)
+                tasks.append(GameTask(f"{seed}:{strategy}/{baseline}:{pair}:a", [strategy, baseline], pair_seed, max_turns))
+                tasks.append(GameTask(f"{seed}:{strategy}/{baseline}:{pair}:b", [baseline, strategy], pair_seed, max_turns))
+            records = pool.map(play_task, tasks)
+            games += len(records)
+            #Pairs are scored in order, so the test stops at the same pair whatever the batch size
+            for first, second in zip(records[::2], records[1::2]):
+                yield pair_score(first, second, strategy, baseline)
+
+    with Pool(processes) as pool:
+        better, pairs, wins, losses, log_likelihood_ratio = sequential_test(pair_scores(pool), delta, confidence,
+                                                                            batch_size)
+    decision = {1: strategy, -1: baseline}.get(better)
+    error = 1 - confidence
+
+    decisive_rate = (wins + losses) / pairs if pairs else 0.0
+    fixed_games = 2 * math.ceil(fixed_sample_pairs(delta, confidence) / decisive_rate) if decisive_rate else None
+    return {
+        'strategy': strategy,
+        'baseline': baseline,
+        'better': decision,
+        'decided': decision is not None,
+        'pairs': pairs,
+        'pair_wins': wins,
+        'pair_losses': losses,
+        'log_likelihood_ratio': log_likelihood_ratio,
+        'bounds': [math.log(error / (1 - error)), math.log((1 - error) / error)],
+        'games_played': games,
+        'fixed_size_games': fixed_games,
+        'games_saved': fixed_games - games if fixed_games is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    registered = list(strategy_class_names())
+    parser = argparse.ArgumentParser(description="Play a round-robin tournament between computer strategies")
+    parser.add_argument('--strategies', nargs='+', default=[name for name in DEFAULT_STRATEGIES if name in registered],
+                        choices=registered)
+    parser.add_argument('--players', nargs='+', type=int, default=[2, 3], choices=[2, 3], help="player counts of the matches")
+    parser.add_argument('--games', type=int, default=50, help="games per line-up")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-turns', type=int, default=300, help="turns after which a game is stopped without a winner")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--checkpoint', default='tournament_checkpoint.jsonl')
+    parser.add_argument('--output', default=None, help="JSON file for the statistics (default: standard output)")
+    parser.add_argument('--log-dir', default=None, help="directory to save the action log of every game in")
+    parser.add_argument('--compare', nargs=2, metavar=('STRATEGY', 'BASELINE'), choices=registered, default=None,
+                        help="compare two strategies with paired games until a sequential test decides")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence of the comparison's decision")
+    parser.add_argument('--delta', type=float, default=0.05,
+                        help="win probability margin from 0.5 of decisive pairs that the comparison tells apart")
+    parser.add_argument('--batch-size', type=int, default=32, help="game pairs played between two tests")
+    parser.add_argument('--max-pairs', type=int, default=5000, help="game pairs after which a comparison is undecided")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.compare:
+        statistics = compare_strategies(*args.compare, args.seed, args.max_turns, args.delta, args.confidence,
+                                        args.batch_size, args.max_pairs, args.processes)
+    else:
+        if args.log_dir:
+            os.makedirs(args.log_dir, exist_ok=True)
+        tasks = tournament_tasks(args.strategies, args.players, args.games, args.seed, args.max_turns, args.log_dir)
+        statistics = tournament_statistics(run_tournament(tasks, args.checkpoint, args.processes))
+    print(f"Finished in {time.time() - start_time:.1f}s", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(statistics, output, indent=2)
+    else:
+        print(json.dumps(statistics, indent=2))
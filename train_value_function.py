@@ -0,0 +1,116 @@
+import argparse
+import random
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from hand_counts import EMPTY_HAND, FULL_DECK, Counts, add_types, discard_best_groups, types_list
+from rules_engine import (INITIAL_HAND_SIZE, PASS_ACTION, TURN_START, CountsState, apply_action, deck_counts,
+                          legal_actions, sample_outcome, winner)
+from turn_planner import TurnPlanner
+from value_function import DEFAULT_WEIGHTS_PATH, ValueFunction, action_kind, feature_matrix
+
+'''
+Trains the value function of the FAST-X player.
+
+Positions come from self-play on the headless rules engine. At every decision, the exact single-action
+expectations of the player to move are computed with TurnPlanner and logged, then the player plays the
+best of them, or a random legal action with probability `explore`, so the log covers the positions that
+X-DEFENSIVE reaches as well as some it would avoid. The log is saved as .npz, so the model can be
+retrained without replaying the games.
+'''
+
+Decision = Tuple[Counts, Counts, List[Tuple[tuple, Optional[Counts], float]]]
+
+
+def deal(player_count: int, rng: random.Random) -> CountsState:
+    deck = types_list(FULL_DECK)
+    rng.shuffle(deck)
+    hands = []
+    for _ in range(player_count):
+        hand, _ = discard_best_groups(add_types(EMPTY_HAND, [deck.pop() for _ in range(INITIAL_HAND_SIZE)]))
+        hands.append(hand)
+    return CountsState(tuple(hands), 0, TURN_START)
+
+
+def exact_decision(planner: TurnPlanner, state: CountsState) -> Decision:
+    """Returns: (hand, deck, [(action, target hand or None, exact expectation)]) for the legal draws and takes of the player to move"""
+    planner.clear_caches()
+    hand, deck = state.hands[state.current], deck_counts(state)
+    values = []
+    for action in legal_actions(state, planner.MAX_HAND_SIZE):
+        action_type, draw_count, target = action
+        if action_type == 'draw':
+            values.append((action, None, planner.draw_value(hand, deck, draw_count)))
+        elif action_type == 'take':
+            target_hand = state.hands[target]
+            values.append((action, target_hand, planner.take_value(hand, target_hand)))
+    return hand, deck, values
+
+
+def self_play_decisions(games: int, max_turns: int, explore: float, rng: random.Random) -> Iterator[Decision]:
+    """Exactly valued decisions of self-play games between 2 or 3 players"""
+    planner = TurnPlanner(rng=random.Random(rng.getrandbits(32)))     #Samples large draws from a stream of its own
+    for _ in range(games):
+        state = deal(rng.choice((2, 3)), rng)
+        turns = 0
+        while winner(state) is None and turns < max_turns:
+            decision = exact_decision(planner, state)
+            if decision[2]:
+                yield decision
+
+            _, _, values = decision
+            if not values or rng.random() < explore:
+                action = rng.choice(legal_actions(state, planner.MAX_HAND_SIZE))
+            else:
+                action, _, best_value = max(values, key=lambda value: value[2])
+                if best_value < 0:
+                    action = PASS_ACTION
+
+            if state.phase != TURN_START or action == PASS_ACTION:
+                turns += 1
+            state = apply_action(state, action, sample_outcome(state, action, rng))
+
+
+def decision_rows(decisions: List[Decision]) -> Tuple[np.ndarray, np.ndarray]:
+    features, targets = [], []
+    for hand, deck, values in decisions:
+        sources = [(deck if target is None else target, action_kind(action)) for action, target, _ in values]
+        features.append(feature_matrix(hand, sources))
+        targets.extend(value for _, _, value in values)
+    return np.concatenate(features), np.array(targets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the FAST-X value function from self-play")
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--max-turns', type=int, default=60, help="turns after which a self-play game is abandoned")
+    parser.add_argument('--explore', type=float, default=0.2, help="probability of a random action in self-play")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log', default='value_function_log.npz', help="self-play log to write, or to read with --from-log")
+    parser.add_argument('--from-log', action='store_true', help="train on an existing log instead of playing")
+    parser.add_argument('--hidden', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=40)
+    parser.add_argument('--learning-rate', type=float, default=1e-3)
+    parser.add_argument('--output', default=DEFAULT_WEIGHTS_PATH)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    if args.from_log:
+        with np.load(args.log) as log:
+            features, targets = log['features'], log['targets']
+    else:
+        start_time = time.time()
+        decisions = list(self_play_decisions(args.games, args.max_turns, args.explore, rng))
+        features, targets = decision_rows(decisions)
+        np.savez_compressed(args.log, features=features, targets=targets)
+        print(f"Logged {len(decisions)} decisions ({len(targets)} actions) in {time.time() - start_time:.1f}s")
+
+    model = ValueFunction.initialise(args.hidden, np.random.default_rng(args.seed))
+    history = model.train(features, targets, epochs=args.epochs, learning_rate=args.learning_rate,
+                          rng=np.random.default_rng(args.seed))
+    model.save(args.output)
+    print(f"Training MSE: {history[0]:.4f} -> {history[-1]:.4f}")
+    print(f"Saved weights to {args.output}")
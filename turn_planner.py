@@ -0,0 +1,217 @@
+import random
+from collections import Counter
+from math import comb
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hand_counts import (Counts, add_types, counts_from_cards, discard_best_groups, draw_outcomes,
+                         forms_group_with, max_discard, types_list)
+from rules_engine import draw_allowed, take_allowed
+
+Action = Tuple[str, Optional[int], Optional[object]]
+Plan = Tuple[Action, ...]
+
+PASS_ACTION = ('pass', None, None)
+MIN_TAKE_TARGET_SIZE = 3        #Like the other strategies, never take from a player holding 2 cards or fewer
+
+
+class TurnPlanner:
+    """
+    Evaluates whole turns instead of single actions.
+    A plan is a first action followed by a second action (or 'pass'): draw then take, take then draw,
+    or a single action then pass. Every first action's outcome distribution is enumerated once, and the
+    value of each possible second action is computed on the hand that remains after discarding, so all
+    plans sharing a first action are evaluated in the same pass.
+    The value of a plan is the expected hand reduction over the whole turn (discarded cards minus cards
+    gained), the same measure used by ExpectationValueStrategyPlayer.calculate_expectation.
+    """
+    SAMPLING_THRESHOLD = 2000   #Same sampling rule as calculate_draw_expectation: sample when C(D, n) > 2000
+    SAMPLE_SIZE = 1000
+
+    def __init__(self, max_hand_size: int = 20, rng: Optional[random.Random] = None):
+        self.MAX_HAND_SIZE = max_hand_size
+        self.rng = rng or random.Random()
+        self._outcome_cache: Dict[Tuple[Counts, int], List[Tuple[Tuple[int, ...], float]]] = {}
+        self._draw_value_cache: Dict[Tuple[Counts, Counts, int], float] = {}
+        self._take_value_cache: Dict[Tuple[Counts, Counts], float] = {}
+        self.table_draw_value: Optional[Callable[[Counts, int], Optional[float]]] = None
+
+
+    def can_draw(self, hand_size: int, deck_size: int, draw_count: int) -> bool:
+        return draw_allowed(hand_size, deck_size, draw_count, self.MAX_HAND_SIZE)
+
+
+    def can_take(self, hand_size: int, target_size: int) -> bool:
+        """Takes the rules allow and the strategy plays"""
+        return take_allowed(hand_size, target_size, self.MAX_HAND_SIZE) and target_size >= MIN_TAKE_TARGET_SIZE
+
+
+    def plan(self, game_state: Dict, table_draw_value: Optional[Callable[[Counts, int], Optional[float]]] = None) -> Tuple[Plan, Dict[Plan, float]]:
+        """
+        Returns: (best_plan, plan_values)
+        plan_values: key: plans as tuples of actions, e.g. (('draw', 2, None), ('take', None, player)),
+                     value: expected hand reduction of the whole turn
+        table_draw_value: precomputed draw values, e.g. of the opening table: (hand, draw_count) -> value, or None
+                          for hands it does not hold; used by draw_value instead of enumerating the deck
+        Second-action values computed here and table_draw_value are kept until the next call, so
+        second_action_values can reuse them once the first action has been played.
+        """
+        self.clear_caches()
+        self.table_draw_value = table_draw_value
+
+        hand, deck, targets = self._state_counts(game_state)
+        hand_size, deck_size = sum(hand), sum(deck)
+
+        plan_values: Dict[Plan, float] = {(PASS_ACTION,): 0}
+
+        for draw_count in range(1, 4):
+            if not self.can_draw(hand_size, deck_size, draw_count):
+                continue
+            first_action = ('draw', draw_count, None)
+            then_pass = 0
+            then_take = {player: 0 for player, target in targets if sum(target) >= MIN_TAKE_TARGET_SIZE}
+
+            for drawn, probability in self._outcomes(deck, draw_count):
+                discard_count, new_hand, _ = self._resolve(hand, drawn)
+                gain = discard_count - draw_count
+                then_pass += probability * gain
+                for player, target in targets:
+                    if player in then_take:
+                        second = self.take_value(new_hand, target) if self.can_take(sum(new_hand), sum(target)) else 0
+                        then_take[player] += probability * (gain + second)
+
+            plan_values[(first_action, PASS_ACTION)] = then_pass
+            for player, value in then_take.items():
+                plan_values[(first_action, ('take', None, player))] = value
+
+        for player, target in targets:
+            target_size = sum(target)
+            if not self.can_take(hand_size, target_size):
+                continue
+            first_action = ('take', None, player)
+            then_pass = 0
+            then_draw = {draw_count: 0 for draw_count in range(1, 4) if deck_size >= draw_count}
+
+            for taken, count in self._distinct_types(target):
+                probability = count / target_size
+                discard_count, new_hand, discarded = self._resolve(hand, (taken,))
+                gain = discard_count - 1
+                then_pass += probability * gain
+                new_deck = add_types(deck, discarded)
+                for draw_count in then_draw:
+                    if self.can_draw(sum(new_hand), sum(new_deck), draw_count):
+                        second = self.draw_value(new_hand, new_deck, draw_count)
+                    else:
+                        second = 0
+                    then_draw[draw_count] += probability * (gain + second)
+
+            plan_values[(first_action, PASS_ACTION)] = then_pass
+            for draw_count, value in then_draw.items():
+                plan_values[(first_action, ('draw', draw_count, None))] = value
+
+        best_plan = max(plan_values, key=lambda plan: plan_values[plan])
+        return best_plan, plan_values
+
+
+    def clear_caches(self):
+        self._outcome_cache.clear()
+        self._draw_value_cache.clear()
+        self._take_value_cache.clear()
+        self.table_draw_value = None
+
+
+    def first_action_values(self, plan_values: Dict[Plan, float]) -> Dict[Action, float]:
+        """Value of each first action, assuming the best second action is played after it"""
+        values: Dict[Action, float] = {}
+        for plan, value in plan_values.items():
+            if plan[0] not in values or value > values[plan[0]]:
+                values[plan[0]] = value
+        return values
+
+
+    def second_action_values(self, game_state: Dict, first_action: str) -> Dict[Action, float]:
+        """
+        Returns: Dictionary: key: second actions allowed after first_action ('draw' or 'take'), value: expected hand reduction
+        game_state must describe the position after the first action and its discards.
+        """
+        hand, deck, targets = self._state_counts(game_state)
+        hand_size, deck_size = sum(hand), sum(deck)
+        values: Dict[Action, float] = {PASS_ACTION: 0}
+
+        if first_action == 'draw':
+            for player, target in targets:
+                if self.can_take(hand_size, sum(target)):
+                    values[('take', None, player)] = self.take_value(hand, target)
+        elif first_action == 'take':
+            for draw_count in range(1, 4):
+                if self.can_draw(hand_size, deck_size, draw_count):
+                    values[('draw', draw_count, None)] = self.draw_value(hand, deck, draw_count)
+
+        return values
+
+
+    def _state_counts(self, game_state: Dict) -> Tuple[Counts, Counts, List[Tuple[object, Counts]]]:
+        hand = counts_from_cards(game_state['current_player'].cards)
+        deck = counts_from_cards(game_state['deck_cards'])
+        targets = [(player, counts_from_cards(player.cards)) for player in game_state['other_players']]
+
+        #A player discards all valid groups before acting, and discarded cards are shuffled back into the deck
+        hand, discarded = discard_best_groups(hand)
+        if discarded:
+            deck = add_types(deck, discarded)
+        return hand, deck, targets
+
+
+    def _resolve(self, hand: Counts, gained: Tuple[int, ...]) -> Tuple[int, Counts, List[int]]:
+        """Returns: (discard_count, hand after discarding, discarded card types) after adding the gained cards to a hand without valid groups"""
+        new_hand = add_types(hand, gained)
+        if not forms_group_with(new_hand, gained):
+            return 0, new_hand, []
+        remaining, discarded = discard_best_groups(new_hand)
+        return len(discarded), remaining, discarded
+
+
+    def _outcomes(self, deck: Counts, draw_count: int) -> List[Tuple[Tuple[int, ...], float]]:
+        key = (deck, draw_count)
+        if key not in self._outcome_cache:
+            if comb(sum(deck), draw_count) > self.SAMPLING_THRESHOLD:
+                deck_types = types_list(deck)
+                samples = Counter(tuple(sorted(self.rng.sample(deck_types, draw_count))) for _ in range(self.SAMPLE_SIZE))
+                self._outcome_cache[key] = [(drawn, count / self.SAMPLE_SIZE) for drawn, count in samples.items()]
+            else:
+                self._outcome_cache[key] = list(draw_outcomes(deck, draw_count))
+        return self._outcome_cache[key]
+
+
+    def _distinct_types(self, counts: Counts) -> List[Tuple[int, int]]:
+        return [(t, count) for t, count in enumerate(counts) if count]
+
+
+    def draw_value(self, hand: Counts, deck: Counts, draw_count: int) -> float:
+        """Expected hand reduction of drawing draw_count cards from deck, for a hand without valid groups"""
+        key = (hand, deck, draw_count)
+        if key not in self._draw_value_cache and self.table_draw_value is not None:
+            value = self.table_draw_value(hand, draw_count)
+            if value is not None:
+                self._draw_value_cache[key] = value
+        if key not in self._draw_value_cache:
+            expected_discard = 0
+            for drawn, probability in self._outcomes(deck, draw_count):
+                new_hand = add_types(hand, drawn)
+                if forms_group_with(new_hand, drawn):
+                    expected_discard += probability * max_discard(new_hand)
+            self._draw_value_cache[key] = expected_discard - draw_count
+        return self._draw_value_cache[key]
+
+
+    def take_value(self, hand: Counts, target: Counts) -> float:
+        """Expected hand reduction of taking one card from target, for a hand without valid groups"""
+        key = (hand, target)
+        if key not in self._take_value_cache:
+            target_size = sum(target)
+            expected_discard = 0
+            for taken, count in self._distinct_types(target):
+                new_hand = add_types(hand, (taken,))
+                if forms_group_with(new_hand, (taken,)):
+                    expected_discard += count / target_size * max_discard(new_hand)
+            self._take_value_cache[key] = expected_discard - 1
+        return self._take_value_cache[key]
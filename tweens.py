@@ -0,0 +1,210 @@
+from typing import Callable, Dict, Generator, List, Optional, Tuple
+
+import pygame
+
+'''
+Non-blocking animation of the game screen.
+
+Animations used to run their own loops of drawing, flipping the display and waiting on the clock, so no
+events were handled until they finished: the window could not be moved, resized or closed during computer
+turns. Timeline is instead ticked once per frame by the main loop, which keeps handling events and drawing
+the game screen.
+
+- Tween moves numeric attributes of an object (a Sprite's position, say) to end values over a duration,
+  with an easing function and a completion callback. Any number of tweens run at the same time.
+- Sprite is an image drawn over the game screen, such as a card on its way from the deck to a hand.
+- Scripts are generators run by the timeline, for sequences of animations and game steps. A script yields
+  a Tween or a list of Tweens to start them and wait until all have finished, a number of milliseconds to
+  wait, or None to wait for the next frame; `yield from` runs another script to its end.
+'''
+
+Easing = Callable[[float], float]
+Script = Generator[object, None, None]
+
+SKIP_MS = 60000         #Time a tick of finish() jumps ahead, longer than any wait
+
+
+def linear(progress: float) -> float:
+    return progress
+
+
+def ease_out_quad(progress: float) -> float:
+    """Fast start, slowing down towards the end"""
+    return 1 - (1 - progress) * (1 - progress)
+
+
+def ease_in_out_quad(progress: float) -> float:
+    if progress < 0.5:
+        return 2 * progress * progress
+    return 1 - 2 * (1 - progress) * (1 - progress)
+
+
+def ease_out_overshoot(progress: float) -> float:
+    """Goes an eighth past the end at three quarters of the way, then comes back"""
+    return 3 * progress - 2 * progress * progress
+
+
+class Tween:
+    def __init__(self, target, duration: float, easing: Easing = linear, delay: float = 0,
+                 on_complete: Optional[Callable[[], None]] = None, **end_values: float):
+        """Move the attributes of target named in end_values to those values in duration ms, after delay ms"""
+        self.target = target
+        self.duration = duration
+        self.easing = easing
+        self.delay = delay
+        self.on_complete = on_complete
+        self.end_values = end_values
+        self.start_time = 0.0
+        self._start_values: Optional[Dict[str, float]] = None     #Read when the tween starts
+        self.finished = False
+
+
+    def update(self, now: float) -> bool:
+        """Set the attributes for time now; True once the tween has finished"""
+        if self.finished or now < self.start_time:
+            return self.finished
+        if self._start_values is None:
+            self._start_values = {name: getattr(self.target, name) for name in self.end_values}
+
+        progress = min(1.0, (now - self.start_time) / self.duration) if self.duration > 0 else 1.0
+        eased = self.easing(progress)
+        for name, end in self.end_values.items():
+            start = self._start_values[name]
+            setattr(self.target, name, start + (end - start) * eased)
+
+        if progress >= 1:
+            self.finished = True
+            if self.on_complete:
+                self.on_complete()
+        return self.finished
+
+
+class Sprite:
+    def __init__(self, image: pygame.Surface, x: float, y: float, other_side: Optional[pygame.Surface] = None,
+                 trail: int = 0):
+        """
+        An image drawn at (x, y). Tweening flip from 0 to 1 turns it over to other_side: the image narrows
+        to nothing, then other_side widens back. A trail leaves fading copies at its last positions.
+        """
+        self.image = image
+        self.other_side = other_side
+        self.x = x
+        self.y = y
+        self.flip = 0.0
+        self.trail = trail
+        self._trail_positions: List[Tuple[int, int]] = []
+
+
+    def draw(self, canvas):
+        position = (int(self.x), int(self.y))
+        if self.trail:
+            for age, trail_position in enumerate(reversed(self._trail_positions), 1):
+                alpha = 255 - 34 * age
+                if alpha > 0:
+                    canvas.blit(faded(self.image, alpha), trail_position)
+            self._trail_positions = (self._trail_positions + [position])[-self.trail:]
+
+        image = self.image if self.flip < 0.5 or self.other_side is None else self.other_side
+        full_width, height = image.get_size()
+        width = int(full_width * abs(1 - 2 * self.flip)) if self.other_side is not None else full_width
+        if width <= 0:
+            return
+        if width != full_width:
+            image = pygame.transform.scale(image, (width, height))
+        canvas.blit(image, (position[0] + (full_width - width) // 2, position[1]))
+
+
+_faded_images: Dict[Tuple[pygame.Surface, int], pygame.Surface] = {}
+
+
+def faded(image: pygame.Surface, alpha: int) -> pygame.Surface:
+    """A copy of image with an alpha, made once per image and alpha"""
+    key = (image, alpha)
+    if key not in _faded_images:
+        copy = image.copy()
+        copy.set_alpha(alpha)
+        _faded_images[key] = copy
+    return _faded_images[key]
+
+
+class _RunningScript:
+    def __init__(self, script: Script, on_complete: Optional[Callable[[], None]]):
+        self.script = script
+        self.on_complete = on_complete
+        self.waiting: List[Tween] = []
+        self.resume_time = 0.0
+
+
+class Timeline:
+    def __init__(self):
+        self.now = 0.0
+        self.tweens: List[Tween] = []
+        self.sprites: List[Sprite] = []         #Drawn over the game screen, in order
+        self._scripts: List[_RunningScript] = []
+
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._scripts or self.tweens)
+
+
+    def add(self, tween: Tween) -> Tween:
+        tween.start_time = self.now + tween.delay
+        self.tweens.append(tween)
+        return tween
+
+
+    def spawn(self, script: Script, on_complete: Optional[Callable[[], None]] = None):
+        """Run script from the next tick on, alongside the other scripts"""
+        self._scripts.append(_RunningScript(script, on_complete))
+
+
+    def tick(self, now: float):
+        """Advance the tweens to time now (ms), then resume the scripts that are done waiting"""
+        self.now = now
+        tweens, self.tweens = self.tweens, []
+        for tween in tweens:                        #Completion callbacks may add tweens to self.tweens
+            if not tween.update(now):
+                self.tweens.append(tween)
+        for running in list(self._scripts):
+            if running in self._scripts:            #Not cancelled by another script
+                self._resume(running)
+
+
+    def _resume(self, running: _RunningScript):
+        while all(tween.finished for tween in running.waiting) and self.now >= running.resume_time:
+            try:
+                step = next(running.script)
+            except StopIteration:
+                self._scripts.remove(running)
+                if running.on_complete:
+                    running.on_complete()
+                return
+
+            running.waiting = []
+            if step is None:
+                return
+            elif isinstance(step, Tween):
+                running.waiting = [self.add(step)]
+            elif isinstance(step, (list, tuple)):
+                running.waiting = [self.add(tween) for tween in step]
+            else:
+                running.resume_time = self.now + step
+
+
+    def cancel(self):
+        """Drop every script, tween and sprite, leaving the attributes where they are"""
+        self._scripts = []
+        self.tweens = []
+        self.sprites = []
+
+
+    def finish(self):
+        """Play the scripts and tweens to their end at once, without waiting"""
+        while self.busy:
+            self.tick(self.now + SKIP_MS)
+
+
+    def draw(self, canvas):
+        for sprite in self.sprites:
+            sprite.draw(canvas)
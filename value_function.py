@@ -0,0 +1,177 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hand_counts import COLOURS, NUMBER_COUNT, TYPE_COUNT, Counts
+
+'''
+Learned approximation of the single-action expectations of calculate_expectation.
+
+A small MLP in NumPy predicts the expected hand reduction of drawing 1, 2 or 3 cards from a deck, or of
+taking a card from an opponent, from card-type count features. It is trained by train_value_function.py
+on positions from self-play, with the exact engine (TurnPlanner) as the target, and answers a decision
+with one matrix product instead of enumerating the deck.
+
+Weights are saved as .npz files that carry their WEIGHTS_VERSION; files of another version are rejected,
+since the features they were trained on may differ.
+'''
+
+WEIGHTS_VERSION = 1
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), f'value_function_v{WEIGHTS_VERSION}.npz')
+
+ACTION_KINDS = ('draw 1', 'draw 2', 'draw 3', 'take')
+FEATURE_COUNT = 3 * TYPE_COUNT + 4 + len(ACTION_KINDS)
+
+
+def action_kind(action: Tuple[str, Optional[int], object]) -> int:
+    """Index in ACTION_KINDS of a draw or take action"""
+    action_type, draw_count, _ = action
+    return draw_count - 1 if action_type == 'draw' else 3
+
+
+def group_gain_sizes(hand: Counts) -> np.ndarray:
+    """Size of the group formed by adding each card type to a hand without valid groups (0 if none)"""
+    present = np.array(hand, dtype=bool).reshape(len(COLOURS), NUMBER_COUNT)
+
+    #Run lengths ending at / starting at each number, padded by one column on each side
+    ending = np.zeros((len(COLOURS), NUMBER_COUNT + 2), dtype=np.int64)
+    starting = np.zeros((len(COLOURS), NUMBER_COUNT + 2), dtype=np.int64)
+    for n in range(NUMBER_COUNT):
+        ending[:, n + 1] = np.where(present[:, n], ending[:, n] + 1, 0)
+    for n in reversed(range(NUMBER_COUNT)):
+        starting[:, n + 1] = np.where(present[:, n], starting[:, n + 2] + 1, 0)
+
+    runs = ending[:, :NUMBER_COUNT] + 1 + starting[:, 2:]
+    colours = np.broadcast_to(present.sum(axis=0) + 1, present.shape)
+    gains = np.maximum(np.where(runs >= 3, runs, 0), np.where(colours >= 3, colours, 0))
+    gains[present] = 0          #A duplicate card forms no new group
+    return gains.reshape(-1)
+
+
+def feature_matrix(hand: Counts, sources: Sequence[Tuple[Counts, int]]) -> np.ndarray:
+    """
+    One row of features per (source, action kind): the deck for draws or the target's hand for takes.
+    Features: hand counts, source distribution, group sizes formed by each single card, and the
+    probability and expected size of a group from one card of the source, sizes, action kind one-hot.
+    """
+    hand_array = np.array(hand, dtype=np.float64)
+    gains = group_gain_sizes(hand).astype(np.float64)
+    rows = np.zeros((len(sources), FEATURE_COUNT))
+
+    for row, (source, kind) in zip(rows, sources):
+        source_array = np.array(source, dtype=np.float64)
+        source_size = source_array.sum()
+        distribution = source_array / source_size if source_size else source_array
+
+        row[:TYPE_COUNT] = hand_array / 2
+        row[TYPE_COUNT:2 * TYPE_COUNT] = distribution
+        row[2 * TYPE_COUNT:3 * TYPE_COUNT] = gains / 5
+        row[3 * TYPE_COUNT] = distribution @ (gains > 0)
+        row[3 * TYPE_COUNT + 1] = distribution @ gains / 5
+        row[3 * TYPE_COUNT + 2] = hand_array.sum() / 20
+        row[3 * TYPE_COUNT + 3] = source_size / 80
+        row[3 * TYPE_COUNT + 4 + kind] = 1
+
+    return rows
+
+
+class ValueFunction:
+    """MLP with one ReLU hidden layer, with inputs standardised by the training set's statistics"""
+    def __init__(self, weights: Dict[str, np.ndarray]):
+        self.weights = weights
+
+
+    @classmethod
+    def initialise(cls, hidden_size: int = 64, rng: Optional[np.random.Generator] = None) -> 'ValueFunction':
+        rng = rng or np.random.default_rng()
+        return cls({
+            'w1': rng.normal(0, np.sqrt(2 / FEATURE_COUNT), (FEATURE_COUNT, hidden_size)),
+            'b1': np.zeros(hidden_size),
+            'w2': rng.normal(0, np.sqrt(1 / hidden_size), (hidden_size, 1)),
+            'b2': np.zeros(1),
+            'mean': np.zeros(FEATURE_COUNT),
+            'std': np.ones(FEATURE_COUNT),
+        })
+
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_WEIGHTS_PATH) -> 'ValueFunction':
+        with np.load(path) as data:
+            version = int(data['version'])
+            if version != WEIGHTS_VERSION:
+                raise ValueError(f"{path} holds weights of version {version}, expected {WEIGHTS_VERSION}")
+            return cls({name: data[name] for name in data.files if name != 'version'})
+
+
+    def save(self, path: str = DEFAULT_WEIGHTS_PATH):
+        np.savez(path, version=np.array(WEIGHTS_VERSION), **self.weights)
+
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        hidden = np.maximum((features - self.weights['mean']) / self.weights['std'] @ self.weights['w1'] + self.weights['b1'], 0)
+        return (hidden @ self.weights['w2'] + self.weights['b2'])[:, 0]
+
+
+    def predict_actions(self, hand: Counts, deck: Counts,
+                        actions: List[Tuple[Tuple[str, Optional[int], object], Optional[Counts]]]) -> List[float]:
+        """Predicted expectations of (action, target hand) pairs, where the target hand is only used by takes"""
+        sources = [(deck if target is None else target, action_kind(action)) for action, target in actions]
+        return self.predict(feature_matrix(hand, sources)).tolist()
+
+
+    def train(self, features: np.ndarray, targets: np.ndarray, epochs: int = 30, batch_size: int = 256,
+              learning_rate: float = 1e-3, rng: Optional[np.random.Generator] = None) -> List[float]:
+        """Fit with Adam on the mean squared error; returns the training loss of each epoch"""
+        rng = rng or np.random.default_rng()
+        self.weights['mean'] = features.mean(axis=0)
+        self.weights['std'] = features.std(axis=0) + 1e-6
+        inputs = (features - self.weights['mean']) / self.weights['std']
+
+        names = ('w1', 'b1', 'w2', 'b2')
+        first_moment = {name: np.zeros_like(self.weights[name]) for name in names}
+        second_moment = {name: np.zeros_like(self.weights[name]) for name in names}
+        beta1, beta2, step = 0.9, 0.999, 0
+        history = []
+
+        for _ in range(epochs):
+            order = rng.permutation(len(inputs))
+            epoch_loss = 0.0
+            for start in range(0, len(inputs), batch_size):
+                batch = order[start:start + batch_size]
+                x, y = inputs[batch], targets[batch]
+
+                pre_activation = x @ self.weights['w1'] + self.weights['b1']
+                hidden = np.maximum(pre_activation, 0)
+                error = (hidden @ self.weights['w2'] + self.weights['b2'])[:, 0] - y
+                epoch_loss += float(error @ error)
+
+                output_gradient = (2 / len(batch)) * error[:, None]
+                hidden_gradient = (output_gradient @ self.weights['w2'].T) * (pre_activation > 0)
+                gradients = {
+                    'w1': x.T @ hidden_gradient,
+                    'b1': hidden_gradient.sum(axis=0),
+                    'w2': hidden.T @ output_gradient,
+                    'b2': output_gradient.sum(axis=0),
+                }
+
+                step += 1
+                for name in names:
+                    first_moment[name] = beta1 * first_moment[name] + (1 - beta1) * gradients[name]
+                    second_moment[name] = beta2 * second_moment[name] + (1 - beta2) * gradients[name] ** 2
+                    corrected_first = first_moment[name] / (1 - beta1 ** step)
+                    corrected_second = second_moment[name] / (1 - beta2 ** step)
+                    self.weights[name] -= learning_rate * corrected_first / (np.sqrt(corrected_second) + 1e-8)
+
+            history.append(epoch_loss / len(inputs))
+        return history
+
+
+_loaded_functions = {}
+
+
+def load_value_function(path: str = DEFAULT_WEIGHTS_PATH) -> Optional[ValueFunction]:
+    """Shared value function for path, or None if it has not been trained"""
+    if path not in _loaded_functions:
+        _loaded_functions[path] = ValueFunction.load(path) if os.path.exists(path) else None
+    return _loaded_functions[path]